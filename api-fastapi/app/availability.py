@@ -0,0 +1,199 @@
+import os
+import re
+import numpy as np
+from functools import lru_cache
+from typing import Dict, FrozenSet, List, Optional, Sequence, Tuple
+
+DAYS = ("Mon", "Tue", "Wed", "Thu", "Fri", "Sat", "Sun")
+HOURS_PER_DAY = 24
+# 시간 단위 비트: 요일 * 24 + 시 (168비트 = uint64 3워드)
+HOUR_BITS = len(DAYS) * HOURS_PER_DAY
+HOUR_WORDS = (HOUR_BITS + 63) // 64
+# 세션 시간대 [시작 시, 끝 시) (convert_availability_format 기준: 오전 9-12시, 오후/저녁 13-20시)
+PARTS = (("Morn", 9, 13), ("Eve", 13, 21))
+# 요일×시간대 14개 슬롯, 비트 위치는 2 * 요일 + 시간대 (딥러닝 특성의 시간대 열 순서와 동일)
+SLOT_NAMES = tuple(f"{day}{part}" for day in DAYS for part, _, _ in PARTS)
+SLOT_BITS = len(SLOT_NAMES)
+
+WEEKDAYS_PATTERN = re.compile(r"weekdays\s+(\d+)-(\d+)")
+DAY_RANGE_PATTERN = re.compile(r"(Mon|Tue|Wed|Thu|Fri|Sat|Sun)\s*(\d+)-(\d+)$")
+
+# 쌍 점수의 가용시간 Jaccard 단위: slot(요일×시간대, 기본) 또는 hour(시간 단위)
+GRANULARITY = os.getenv("AVAILABILITY_GRANULARITY", "slot")
+GRANULARITIES = ("slot", "hour")
+
+_WORD = (1 << 64) - 1
+
+
+def _hour_range(day: int, start: int, end: int) -> int:
+    """day 요일의 [start, end)시 비트 (0-24시 밖은 잘라냄)"""
+    start, end = max(0, start), min(HOURS_PER_DAY, end)
+    if start >= end:
+        return 0
+    return ((1 << (end - start)) - 1) << (day * HOURS_PER_DAY + start)
+
+
+SLOT_HOURS = tuple(_hour_range(d, start, end) for d in range(len(DAYS)) for _, start, end in PARTS)
+SLOT_TOKENS = dict(zip(SLOT_NAMES, SLOT_HOURS))
+
+
+def slot_tokens(availability: str) -> List[str]:
+    """가용시간 문자열("MonEve;WedEve")을 토큰 목록으로 분리"""
+    return [t.strip() for t in availability.split(";") if t.strip()] if availability else []
+
+
+@lru_cache(maxsize=65536)
+def parse_availability(availability: str) -> Tuple[int, FrozenSet[str]]:
+    """가용시간 문자열 → (시간 단위 비트마스크, 해석하지 못한 토큰)
+
+    토큰(";" 구분) 형식:
+    - "MonEve": 요일×시간대 슬롯 (해당 시간대의 모든 시간)
+    - "weekdays 9-18": 월~금 9시부터 18시 전까지 (데이터베이스 형식)
+    - "Mon 9-12", "Mon9-12": 특정 요일의 시간 범위
+    그 밖의 토큰은 버리지 않고 따로 돌려줘서 같은 토큰끼리는 겹침으로 센다.
+    같은 문자열이 코호트 안에서 반복되므로 캐시한다.
+    """
+    hours = 0
+    unknown = set()
+    for token in slot_tokens(availability):
+        slot = SLOT_TOKENS.get(token)
+        if slot is not None:
+            hours |= slot
+            continue
+        m = WEEKDAYS_PATTERN.match(token)
+        if m:
+            for day in range(5):
+                hours |= _hour_range(day, int(m.group(1)), int(m.group(2)))
+            continue
+        m = DAY_RANGE_PATTERN.match(token)
+        if m:
+            hours |= _hour_range(DAYS.index(m.group(1)), int(m.group(2)), int(m.group(3)))
+            continue
+        unknown.add(token)
+    return hours, frozenset(unknown)
+
+
+def hours_to_slots(hours: int) -> int:
+    """시간 비트마스크 → 14비트 슬롯 마스크 (슬롯 시간 중 하나라도 가능하면 그 슬롯 가능)"""
+    slots = 0
+    for bit, slot_hours in enumerate(SLOT_HOURS):
+        if hours & slot_hours:
+            slots |= 1 << bit
+    return slots
+
+
+@lru_cache(maxsize=65536)
+def availability_units(availability: str, granularity: str = GRANULARITY) -> Tuple[int, FrozenSet[str]]:
+    """겹침 계산 단위의 비트마스크 (slot이면 14비트 슬롯, hour이면 168비트 시간)와 해석하지 못한 토큰"""
+    hours, unknown = parse_availability(availability)
+    return (hours_to_slots(hours) if granularity == "slot" else hours), unknown
+
+
+def availability_overlap(a: str, b: str, granularity: str = GRANULARITY) -> float:
+    """두 가용시간 문자열의 Jaccard 유사도 (둘 다 비어 있으면 0.0)"""
+    bits_a, unknown_a = availability_units(a or "", granularity)
+    bits_b, unknown_b = availability_units(b or "", granularity)
+    union = (bits_a | bits_b).bit_count() + len(unknown_a | unknown_b)
+    if union == 0:
+        return 0.0
+    return ((bits_a & bits_b).bit_count() + len(unknown_a & unknown_b)) / union
+
+
+def _split_words(values: Sequence[int], words: int) -> np.ndarray:
+    """Python 정수 비트마스크 목록 → (N, words) uint64"""
+    out = np.zeros((len(values), words), dtype=np.uint64)
+    for w in range(words):
+        out[:, w] = [(v >> (64 * w)) & _WORD for v in values]
+    return out
+
+
+def _popcount(masks: np.ndarray) -> np.ndarray:
+    """(N, words) uint64 → 행별 켜진 비트 수"""
+    return np.unpackbits(masks.astype("<u8", copy=False).view(np.uint8), axis=1).sum(axis=1)
+
+
+def _unpack(masks: np.ndarray, nbits: int) -> np.ndarray:
+    """(N, words) uint64 → (N, nbits) float32 0/1 행렬 (열 b = 비트 b)"""
+    bits = np.unpackbits(masks.astype("<u8", copy=False).view(np.uint8), axis=1, bitorder="little")
+    return bits[:, :nbits].astype(np.float32)
+
+
+def availability_jaccard(masks: np.ndarray, other: Optional[np.ndarray] = None, nbits: Optional[int] = None) -> np.ndarray:
+    """비트마스크 간 Jaccard 유사도 행렬 (popcount 기반)
+
+    비트를 0/1 행렬로 펼치면 교집합 크기는 행렬곱, popcount는 행 합계가 된다.
+    값은 모두 작은 정수라 float32 행렬곱도 정확하고, 나눗셈만 float64로 해서 Python의 len/len과 같은 값이 된다.
+    other를 주면 masks의 행 × other의 행 블록만 계산한다. nbits는 실제로 쓰는 비트 수 (없으면 전체 워드).
+    """
+    nbits = masks.shape[1] * 64 if nbits is None else nbits
+    bits = _unpack(masks, nbits)
+    other_bits = bits if other is None else _unpack(other, nbits)
+    inter = bits @ other_bits.T
+    union = bits.sum(axis=1)[:, None] + other_bits.sum(axis=1)[None, :]
+    union -= inter
+    # 둘 다 비어 있으면 union=0 → 0.0 (기존 jaccard와 동일)
+    np.maximum(union, 1.0, out=union)
+    return np.divide(inter, union, dtype=np.float64)
+
+
+def availability_jaccard_pairs(a: np.ndarray, b: np.ndarray) -> np.ndarray:
+    """a[i]와 b[i] 비트마스크 쌍별 Jaccard 유사도 (availability_jaccard의 해당 성분과 같은 값)"""
+    inter = _popcount(a & b).astype(np.float64)
+    union = _popcount(a | b).astype(np.float64)
+    np.maximum(union, 1.0, out=union)
+    return inter / union
+
+
+class AvailabilityIndex:
+    """코호트 가용시간 인덱스
+
+    학생마다 가용시간 문자열을 한 번만 해석해 시간 단위(168비트) 마스크와 14비트 슬롯 마스크를 만들고,
+    쌍 점수용 겹침 마스크(granularity 단위 + 해석하지 못한 토큰 비트)를 uint64 워드 배열로 둔다.
+    쌍 점수 행렬의 Jaccard, 딥러닝 특성의 시간대 열, 팀 공통 가용시간 조회가 모두 이 인덱스를 쓴다.
+    """
+
+    def __init__(self, availability: Sequence[str], granularity: str = GRANULARITY):
+        if granularity not in GRANULARITIES:
+            raise ValueError(f"granularity must be one of {', '.join(GRANULARITIES)}")
+        self.granularity = granularity
+        parsed = [parse_availability(a or "") for a in availability]
+        hours = [h for h, _ in parsed]
+        slots = [hours_to_slots(h) for h in hours]
+        self.hours = _split_words(hours, HOUR_WORDS)
+        self.slots = np.array(slots, dtype=np.uint16)
+        # 해석하지 못한 토큰은 코호트 안에서 base 비트 뒤에 차례로 비트를 붙인다
+        base = SLOT_BITS if granularity == "slot" else HOUR_BITS
+        self.vocab: Dict[str, int] = {}
+        units = []
+        for unit, (_, unknown) in zip(slots if granularity == "slot" else hours, parsed):
+            for token in sorted(unknown):
+                unit |= 1 << (base + self.vocab.setdefault(token, len(self.vocab)))
+            units.append(unit)
+        self.nbits = base + len(self.vocab)
+        self.masks = _split_words(units, (self.nbits + 63) // 64)
+
+    def __len__(self) -> int:
+        return len(self.slots)
+
+    def jaccard(self, rows: Optional[np.ndarray] = None) -> np.ndarray:
+        """쌍 Jaccard 행렬 (rows를 주면 rows 행 × 전체 블록)"""
+        if rows is None:
+            return availability_jaccard(self.masks, nbits=self.nbits)
+        return availability_jaccard(self.masks[rows], self.masks, nbits=self.nbits)
+
+    def slot_bits(self) -> np.ndarray:
+        """(N, 14) 0/1 슬롯 행렬 (딥러닝 특성의 시간대 열)"""
+        return (self.slots[:, None] >> np.arange(SLOT_BITS, dtype=np.uint16)) & 1
+
+    def common_hours(self, idx: Sequence[int]) -> int:
+        """팀원 모두가 가능한 시간 수 (주간 기준)"""
+        if len(idx) == 0:
+            return 0
+        common = np.bitwise_and.reduce(self.hours[np.asarray(idx, dtype=np.intp)], axis=0)
+        return int(_popcount(common[None, :])[0])
+
+    def common_slots(self, idx: Sequence[int]) -> int:
+        """팀원 모두가 가능한 요일×시간대 슬롯 수"""
+        if len(idx) == 0:
+            return 0
+        return int(np.bitwise_and.reduce(self.slots[np.asarray(idx, dtype=np.intp)])).bit_count()
@@ -0,0 +1,239 @@
+import numpy as np
+from typing import Dict, List, Optional, Sequence, Tuple
+from app.compatibility import CompatibilityMatrix
+
+
+class TeamState:
+    """팀 하나의 점수 계산 상태를 증분으로 유지
+
+    쌍 점수 합, 멤버별 기여도(같은 팀 멤버와의 쌍 점수 합), 역할 카운트를 들고 있어서
+    멤버 교환의 효과를 O(team_size)로 평가하고 그대로 반영할 수 있다.
+    """
+
+    def __init__(self, members: Sequence[int], scores: np.ndarray, roles: Sequence[str], req_roles: Dict[str, int]):
+        self.members = list(members)
+        self.req_roles = req_roles
+        self._scores = scores
+        self._roles = roles
+        block = scores[np.ix_(self.members, self.members)]
+        np.fill_diagonal(block, 0.0)
+        self.contrib = block.sum(axis=1)
+        self.pair_sum = float(self.contrib.sum()) / 2.0
+        self.role_counts: Dict[str, int] = {}
+        for m in self.members:
+            self.role_counts[roles[m]] = self.role_counts.get(roles[m], 0) + 1
+
+    @property
+    def n_pairs(self) -> int:
+        n = len(self.members)
+        return n * (n - 1) // 2
+
+    def role_bonus(self, counts: Optional[Dict[str, int]] = None) -> float:
+        counts = self.role_counts if counts is None else counts
+        ok = 0; need = 0
+        for r, rc in self.req_roles.items():
+            need += rc
+            ok += min(counts.get(r, 0), rc)
+        return 0.1 * (ok / max(1, need))
+
+    def _score(self, pair_sum: float, bonus: float) -> float:
+        internal = pair_sum / self.n_pairs if self.n_pairs else 0.0
+        return round(internal + bonus, 3)
+
+    @property
+    def score(self) -> float:
+        return self._score(self.pair_sum, self.role_bonus())
+
+    def swapped_pair_sums(self, other: "TeamState") -> Tuple[np.ndarray, np.ndarray]:
+        """self[i] ↔ other[j] 교환 후 두 팀의 쌍 점수 합 (len(self) × len(other) 행렬)"""
+        cross = self._scores[np.ix_(self.members, other.members)]
+        # 들어오는 멤버 j가 self 팀 전체와 갖는 점수 합에서 나가는 멤버 i와의 점수를 뺀다
+        new_self = self.pair_sum - self.contrib[:, None] + cross.sum(axis=0)[None, :] - cross
+        new_other = other.pair_sum - other.contrib[None, :] + cross.sum(axis=1)[:, None] - cross
+        return new_self, new_other
+
+    def swapped_bonus(self, out_member: int, in_member: int) -> float:
+        r_out, r_in = self._roles[out_member], self._roles[in_member]
+        if r_out == r_in:
+            return self.role_bonus()
+        counts = dict(self.role_counts)
+        counts[r_out] -= 1
+        counts[r_in] = counts.get(r_in, 0) + 1
+        return self.role_bonus(counts)
+
+    def replace(self, pos: int, new_member: int):
+        """pos 위치의 멤버를 new_member로 교체하고 합계/기여도를 갱신"""
+        old = self.members[pos]
+        others = [m for k, m in enumerate(self.members) if k != pos]
+        delta = self._scores[new_member, others] - self._scores[old, others]
+        mask = np.arange(len(self.members)) != pos
+        self.contrib[mask] += delta
+        self.contrib[pos] = float(self._scores[new_member, others].sum())
+        self.pair_sum += float(delta.sum())
+        self.role_counts[self._roles[old]] -= 1
+        self.role_counts[self._roles[new_member]] = self.role_counts.get(self._roles[new_member], 0) + 1
+        self.members[pos] = new_member
+
+
+def _others_range(ranked: np.ndarray, scores: np.ndarray, fixed: int, others: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """fixed 팀과 others[k] 팀을 뺀 나머지 팀의 최고/최저 점수 (others 원소별, 나머지가 없으면 -inf / inf)
+
+    ranked는 점수 오름차순 팀 번호이고, 두 팀만 빼므로 양 끝 세 팀까지만 보면 된다.
+    """
+    def pick(ends: List[int], empty: float) -> np.ndarray:
+        ends = [k for k in ends if k != fixed][:2] + [-1, -1]
+        first = np.full(len(others), scores[ends[0]] if ends[0] >= 0 else empty)
+        second = scores[ends[1]] if ends[1] >= 0 else empty
+        return np.where(others == ends[0], second, first)
+
+    return pick(ranked[::-1][:3].tolist(), -np.inf), pick(ranked[:3].tolist(), np.inf)
+
+
+def balance_teams(matrix: CompatibilityMatrix, teams: List[List[int]], req_roles: Dict[str, int],
+                  swap_keys: Sequence[str], roles: Sequence[str], max_iterations: int = 50,
+                  spread_tol: float = 0.05, home: Optional[Sequence[int]] = None,
+                  max_moves: Optional[int] = None) -> List[List[int]]:
+    """팀 간 점수 균형을 맞추기 위한 멤버 교환 (인덱스 기반)
+
+    목적함수는 (전체 최고-최저 팀 점수 차이, -전체 점수 합)이고, 이를 줄이는 교환만 적용한다:
+    편차가 줄거나, 편차가 같으면 점수 합이 늘어야 한다. 따라서 편차 없이 점수 합만 깎는 교환은 하지 않는다.
+    편차는 최고/최저 팀이 낀 교환으로만 줄어들므로, 반복마다 최고/최저 팀과 다른 모든 팀 사이에서
+    교환 가능한 키(swap_keys)가 같은 멤버끼리의 교환을 한 번에 평가해 목적함수가 가장 좋은 교환을 적용한다.
+    home(멤버 인덱스 → 원래 팀 위치, 원래 팀이 없으면 -1)과 max_moves를 주면
+    원래 팀을 떠난 멤버 수가 max_moves를 넘는 교환은 하지 않는다 (증분 재매칭용).
+    """
+    if len(teams) < 2:
+        return teams
+
+    key_ids: Dict[str, int] = {}
+    keys = np.array([key_ids.setdefault(k, len(key_ids)) for k in swap_keys], dtype=np.intp)
+    role_ids: Dict[str, int] = {}
+    role_codes = np.array([role_ids.setdefault(r, len(role_ids)) for r in roles], dtype=np.intp)
+    limited = home is not None and max_moves is not None
+    home_arr = np.asarray(home if limited else [], dtype=np.intp)
+
+    # 팀 상태를 (팀 수 × 최대 팀 크기) 배열로 한 번에 계산해 두고,
+    # TeamState는 교환이 일어난 팀에만 만들어 그 두 팀의 행만 갱신한다
+    n_teams, width = len(teams), max(len(t) for t in teams)
+    members = np.zeros((n_teams, width), dtype=np.intp)
+    valid = np.zeros((n_teams, width), dtype=bool)
+    for t, team in enumerate(teams):
+        members[t, :len(team)], valid[t, :len(team)] = team, True
+    member_keys = keys[members]
+    pairs_ok = valid[:, :, None] & valid[:, None, :] & ~np.eye(width, dtype=bool)[None]
+    contrib = np.where(pairs_ok, matrix.scores[members[:, :, None], members[:, None, :]], 0.0).sum(axis=2)
+    pair_sum = contrib.sum(axis=1) / 2.0
+    sizes = valid.sum(axis=1)
+    n_pairs = np.maximum(1, sizes * (sizes - 1) // 2).astype(np.float64)
+    ok = np.zeros(n_teams)
+    for r, rc in req_roles.items():
+        if r in role_ids:
+            ok += np.minimum((valid & (role_codes[members] == role_ids[r])).sum(axis=1), rc)
+    bonus = 0.1 * (ok / max(1, sum(req_roles.values())))
+    # TeamState.score와 같은 반올림
+    scores = np.array([round(v, 3) for v in (pair_sum / n_pairs + bonus).tolist()])
+    # 학생 → 팀 위치 (팀에 없는 학생은 n_teams)
+    team_of = np.full(matrix.scores.shape[0], n_teams, dtype=np.intp)
+    team_of[members[valid]] = np.nonzero(valid)[0]
+    states: Dict[int, TeamState] = {}
+
+    def state(t: int) -> TeamState:
+        if t not in states:
+            states[t] = TeamState(teams[t], matrix.scores, roles, req_roles)
+        return states[t]
+
+    def sync(t: int):
+        s = states[t]
+        size = len(s.members)
+        team_of[s.members] = t
+        members[t, :size] = s.members
+        member_keys[t, :size] = keys[s.members]
+        contrib[t, :size] = s.contrib
+        pair_sum[t], bonus[t], scores[t] = s.pair_sum, s.role_bonus(), s.score
+
+    def away(member: int, pos: int) -> int:
+        return int(home[member] >= 0 and home[member] != pos)
+
+    moved = sum(away(m, p) for p, team in enumerate(teams) for m in team) if limited else 0
+
+    def candidates(f: int, ranked: np.ndarray, spread: float):
+        """f 팀 멤버 ↔ 다른 팀 멤버 교환 중 목적함수를 개선하는 것 → (상대 팀, f 위치, 상대 위치, 새 편차, 점수 합 증가)"""
+        xs = members[f, :sizes[f]]
+        allowed = valid[None] & (keys[xs][:, None, None] == member_keys[None])
+        allowed[:, f] = False
+        if limited:
+            hx, hy, teams_at = home_arr[xs][:, None], home_arr[members], np.arange(n_teams)
+            out_x = ((hx >= 0) & (hx != teams_at[None, :])).astype(np.int64) - ((hx >= 0) & (hx != f))
+            out_y = ((hy >= 0) & (hy != f)).astype(np.int64) - ((hy >= 0) & (hy != teams_at[:, None]))
+            allowed &= moved + out_x[:, :, None] + out_y[None] <= max_moves
+        i, g, j = np.nonzero(allowed)
+        if not len(i):
+            return None
+        rows = np.asarray(matrix.scores[xs], dtype=np.float64)
+        # f 팀 전체와 각 학생의 점수 합, f 팀 멤버별로 각 팀 멤버들과의 점수 합
+        with_f = rows.sum(axis=0)
+        with_team = np.stack([np.bincount(team_of, weights=r, minlength=n_teams + 1) for r in rows])
+        y = members[g, j]
+        c = rows[i, y]
+        # TeamState.swapped_pair_sums와 같은 식을 교환 가능한 (i, g, j)에 대해서만 계산
+        new_f = pair_sum[f] - contrib[f, i] + with_f[y] - c
+        new_g = pair_sum[g] - contrib[g, j] + with_team[i, g] - c
+        bonus_f = np.full(len(i), bonus[f])
+        bonus_g = bonus[g]
+        # 교환 키가 같아도 역할이 다르면 역할 보너스가 바뀐다
+        for k in np.flatnonzero(role_codes[xs[i]] != role_codes[y]).tolist():
+            a, b = int(xs[i[k]]), int(y[k])
+            bonus_f[k] = state(f).swapped_bonus(a, b)
+            bonus_g[k] = state(int(g[k])).swapped_bonus(b, a)
+        score_f = np.round(new_f / n_pairs[f] + bonus_f, 3)
+        score_g = np.round(new_g / n_pairs[g] + bonus_g, 3)
+        others_hi, others_lo = _others_range(ranked, scores, f, g)
+        new_spread = (np.maximum(np.maximum(score_f, score_g), others_hi)
+                      - np.minimum(np.minimum(score_f, score_g), others_lo))
+        gain = score_f + score_g - scores[f] - scores[g]
+        better = (new_spread < spread - 1e-9) | ((np.abs(new_spread - spread) <= 1e-9) & (gain > 1e-9))
+        if not better.any():
+            return None
+        return g[better], i[better], j[better], new_spread[better], gain[better]
+
+    for _ in range(max_iterations):
+        hi, lo = float(scores.max()), float(scores.min())
+        spread = hi - lo
+        if spread < spread_tol:
+            break
+        total = float(scores.sum())
+        ranked = np.argsort(scores, kind="stable")
+        best = None
+        for f in np.flatnonzero((scores == hi) | (scores == lo)).tolist():
+            found = candidates(f, ranked, spread)
+            if found is None:
+                continue
+            # 편차가 가장 작아지는 교환, 같으면 점수 합이 가장 늘어나는 교환 (동률이면 앞 멤버/팀)
+            partner, i, j, new_spread, gain = found
+            k = int(np.lexsort((-gain, np.round(new_spread, 6)))[0])
+            key = (round(float(new_spread[k]), 6), -float(gain[k]))
+            if best is None or key < best[0]:
+                best = (key, f, int(partner[k]), int(i[k]), int(j[k]))
+        if best is None:
+            break
+        _, x, y, i, j = best
+        sx, sy = state(x), state(y)
+        a, b = sx.members[i], sy.members[j]
+        sx.replace(i, b)
+        sy.replace(j, a)
+        sync(x)
+        sync(y)
+        # 평가(벡터 반올림)와 실제 점수가 어긋나 목적함수가 나빠졌다면 되돌리고 멈춘다
+        new_spread = float(scores.max() - scores.min())
+        if new_spread > spread + 1e-9 or (new_spread > spread - 1e-9 and float(scores.sum()) <= total + 1e-9):
+            sx.replace(i, a)
+            sy.replace(j, b)
+            sync(x)
+            sync(y)
+            break
+        if limited:
+            moved += away(a, y) - away(a, x) + away(b, x) - away(b, y)
+
+    for t, s in states.items():
+        teams[t][:] = s.members
+    return teams
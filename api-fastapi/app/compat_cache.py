@@ -0,0 +1,205 @@
+import os
+import hashlib
+import threading
+import numpy as np
+from collections import OrderedDict
+from typing import Callable, Dict, List, Optional, Sequence
+from app.models import Student
+
+# 블록 계산 콜백: 새 코호트 기준 행 인덱스 → {이름: (len(rows), N) 배열}
+RowsFn = Callable[[np.ndarray], Dict[str, np.ndarray]]
+FullFn = Callable[[], Dict[str, np.ndarray]]
+
+
+def student_row_key(s: Student) -> str:
+    """호환성 계산에 쓰이는 필드(OCEAN + 가용시간 + 역할)만으로 만든 학생 행 해시"""
+    return row_key((s.O, s.C, s.E, s.A, s.N), s.availability, s.role_pref)
+
+
+def row_key(ocean: Sequence[float], availability: Optional[str], role_pref: Optional[str]) -> str:
+    """열 단위 값으로 만든 student_row_key"""
+    raw = "|".join([repr(float(v)) for v in ocean] + [availability or "", role_pref or ""])
+    return hashlib.blake2b(raw.encode("utf-8"), digest_size=12).hexdigest()
+
+
+def cohort_key(namespace: str, row_keys: Sequence[str]) -> str:
+    h = hashlib.blake2b(namespace.encode("utf-8"), digest_size=16)
+    for k in row_keys:
+        h.update(k.encode("ascii"))
+    return h.hexdigest()
+
+
+class _Entry:
+    def __init__(self, namespace: str, row_keys: List[str], arrays: Dict[str, np.ndarray]):
+        self.namespace = namespace
+        self.row_keys = row_keys
+        self.arrays = arrays
+        self.nbytes = sum(a.nbytes for a in arrays.values())
+        self.positions: Dict[str, List[int]] = {}
+        for i, k in enumerate(row_keys):
+            self.positions.setdefault(k, []).append(i)
+
+
+class CompatCache:
+    """코호트별 쌍 호환성 행렬 LRU 캐시
+
+    키는 (모델/가중치 버전, 학생 행 해시 목록)의 해시다. 정확히 같은 코호트면 그대로 돌려주고,
+    일부 학생만 바뀐 경우에는 가장 많이 겹치는 캐시 항목을 기준으로 바뀐 학생의 행/열만 다시 계산한다.
+    메모리 한도를 넘으면 오래된 항목부터 내보내며, spill_dir이 있으면 디스크(.npz)로 옮겨 둔다.
+    """
+
+    def __init__(self, max_bytes: int, spill_dir: Optional[str] = None, max_spill_entries: int = 64,
+                 min_reuse: float = 0.5):
+        self.max_bytes = max_bytes
+        self.spill_dir = spill_dir
+        self.max_spill_entries = max_spill_entries
+        self.min_reuse = min_reuse
+        self._entries: "OrderedDict[str, _Entry]" = OrderedDict()
+        self._spilled: "OrderedDict[str, str]" = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self._stats = {"hits": 0, "partial_hits": 0, "misses": 0, "spill_hits": 0,
+                       "evictions": 0, "spills": 0, "rows_recomputed": 0, "rows_reused": 0}
+        if spill_dir:
+            os.makedirs(spill_dir, exist_ok=True)
+
+    def get_or_compute(self, namespace: str, row_keys: List[str], compute_full: FullFn,
+                       compute_rows: RowsFn) -> Dict[str, np.ndarray]:
+        """캐시된 행렬을 돌려주거나, 바뀐 행/열만 (또는 전체를) 계산해 저장"""
+        key = cohort_key(namespace, row_keys)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+                self._stats["hits"] += 1
+                return entry.arrays
+            spilled = self._spilled.pop(key, None)
+            base = self._best_base(namespace, row_keys) if spilled is None else None
+
+        if spilled is not None:
+            arrays = self._load_spill(spilled)
+            if arrays is not None:
+                with self._lock:
+                    self._stats["spill_hits"] += 1
+                self._put(key, _Entry(namespace, row_keys, arrays))
+                return arrays
+            with self._lock:
+                base = self._best_base(namespace, row_keys)
+
+        if base is None:
+            arrays = compute_full()
+            with self._lock:
+                self._stats["misses"] += 1
+                self._stats["rows_recomputed"] += len(row_keys)
+        else:
+            arrays = self._patch(base, row_keys, compute_rows)
+        for a in arrays.values():
+            a.flags.writeable = False
+        self._put(key, _Entry(namespace, row_keys, arrays))
+        return arrays
+
+    def _best_base(self, namespace: str, row_keys: List[str]) -> Optional[_Entry]:
+        """같은 버전 항목 중 학생 행이 가장 많이 겹치는 항목 (겹침이 min_reuse 미만이면 None)"""
+        wanted = set(row_keys)
+        best, best_overlap = None, 0
+        for entry in self._entries.values():
+            if entry.namespace != namespace:
+                continue
+            overlap = len(wanted.intersection(entry.positions))
+            if overlap > best_overlap:
+                best, best_overlap = entry, overlap
+        if best is None or best_overlap < self.min_reuse * len(row_keys):
+            return None
+        return best
+
+    def _patch(self, base: _Entry, row_keys: List[str], compute_rows: RowsFn) -> Dict[str, np.ndarray]:
+        """base에서 재사용 가능한 블록을 복사하고 바뀐 학생의 행/열만 새로 계산"""
+        n = len(row_keys)
+        free = {k: list(v) for k, v in base.positions.items()}
+        new_pos, old_pos, changed = [], [], []
+        for i, k in enumerate(row_keys):
+            # 같은 학생이 두 번 나오면 base의 위치를 한 번씩만 쓴다 (대각선 값을 쌍 점수로 쓰지 않도록)
+            if free.get(k):
+                new_pos.append(i)
+                old_pos.append(free[k].pop(0))
+            else:
+                changed.append(i)
+        new_pos = np.array(new_pos, dtype=np.intp)
+        old_pos = np.array(old_pos, dtype=np.intp)
+        changed = np.array(changed, dtype=np.intp)
+
+        rows = compute_rows(changed) if len(changed) else {}
+        arrays = {}
+        for name, old in base.arrays.items():
+            new = np.empty((n, n), dtype=old.dtype)
+            new[np.ix_(new_pos, new_pos)] = old[np.ix_(old_pos, old_pos)]
+            if len(changed):
+                block = rows[name].astype(old.dtype, copy=False)
+                new[changed, :] = block
+                new[:, changed] = block.T
+            arrays[name] = new
+        with self._lock:
+            self._stats["partial_hits"] += 1
+            self._stats["rows_recomputed"] += len(changed)
+            self._stats["rows_reused"] += len(new_pos)
+        return arrays
+
+    def _put(self, key: str, entry: _Entry):
+        with self._lock:
+            if entry.nbytes > self.max_bytes:
+                return
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self._bytes -= old.nbytes
+            self._entries[key] = entry
+            self._bytes += entry.nbytes
+            evicted = []
+            while self._bytes > self.max_bytes and len(self._entries) > 1:
+                old_key, old_entry = self._entries.popitem(last=False)
+                self._bytes -= old_entry.nbytes
+                self._stats["evictions"] += 1
+                evicted.append((old_key, old_entry))
+        for old_key, old_entry in evicted:
+            self._spill(old_key, old_entry)
+
+    def _spill(self, key: str, entry: _Entry):
+        if not self.spill_dir:
+            return
+        path = os.path.join(self.spill_dir, f"{key}.npz")
+        try:
+            np.savez(path, **entry.arrays)
+        except OSError as e:
+            print(f"호환성 캐시 디스크 저장 실패: {e}")
+            return
+        with self._lock:
+            self._spilled[key] = path
+            self._stats["spills"] += 1
+            while len(self._spilled) > self.max_spill_entries:
+                _, old_path = self._spilled.popitem(last=False)
+                try:
+                    os.remove(old_path)
+                except OSError:
+                    pass
+
+    def _load_spill(self, path: str) -> Optional[Dict[str, np.ndarray]]:
+        try:
+            with np.load(path) as data:
+                arrays = {name: data[name] for name in data.files}
+            # 메모리에 있던 항목처럼 공유되므로 읽기 전용으로 (호출자가 캐시된 행렬을 바꾸지 못하도록)
+            for a in arrays.values():
+                a.flags.writeable = False
+            os.remove(path)
+            return arrays
+        except (OSError, ValueError) as e:
+            print(f"호환성 캐시 디스크 로드 실패: {e}")
+            return None
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return dict(self._stats, entries=len(self._entries), spilled_entries=len(self._spilled),
+                        bytes=self._bytes, max_bytes=self.max_bytes)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
@@ -0,0 +1,251 @@
+import numpy as np
+from typing import Dict, Iterator, List, Optional, Sequence, Tuple, Union
+from itertools import combinations
+from app.models import Student
+from app.compat_cache import CompatCache
+from app.student_table import StudentTable, as_table
+from app.availability import GRANULARITY
+
+
+def pair_score_matrix(ocean: np.ndarray, avail: np.ndarray, weights: Dict[str, float],
+                      other: Optional[np.ndarray] = None) -> np.ndarray:
+    """pair_score와 동일한 식을 N×N 브로드캐스트 한 번으로 계산
+
+    항의 순서와 연산 순서를 pair_score와 맞춰 두었기 때문에 결과가 비트 단위로 동일하다.
+    other(행 OCEAN)를 주면 ocean의 행 × other의 행 블록만 계산한다 (avail도 같은 블록).
+    """
+    other = ocean if other is None else other
+    return _pair_score([ocean[:, k][:, None] for k in range(5)], [other[:, k][None, :] for k in range(5)], avail, weights)
+
+
+def pair_scores(a: np.ndarray, b: np.ndarray, avail: np.ndarray, weights: Dict[str, float]) -> np.ndarray:
+    """a[i]와 b[i] 쌍별 점수 벡터 (pair_score_matrix의 해당 성분과 같은 값, avail도 쌍별 벡터)"""
+    return _pair_score([a[:, k] for k in range(5)], [b[:, k] for k in range(5)], avail, weights)
+
+
+def _pair_score(a: Sequence[np.ndarray], b: Sequence[np.ndarray], avail: np.ndarray, weights: Dict[str, float]) -> np.ndarray:
+    O, C, E, A, N = a
+    O2, C2, E2, A2, N2 = b
+    acc = weights["C"] * (1 - np.abs(C - C2))
+    acc += weights["A"] * (1 - np.abs(A - A2))
+    acc += weights["E"] * (1 - np.abs(E - E2))
+    acc += weights["O"] * (1 - np.abs(O - O2))
+    acc += weights["N"] * (1 - ((N + N2) / 2.0))
+    acc += weights["AVAIL"] * avail
+    return np.clip(acc, 0.0, 1.0, out=acc)
+
+
+def weights_namespace(weights: Dict[str, float]) -> str:
+    """캐시 키에 들어가는 점수식 버전 (가중치나 가용시간 겹침 단위가 바뀌면 캐시가 자동으로 갈린다)"""
+    return "pair_score:" + ",".join(f"{k}={weights[k]!r}" for k in sorted(weights)) + f";avail={GRANULARITY}"
+
+
+class CompatibilityMatrix:
+    """요청 단위로 미리 계산한 학생 쌍 호환성 행렬
+
+    greedy_match / team_score / balance_team_scores가 pair_score를 매번 다시 계산하지 않고
+    이 행렬에서 점수를 읽는다. 학생 데이터는 StudentTable의 열 배열을 그대로 쓴다.
+    """
+
+    def __init__(self, students: Union[StudentTable, Sequence[Student]], weights: Dict[str, float],
+                 cache: Optional[CompatCache] = None):
+        self.table = as_table(students)
+        self.weights = weights
+        self._index: Optional[Dict[int, int]] = None
+        self.ocean = self.table.ocean
+        self.avail_index = self.table.avail_index
+        if cache is None:
+            arrays = self._compute_full()
+        else:
+            # 같은 코호트(또는 일부 학생만 바뀐 코호트)는 캐시에서 재사용
+            arrays = cache.get_or_compute(weights_namespace(weights), self.table.row_keys(),
+                                          self._compute_full, self._compute_rows)
+        self.avail = arrays["avail"]
+        self.scores = arrays["scores"]
+
+    def _compute_full(self) -> Dict[str, np.ndarray]:
+        avail = self.avail_index.jaccard()
+        return {"avail": avail, "scores": pair_score_matrix(self.ocean, avail, self.weights)}
+
+    def _compute_rows(self, rows: np.ndarray) -> Dict[str, np.ndarray]:
+        """rows 학생들과 전체 학생 간 블록만 계산 (캐시 부분 갱신용)"""
+        avail = self.avail_index.jaccard(rows)
+        return {"avail": avail, "scores": pair_score_matrix(self.ocean[rows], avail, self.weights, other=self.ocean)}
+
+    def __len__(self) -> int:
+        return len(self.table)
+
+    @property
+    def students(self) -> List[Student]:
+        return self.table.students
+
+    def indices(self, team: Sequence[Student]) -> List[int]:
+        """Student 목록 → 행 인덱스 (Student 기반 호출용, 같은 요청의 Student 객체이므로 객체 id로 찾는다)"""
+        if self._index is None:
+            self._index = {id(s): i for i, s in enumerate(self.students)}
+        return [self._index[id(s)] for s in team]
+
+    def team_internal_score(self, idx: Sequence[int]) -> float:
+        """team_internal_score와 같은 순서(combinations)로 쌍 점수 평균"""
+        if len(idx) < 2:
+            return 0.0
+        pairs = list(combinations(idx, 2))
+        return sum(float(self.scores[a, b]) for a, b in pairs) / len(pairs)
+
+    def mean_availability(self, idx: Sequence[int]) -> float:
+        """팀 내 가용시간 Jaccard 평균 (reasons 표시용)"""
+        n = len(idx)
+        return sum(float(self.avail[a, b]) for a, b in combinations(idx, 2)) / max(1, n * (n - 1) / 2)
+
+    def team_stats(self, teams: Sequence[Sequence[int]]) -> Tuple[np.ndarray, np.ndarray]:
+        """팀별 (쌍 점수 평균, 가용시간 Jaccard 평균)을 같은 크기 팀끼리 묶어 한 번에 계산
+
+        team_internal_score / mean_availability와 같은 값이지만 합산 순서가 달라 마지막 자리 오차가 있을 수 있다.
+        """
+        internal = np.zeros(len(teams))
+        avail = np.zeros(len(teams))
+        by_size: Dict[int, List[int]] = {}
+        for t, idx in enumerate(teams):
+            by_size.setdefault(len(idx), []).append(t)
+        for size, ts in by_size.items():
+            if size < 2:
+                continue
+            members = np.array([teams[t] for t in ts], dtype=np.intp)
+            a, b = np.triu_indices(size, 1)
+            internal[ts] = self.scores[members[:, a], members[:, b]].mean(axis=1)
+            avail[ts] = self.avail[members[:, a], members[:, b]].mean(axis=1)
+        return internal, avail
+
+    def extended_pair_sums(self, team: Sequence[int], candidates: np.ndarray) -> np.ndarray:
+        return extended_pair_sums(self.scores, team, candidates)
+
+
+def extended_pair_sums(scores: np.ndarray, team: Sequence[int], candidates: np.ndarray) -> np.ndarray:
+    """각 후보 c에 대해 combinations(team + [c], 2)의 쌍 점수 합을 벡터로 계산
+
+    combinations 순서대로 누적하므로 후보별 Python sum 결과와 동일하다.
+    """
+    block = scores[np.ix_(team, candidates)]
+    total = np.zeros(len(candidates), dtype=np.float64)
+    for p in range(len(team)):
+        for q in range(p + 1, len(team)):
+            total += scores[team[p], team[q]]
+        total += block[p]
+    return total
+
+
+def greedy_assign(scores: np.ndarray, order: Sequence[int], roles: Sequence[str],
+                  team_size: int, req_roles: Dict[str, int]) -> List[List[int]]:
+    """order 순서로 팀을 시작해 한계 이득이 가장 큰 후보를 채우는 그리디 (인덱스 기반)
+
+    한계 이득 = 팀 내부 평균 점수 증가분 + 역할 커버리지 보너스 증가분 (team_score와 같은 식)
+    팀 크기는 team_sizes를 따른다.
+    """
+    remaining = np.array(order, dtype=np.intp)
+    role_ids: Dict[str, int] = {}
+    role_code = np.array([role_ids.setdefault(r, len(role_ids)) for r in roles], dtype=np.intp)
+    need = max(1, sum(req_roles.values()))
+    teams: List[List[int]] = []
+
+    for size in team_sizes(len(remaining), team_size):
+        curr = [int(remaining[0])]
+        remaining = remaining[1:]
+        counts = {roles[curr[0]]: 1}
+        base = 0.0
+        while len(curr) < size:
+            n_pairs = len(curr) * (len(curr) + 1) // 2
+            internal = extended_pair_sums(scores, curr, remaining) / n_pairs
+            gains = internal - base
+            # add small role coverage gain
+            ok = sum(min(counts.get(r, 0), rc) for r, rc in req_roles.items())
+            role_gain = 0.1 * ((ok + 1) / need) - 0.1 * (ok / need)
+            open_codes = [role_ids[r] for r, rc in req_roles.items() if counts.get(r, 0) < rc and r in role_ids]
+            if open_codes:
+                gains += np.where(np.isin(role_code[remaining], open_codes), role_gain, 0.0)
+            best_i = int(np.argmax(gains))
+            # 선택된 후보의 팀 내부 점수가 다음 단계의 base가 된다
+            base = float(internal[best_i])
+            pick = int(remaining[best_i])
+            curr.append(pick)
+            counts[roles[pick]] = counts.get(roles[pick], 0) + 1
+            remaining = np.delete(remaining, best_i)
+        teams.append(curr)
+    return teams
+
+
+def team_sizes(n: int, team_size: int) -> List[int]:
+    """n명을 team_size 기준으로 나눈 팀 크기 목록
+
+    팀 수는 floor(n / team_size)와 ceil(n / team_size) 중 팀 크기가 team_size에서 덜 벗어나는 쪽이고
+    (최대 차이, 차이 합 순으로 비교하고 같으면 floor), 팀 간 크기 차이는 최대 1이다.
+    예: team_size 4에서 7명 → [4, 3], 10명 → [5, 5], 13명 → [5, 4, 4], 15명 → [4, 4, 4, 3]
+    """
+    if n <= 0:
+        return []
+
+    def plan(n_teams: int) -> List[int]:
+        base, extra = divmod(n, n_teams)
+        return [base + 1] * extra + [base] * (n_teams - extra)
+
+    plans = [plan(max(1, n // team_size)), plan(max(1, -(-n // team_size)))]
+    return min(plans, key=lambda sizes: (max(abs(s - team_size) for s in sizes),
+                                         sum(abs(s - team_size) for s in sizes)))
+
+
+def _score_row(scores, i: int) -> np.ndarray:
+    # 밀집 행렬 또는 PairScoreStore(row 메서드) 모두 지원
+    return scores.row(i) if hasattr(scores, "row") else scores[i]
+
+
+def bucketed_assign(scores, order: Sequence[int], roles: Sequence[str], team_size: int,
+                    req_roles: Dict[str, int]) -> List[List[int]]:
+    return list(iter_bucketed_assign(scores, order, roles, team_size, req_roles))
+
+
+def iter_bucketed_assign(scores, order: Sequence[int], roles: Sequence[str], team_size: int,
+                         req_roles: Dict[str, int]) -> Iterator[List[int]]:
+    """역할 풀 기반 그리디 배정 (인덱스 기반, 팀이 완성될 때마다 하나씩 반환)
+
+    학생을 역할별 풀로 나눠 두고, 팀마다 order상 첫 번째 남은 학생으로 시작한 뒤
+    1) required_roles 순서대로 부족한 역할 자리를 해당 역할 풀 안에서만 찾아 채우고
+    2) 남은 자리는 전체 남은 학생 중에서 채운다.
+    후보는 현재 팀원과의 점수 합(팀원이 추가될 때 행 하나를 더하는 벡터)이 가장 큰 학생이다.
+    팀 크기는 team_sizes를 따른다 (팀 간 크기 차이 최대 1명).
+    """
+    order = np.asarray(order, dtype=np.intp)
+    if not len(order):
+        return
+    role_ids: Dict[str, int] = {}
+    role_code = np.array([role_ids.setdefault(r, len(role_ids)) for r in roles], dtype=np.intp)
+    # 역할 풀: order 순서를 유지한 해당 역할 학생 인덱스
+    pools = {r: order[role_code[order] == role_ids[r]] for r, rc in req_roles.items() if rc > 0 and r in role_ids}
+    alive = np.ones(len(roles), dtype=bool)
+    rest = order
+    totals = np.zeros(len(roles), dtype=np.float64)
+
+    for size in team_sizes(len(order), team_size):
+        rest = rest[alive[rest]]
+        team = [int(rest[0])]
+        alive[team[0]] = False
+        totals[:] = _score_row(scores, team[0])
+        counts = {roles[team[0]]: 1}
+
+        def add(pick: int):
+            team.append(pick)
+            alive[pick] = False
+            totals[:] += _score_row(scores, pick)
+            counts[roles[pick]] = counts.get(roles[pick], 0) + 1
+
+        for r, rc in req_roles.items():
+            if r not in pools:
+                continue
+            while len(team) < size and counts.get(r, 0) < rc:
+                # 풀은 고를 때마다 남은 학생만 남도록 줄여 둔다
+                pools[r] = cand = pools[r][alive[pools[r]]]
+                if not len(cand):
+                    break
+                add(int(cand[np.argmax(totals[cand])]))
+        while len(team) < size:
+            rest = rest[alive[rest]]
+            add(int(rest[np.argmax(totals[rest])]))
+        yield team
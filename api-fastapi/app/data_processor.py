@@ -1,8 +1,15 @@
 import numpy as np
-import pandas as pd
-from typing import List, Dict, Any, Tuple, Optional
+from typing import List, Dict, Any, Sequence, Tuple, Optional
 from app.models import Student, TeamData
-import re
+from app.availability import SLOT_NAMES, WEEKDAYS_PATTERN, AvailabilityIndex
+
+# 학생 특성 차원 (OCEAN 5 + 역할 5 + 시간대 14)과 쌍 특성 차원 (두 학생 + 차이 + 합)
+STUDENT_FEATURE_DIM = 24
+PAIR_FEATURE_DIM = STUDENT_FEATURE_DIM * 4
+
+# 역할 원-핫 위치와 시간대 비트 위치 (학생마다 다시 만들지 않도록 모듈 상수로)
+ROLE_INDEX = {"PM": 0, "FE": 1, "BE": 2, "Design": 3, "Any": 4}
+TIME_SLOT_INDEX = {slot: i for i, slot in enumerate(SLOT_NAMES)}
 
 def convert_availability_format(availability: str) -> str:
     """데이터베이스의 가용시간 형식을 알고리즘 형식으로 변환
@@ -17,8 +24,7 @@ def convert_availability_format(availability: str) -> str:
         return ""
     
     # "weekdays 9-18" 형식 파싱
-    weekdays_pattern = r"weekdays\s+(\d+)-(\d+)"
-    match = re.match(weekdays_pattern, availability.strip())
+    match = WEEKDAYS_PATTERN.match(availability.strip())
     
     if not match:
         # 기존 형식이면 그대로 반환
@@ -44,37 +50,58 @@ def convert_availability_format(availability: str) -> str:
 
 def extract_student_features(student: Student) -> np.ndarray:
     """학생 객체에서 특성 벡터 추출"""
+    return encode_students([student], dtype=np.float64)[0]
+
+def encode_students(students: Sequence[Student], dtype=np.float32) -> np.ndarray:
+    """학생 목록 전체를 (N, 24) 특성 행렬로 한 번에 인코딩
+
+    열 구성은 OCEAN 5 + 역할 원-핫 5 + 시간대 비트 14 (extract_student_features와 동일)
+    """
+    ocean = np.array([(s.O, s.C, s.E, s.A, s.N) for s in students], dtype=np.float64).reshape(-1, 5)
+    return encode_columns(ocean, [s.role_pref for s in students], [s.availability for s in students], dtype)
+
+def encode_columns(ocean: np.ndarray, role_pref: Sequence[Optional[str]], availability: Sequence[Optional[str]],
+                   dtype=np.float32, index: Optional[AvailabilityIndex] = None) -> np.ndarray:
+    """열 단위 학생 데이터(OCEAN (N,5), 역할, 가용시간)를 (N, 24) 특성 행렬로 인코딩
+
+    index: 이미 만든 같은 학생들의 가용시간 인덱스 (없으면 availability로 새로 만든다)
+    """
+    n = len(ocean)
+    out = np.zeros((n, STUDENT_FEATURE_DIM), dtype=dtype)
+    if n == 0:
+        return out
     # OCEAN 점수를 특성으로 사용
-    ocean_features = np.array([student.O, student.C, student.E, student.A, student.N])
-    
-    # 역할 선호도를 원-핫 인코딩으로 변환
-    role_map = {"PM": 0, "FE": 1, "BE": 2, "Design": 3, "Any": 4}
-    role_idx = role_map.get(student.role_pref, 4)  # 기본값은 "Any"
-    role_features = np.zeros(5)
-    role_features[role_idx] = 1
-    
-    # 가용 시간 처리 (시간대를 비트 벡터로 변환)
-    # 데이터베이스 형식을 알고리즘 형식으로 변환
-    converted_availability = convert_availability_format(student.availability)
-    time_slots = converted_availability.split(";") if converted_availability else []
-    time_map = {"MonMorn": 0, "MonEve": 1, "TueMorn": 2, "TueEve": 3, 
-               "WedMorn": 4, "WedEve": 5, "ThuMorn": 6, "ThuEve": 7,
-               "FriMorn": 8, "FriEve": 9, "SatMorn": 10, "SatEve": 11,
-               "SunMorn": 12, "SunEve": 13}
-    time_features = np.zeros(14)
-    for slot in time_slots:
-        if slot in time_map:
-            time_features[time_map[slot]] = 1
-    
-    # 모든 특성 결합
-    return np.concatenate([ocean_features, role_features, time_features])
+    out[:, :5] = ocean
+    # 역할 선호도 원-핫 (알 수 없는 역할은 "Any")
+    roles = np.fromiter((ROLE_INDEX.get(r, 4) for r in role_pref), dtype=np.intp, count=n)
+    out[np.arange(n), 5 + roles] = 1
+    # 가용 시간 슬롯 비트 (데이터베이스 형식, 시간 단위 범위도 요일×시간대 슬롯으로 변환)
+    out[:, 10:] = (index if index is not None else AvailabilityIndex(availability)).slot_bits()
+    return out
+
+def extract_feature_matrix(students: List[Student]) -> np.ndarray:
+    """학생 목록의 (N, 24) 특성 행렬 (쌍 목록은 만들지 않음)"""
+    return encode_students(students, dtype=np.float64)
 
 def prepare_pair_data(students: List[Student]) -> Tuple[np.ndarray, List[Tuple[int, int]]]:
     """학생 쌍 데이터 준비"""
-    features = np.array([extract_student_features(s) for s in students])
+    features = extract_feature_matrix(students)
     pairs = [(i, j) for i in range(len(students)) for j in range(i+1, len(students))]
     return features, pairs
 
+def create_pair_features_batch(features: np.ndarray, left: np.ndarray, right: np.ndarray) -> np.ndarray:
+    """여러 학생 쌍의 특성 벡터를 한 번에 생성 (create_pair_features의 벡터화 버전)
+
+    Args:
+        features: (N, 24) 학생 특성 행렬
+        left, right: 쌍을 이루는 학생 인덱스 배열
+    Returns:
+        (len(left), 96) 쌍 특성 행렬
+    """
+    fi = features[left]
+    fj = features[right]
+    return np.concatenate([fi, fj, np.abs(fi - fj), fi + fj], axis=1)
+
 def create_pair_features(features: np.ndarray, pair: Tuple[int, int]) -> np.ndarray:
     """학생 쌍의 특성 벡터 생성"""
     i, j = pair
@@ -84,82 +111,57 @@ def create_pair_features(features: np.ndarray, pair: Tuple[int, int]) -> np.ndar
     # 특성 결합
     return np.concatenate([features[i], features[j], diff, summ])
 
+def team_pair_indices(sizes: Sequence[int]) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """팀 멤버를 이어 붙인 행렬 기준으로 팀 내 모든 쌍의 (left, right, team) 인덱스 생성
+
+    팀 순서대로, 팀 안에서는 (i < j) 행 우선 순서이며 같은 크기의 팀끼리 묶어 한 번에 만든다.
+    """
+    sizes = np.asarray(sizes, dtype=np.intp).reshape(-1)
+    offsets = np.concatenate([[0], np.cumsum(sizes)[:-1]]).astype(np.intp)
+    n_pairs = sizes * (sizes - 1) // 2
+    team = np.repeat(np.arange(len(sizes)), n_pairs)
+    left = np.empty(len(team), dtype=np.intp)
+    right = np.empty(len(team), dtype=np.intp)
+    pair_size = sizes[team]
+    for size in np.unique(sizes[sizes >= 2]):
+        li, ri = np.triu_indices(size, k=1)
+        base = offsets[sizes == size][:, None]
+        mask = pair_size == size
+        left[mask] = (base + li[None, :]).reshape(-1)
+        right[mask] = (base + ri[None, :]).reshape(-1)
+    return left, right, team
+
 def prepare_training_data(teams: List[TeamData]) -> Tuple[np.ndarray, np.ndarray]:
-    """모델 학습을 위한 데이터 준비"""
-    X = []  # 특성 벡터
-    y = []  # 레이블 (팀 성과)
-    
-    for team in teams:
-        # 팀 내 모든 학생 쌍에 대한 특성 추출
-        features, pairs = prepare_pair_data(team.members)
-        for pair in pairs:
-            X.append(create_pair_features(features, pair))
-            y.append(team.performance_score)  # 팀 성과 점수를 레이블로 사용
-    
-    return np.array(X), np.array(y)
-
-def save_team_data(team_data: List[TeamData], file_path: str = "team_data.csv"):
-    """팀 데이터를 CSV 파일로 저장"""
-    rows = []
-    for team in team_data:
-        for member in team.members:
-            rows.append({
-                "team_id": team.team_id,
-                "student_id": member.student_id,
-                "name": member.name,
-                "major": member.major,
-                "role_pref": member.role_pref,
-                "O": member.O,
-                "C": member.C,
-                "E": member.E,
-                "A": member.A,
-                "N": member.N,
-                "availability": member.availability,
-                "performance_score": team.performance_score,
-                "success_rate": team.success_rate
-            })
-    
-    df = pd.DataFrame(rows)
-    df.to_csv(file_path, index=False)
-    return f"데이터가 {file_path}에 저장되었습니다."
-
-def load_team_data(file_path: str = "team_data.csv") -> List[TeamData]:
-    """CSV 파일에서 팀 데이터 로드"""
-    try:
-        df = pd.read_csv(file_path)
-        team_data = {}
-        
-        for _, row in df.iterrows():
-            team_id = row["team_id"]
-            if team_id not in team_data:
-                team_data[team_id] = {
-                    "members": [],
-                    "performance_score": row["performance_score"],
-                    "success_rate": row["success_rate"]
-                }
-            
-            student = Student(
-                student_id=row["student_id"],
-                name=row["name"],
-                major=row["major"],
-                role_pref=row["role_pref"],
-                availability=row["availability"],
-                O=row["O"],
-                C=row["C"],
-                E=row["E"],
-                A=row["A"],
-                N=row["N"]
-            )
-            team_data[team_id]["members"].append(student)
-        
-        return [
-            TeamData(
-                team_id=team_id,
-                members=data["members"],
-                performance_score=data["performance_score"],
-                success_rate=data["success_rate"]
-            ) for team_id, data in team_data.items()
-        ]
-    except Exception as e:
-        print(f"데이터 로드 중 오류 발생: {e}")
-        return []
\ No newline at end of file
+    """모델 학습을 위한 데이터 준비
+
+    모든 팀 멤버를 한 번에 인코딩하고 팀 내 쌍 인덱스로 쌍 특성을 만든다.
+    Returns:
+        (P, 96) float32 쌍 특성과 (P,) float32 레이블 (팀 성과 점수)
+    """
+    features, left, right, labels = team_pair_table(teams)
+    return create_pair_features_batch(features, left, right).astype(np.float32), labels
+
+def team_pair_table(teams: List[TeamData]) -> Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+    """팀 목록 → (멤버 특성 행렬, 쌍 left/right 인덱스, 쌍 레이블)
+
+    쌍 특성(96열)은 만들지 않으므로 큰 이력도 청크 단위로 특성 저장소에 쓸 수 있다.
+    """
+    members = [m for team in teams for m in team.members]
+    # 차이/합은 float64로 계산한 뒤 float32로 바꿔 기존 쌍 특성과 같은 값이 되게 한다
+    features = encode_students(members, dtype=np.float64)
+    left, right, team = team_pair_indices([len(t.members) for t in teams])
+    labels = np.array([t.performance_score for t in teams], dtype=np.float32)
+    return features, left, right, labels[team]
+
+def save_team_data(team_data: List[TeamData], root: str = "team_history", cohort: str = "default",
+                   term: str = "default", source: str = "import") -> str:
+    """팀 데이터를 팀 이력 저장소(코호트/학기별 Parquet 파티션)에 추가"""
+    from app.team_history import TeamHistoryStore
+    run_id = TeamHistoryStore(root).append_teams(team_data, cohort, term, source=source)
+    return f"데이터가 {root}에 저장되었습니다. (run_id={run_id})"
+
+def load_team_data(root: str = "team_history", cohort: Optional[str] = None,
+                   term: Optional[str] = None) -> List[TeamData]:
+    """팀 이력 저장소에서 팀 데이터 로드 (cohort/term을 주면 해당 파티션만 읽음)"""
+    from app.team_history import TeamHistoryStore
+    return TeamHistoryStore(root).load_team_data(cohort, term)
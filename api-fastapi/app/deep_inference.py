@@ -0,0 +1,241 @@
+import os
+import hashlib
+import numpy as np
+from typing import Dict, List, Optional, Sequence, Tuple, Union
+from app.models import Student
+from app.pair_store import PairScoreStore, create_store, row_tiles
+from app.compat_cache import CompatCache
+from app.compatibility import bucketed_assign
+from app.metrics import observe_inference_batch
+from app.student_table import StudentTable, as_table
+from app.data_processor import create_pair_features_batch, PAIR_FEATURE_DIM
+
+# TensorFlow 없이 쓰는 딥러닝 추론 (쌍 점수 예측, 팀 배정, NumPy 추론 백엔드)
+# predict_pairs(쌍 특성) → 점수를 가진 모델이면 Keras DeepMatchingModel이든 LiteMatchingModel이든 같은 함수로 서빙한다.
+
+# 추론 시 한 번에 모델에 넣는 쌍 개수 (고정 크기 청크)
+PREDICT_CHUNK = int(os.getenv("PREDICT_CHUNK", "8192"))
+
+# 쌍 추론에 쓸 메모리 한도 (점수 저장소 + 타일 작업 메모리)와 memmap 파일 위치
+PAIR_MEMORY_LIMIT_MB = int(os.getenv("PAIR_MEMORY_LIMIT_MB", "512"))
+PAIR_STORE_DIR = os.getenv("PAIR_STORE_DIR") or None
+# 쌍 하나당 타일 작업 메모리 (float32 쌍 특성 + 연결 전 중간 배열 + 인덱스 2개)
+_TILE_BYTES_PER_PAIR = PAIR_FEATURE_DIM * 4 * 2 + 16
+
+# 서빙 백엔드: keras(TensorFlow SavedModel) 또는 numpy(모델 디렉토리의 lite.npz 가중치로 NumPy 순전파)
+DEEP_BACKENDS = ("keras", "numpy")
+# numpy 백엔드의 가중치 양자화: none(float32) | float16 | int8 (출력 뉴런별 대칭 스케일)
+QUANTIZE_MODES = ("none", "float16", "int8")
+# 모델 디렉토리 안의 NumPy 가중치 파일 이름 (SavedModel과 같은 디렉토리에 두어 버전 정리 시 함께 삭제된다)
+LITE_FILE = "lite.npz"
+LITE_FORMAT = 1
+
+
+def quantize_weight(kernel: np.ndarray, mode: str) -> np.ndarray:
+    """Dense 커널을 mode 정밀도로 양자화한 뒤 float32로 되돌린 값 (추론 시 곱하는 값)
+
+    int8은 출력 뉴런(열)마다 max|w| / 127 스케일로 반올림한다.
+    NumPy에는 int8/float16 행렬곱 경로가 없으므로 계산은 float32로 하고, 양자화 오차만 그대로 반영된다.
+    """
+    kernel = np.asarray(kernel, dtype=np.float32)
+    if mode == "none":
+        return kernel
+    if mode == "float16":
+        return kernel.astype(np.float16).astype(np.float32)
+    if mode == "int8":
+        scale = np.abs(kernel).max(axis=0) / 127.0
+        scale[scale == 0] = 1.0
+        q = np.clip(np.rint(kernel / scale), -127, 127).astype(np.int8)
+        return q.astype(np.float32) * scale.astype(np.float32)
+    raise ValueError(f"quantize must be one of {', '.join(QUANTIZE_MODES)}")
+
+
+class LiteMatchingModel:
+    """DeepMatchingModel(Dense 64 relu → Dense 32 relu → Dense 1)의 NumPy 순전파
+
+    Keras get_weights() 순서의 (커널, 편향) 쌍을 그대로 받아 추론 그래프 없이 행렬곱 3번으로 예측한다.
+    드롭아웃은 추론 시 쓰이지 않으므로 없다. quantize가 none이 아니면 커널을 양자화한 값으로 예측한다.
+    """
+
+    def __init__(self, weights: Sequence[np.ndarray], quantize: str = "none"):
+        if quantize not in QUANTIZE_MODES:
+            raise ValueError(f"quantize must be one of {', '.join(QUANTIZE_MODES)}")
+        weights = [np.asarray(w, dtype=np.float32) for w in weights]
+        if len(weights) % 2 or not weights or weights[0].shape[0] != PAIR_FEATURE_DIM or weights[-2].shape[1] != 1:
+            raise ValueError("weights must be (kernel, bias) pairs from DeepMatchingModel.get_weights()")
+        self.quantize = quantize
+        self.layers: List[Tuple[np.ndarray, np.ndarray]] = [
+            (quantize_weight(weights[k], quantize), weights[k + 1]) for k in range(0, len(weights), 2)]
+
+    def get_weights(self) -> List[np.ndarray]:
+        """추론에 쓰는 (양자화된) 가중치 (model_fingerprint가 양자화 방식별로 달라진다)"""
+        return [w for layer in self.layers for w in layer]
+
+    def forward(self, x: np.ndarray) -> np.ndarray:
+        last = len(self.layers) - 1
+        for k, (kernel, bias) in enumerate(self.layers):
+            x = x @ kernel
+            x += bias
+            if k < last:
+                np.maximum(x, 0.0, out=x)
+        return x
+
+    def predict_pairs(self, pair_features: np.ndarray, chunk_size: int = PREDICT_CHUNK) -> np.ndarray:
+        """쌍 특성 행렬의 호환성 점수를 고정 크기 청크 단위로 예측 (DeepMatchingModel.predict_pairs와 같은 모양)"""
+        pair_features = np.asarray(pair_features, dtype=np.float32)
+        out = np.empty(len(pair_features), dtype=np.float32)
+        for start in range(0, len(pair_features), chunk_size):
+            chunk = pair_features[start:start + chunk_size]
+            observe_inference_batch(len(chunk))
+            out[start:start + len(chunk)] = self.forward(chunk).reshape(-1)
+        return out
+
+
+def lite_path(model_path: str) -> str:
+    return os.path.join(model_path, LITE_FILE)
+
+
+def export_lite(weights: Sequence[np.ndarray], model_path: str) -> str:
+    """Keras 가중치를 모델 디렉토리의 lite.npz로 저장 (float32 원본, 양자화는 로드할 때 적용)"""
+    path = lite_path(model_path)
+    arrays: Dict[str, np.ndarray] = {f"w{k}": np.asarray(w, dtype=np.float32) for k, w in enumerate(weights)}
+    tmp = path + ".tmp.npz"
+    np.savez(tmp, format=np.array(LITE_FORMAT), **arrays)
+    os.replace(tmp, path)
+    return path
+
+
+def load_lite(model_path: str, quantize: str = "none") -> Optional[LiteMatchingModel]:
+    """lite.npz로 LiteMatchingModel 생성 (파일이 없으면 None)"""
+    path = lite_path(model_path)
+    if not os.path.exists(path):
+        return None
+    with np.load(path) as data:
+        if int(data["format"]) != LITE_FORMAT:
+            raise ValueError(f"unsupported lite model format: {int(data['format'])}")
+        weights = [data[f"w{k}"] for k in range(len(data.files) - 1)]
+    return LiteMatchingModel(weights, quantize)
+
+
+def warm_up(model, batch_size: int = 256):
+    """더미 배치로 한 번 추론해 첫 요청의 지연을 없앤다 (Keras는 infer 그래프 트레이스)"""
+    model.predict_pairs(np.zeros((batch_size, PAIR_FEATURE_DIM), dtype=np.float32))
+
+
+def _tile_pairs(n: int, start: int, stop: int) -> Tuple[np.ndarray, np.ndarray]:
+    """행 [start, stop)의 (i, j > i) 쌍 인덱스를 저장소 순서대로 생성"""
+    rows = np.arange(start, stop)
+    counts = n - rows - 1
+    left = np.repeat(rows, counts)
+    firsts = np.cumsum(counts) - counts
+    right = np.arange(counts.sum()) - np.repeat(firsts, counts) + np.repeat(rows + 1, counts)
+    return left, right
+
+
+def predict_compatibility_streaming(model, students: Union[StudentTable, List[Student]],
+                                    memory_limit_mb: int = PAIR_MEMORY_LIMIT_MB,
+                                    store_dir: Optional[str] = PAIR_STORE_DIR) -> PairScoreStore:
+    """모든 학생 쌍의 호환성 점수를 타일 단위로 예측해 상삼각 float32 저장소에 기록
+
+    전체 쌍 특성 행렬을 한 번에 만들지 않고, 메모리 한도 안에 들어가는 행 구간(타일)씩
+    float32 특성을 만들어 추론한다. 저장소가 한도의 절반을 넘으면 memmap 파일을 사용한다.
+    """
+    features = as_table(students).features()
+    n = len(features)
+    limit = memory_limit_mb * 1024 * 1024
+    store = create_store(n, limit, store_dir)
+    in_memory = 0 if store.path else store.nbytes
+    max_pairs = max(n, (limit - in_memory) // _TILE_BYTES_PER_PAIR)
+
+    for start, stop in row_tiles(store, max_pairs):
+        left, right = _tile_pairs(n, start, stop)
+        lo, hi = store.row_span(start, stop)
+        store.values[lo:hi] = model.predict_pairs(create_pair_features_batch(features, left, right))
+    return store
+
+
+def predict_compatibility(model, students: Union[StudentTable, List[Student]]) -> np.ndarray:
+    """모든 학생 쌍의 호환성 점수 예측"""
+    # 타일 단위로 예측한 뒤 밀집 행렬로 펼친다
+    store = predict_compatibility_streaming(model, students)
+
+    # 호환성 행렬 생성 (n x n 행렬, 대각선은 1.0)
+    try:
+        return store.to_dense().astype(np.float64)
+    finally:
+        store.close()
+
+
+def model_fingerprint(model) -> str:
+    """모델 가중치 해시 (캐시 키의 모델 버전)"""
+    h = hashlib.blake2b(digest_size=12)
+    for w in model.get_weights():
+        h.update(np.ascontiguousarray(w).tobytes())
+    return h.hexdigest()
+
+
+def predict_pair_rows(model, features: np.ndarray, rows: np.ndarray,
+                      memory_limit_mb: int = PAIR_MEMORY_LIMIT_MB) -> np.ndarray:
+    """rows 학생들과 전체 학생 간 호환성 블록 (len(rows), N)
+
+    전체 행렬과 같은 값이 되도록 쌍 특성은 항상 (작은 인덱스, 큰 인덱스) 순서로 만든다.
+    """
+    n = len(features)
+    out = np.empty((len(rows), n), dtype=np.float32)
+    step = max(1, (memory_limit_mb * 1024 * 1024 // _TILE_BYTES_PER_PAIR) // max(1, n))
+    cols = np.arange(n)
+    for start in range(0, len(rows), step):
+        block = rows[start:start + step]
+        r = np.repeat(block, n)
+        c = np.tile(cols, len(block))
+        pf = create_pair_features_batch(features, np.minimum(r, c), np.maximum(r, c))
+        out[start:start + len(block)] = model.predict_pairs(pf).reshape(len(block), n)
+    out[np.arange(len(rows)), rows] = 1.0
+    return out
+
+
+def predict_compatibility_cached(model, students: Union[StudentTable, List[Student]],
+                                 cache: CompatCache, model_version: Optional[str] = None) -> np.ndarray:
+    """코호트 캐시를 거치는 호환성 예측 (float32 밀집 행렬)
+
+    같은 코호트는 추론 없이 재사용하고, 일부 학생만 바뀌면 해당 행/열만 다시 예측한다.
+    """
+    table = as_table(students)
+    features = table.features()
+
+    def compute_full():
+        store = predict_compatibility_streaming(model, table)
+        try:
+            return {"scores": store.to_dense()}
+        finally:
+            store.close()
+
+    namespace = f"deep:{model_version or model_fingerprint(model)}"
+    arrays = cache.get_or_compute(namespace, table.row_keys(), compute_full,
+                                  lambda rows: {"scores": predict_pair_rows(model, features, rows)})
+    return arrays["scores"]
+
+
+def team_compatibility(compatibility_matrix, team_indices: List[int]) -> float:
+    """이미 계산된 호환성 행렬에서 팀 내 쌍 점수 평균 (추론 재실행 없음)"""
+    if len(team_indices) < 2:
+        return 0.0
+    idx = np.asarray(team_indices)
+    left, right = np.triu_indices(len(idx), k=1)
+    return float(np.mean(compatibility_matrix[idx[left], idx[right]], dtype=np.float64))
+
+
+def greedy_team_indices(table: StudentTable, team_size: int, req_roles: Dict[str, int],
+                        compatibility_matrix) -> List[List[int]]:
+    """greedy_match_with_model의 인덱스 버전 (StudentTable 행 인덱스로 된 팀 목록)"""
+    if len(table) < team_size:
+        return [list(range(len(table)))]
+
+    # 역할 선호도 기반 정렬 (PM 우선)
+    role_priority = {"PM": 0, "FE": 1, "BE": 2, "Design": 3, "Any": 4}
+    roles, C = table.role_pref, table.C
+    order = sorted(range(len(table)), key=lambda i: (role_priority.get(roles[i], 4), -C[i]))
+
+    # 팀 구성 알고리즘 (역할 풀 기반 그리디): 필요한 역할 자리는 해당 역할 학생 중 호환성 합이 가장 큰 학생으로,
+    # 나머지 자리는 남은 전체 학생 중에서 채운다
+    return bucketed_assign(compatibility_matrix, order, roles, team_size, req_roles)
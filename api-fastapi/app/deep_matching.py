@@ -1,20 +1,30 @@
 import tensorflow as tf
 import numpy as np
-from typing import List, Dict, Any, Tuple, Optional
+from typing import List, Dict, Tuple, Optional
 import os
 import json
 from datetime import datetime
 from app.models import Student
-from app.data_processor import extract_student_features, create_pair_features, prepare_pair_data
+from app.metrics import observe_inference_batch
+from app.student_table import StudentTable
+from app.data_processor import extract_student_features, create_pair_features, create_pair_features_batch, extract_feature_matrix, prepare_pair_data, PAIR_FEATURE_DIM
+# TensorFlow 없이 쓰는 추론 함수들 (기존 이름으로도 쓸 수 있도록 다시 내보낸다)
+from app.deep_inference import (PREDICT_CHUNK, PAIR_MEMORY_LIMIT_MB, PAIR_STORE_DIR, LiteMatchingModel, export_lite,
+                                greedy_team_indices, model_fingerprint, predict_compatibility,
+                                predict_compatibility_cached, predict_compatibility_streaming, predict_pair_rows,
+                                team_compatibility, warm_up)
 
 # 모델 저장 경로
 MODEL_DIR = "models"
 MODEL_PATH = os.path.join(MODEL_DIR, "team_matching_model")
 
+# lite.npz로 내보낸 NumPy 순전파와 Keras 예측의 최대 허용 차이 (float32 행렬곱 합산 순서 차이만 있어야 함)
+LITE_PARITY_TOL = float(os.getenv("LITE_PARITY_TOL", "1e-4"))
+
 class DeepMatchingModel(tf.keras.Model):
     """학생 쌍의 호환성을 예측하는 딥러닝 모델"""
     
-    def __init__(self, input_dim: int = 48):
+    def __init__(self, input_dim: int = PAIR_FEATURE_DIM):
         super(DeepMatchingModel, self).__init__()
         self.dense1 = tf.keras.layers.Dense(64, activation='relu')
         self.dropout1 = tf.keras.layers.Dropout(0.3)
@@ -34,22 +44,35 @@ class DeepMatchingModel(tf.keras.Model):
             x = self.dropout2(x)
         return self.output_layer(x)
     
+    @tf.function(input_signature=[tf.TensorSpec(shape=(None, PAIR_FEATURE_DIM), dtype=tf.float32)])
+    def infer(self, pair_features):
+        """추론 전용 그래프 (Keras predict 루프 없이 한 번 트레이스해서 재사용)"""
+        return self(pair_features, training=False)
+
+    def predict_pairs(self, pair_features: np.ndarray, chunk_size: int = PREDICT_CHUNK) -> np.ndarray:
+        """쌍 특성 행렬의 호환성 점수를 고정 크기 청크 단위로 예측"""
+        pair_features = np.asarray(pair_features, dtype=np.float32)
+        out = np.empty(len(pair_features), dtype=np.float32)
+        for start in range(0, len(pair_features), chunk_size):
+            chunk = pair_features[start:start + chunk_size]
+            observe_inference_batch(len(chunk))
+            out[start:start + len(chunk)] = self.infer(tf.constant(chunk)).numpy().reshape(-1)
+        return out
+
     def predict_team_compatibility(self, team: List[Student]) -> float:
         """팀의 전체 호환성 점수 예측"""
         if len(team) < 2:
             return 0.0
             
         # 학생 특성 추출
-        features, pairs = prepare_pair_data(team)
+        features = extract_feature_matrix(team)
         
         # 모든 쌍에 대한 특성 벡터 생성
-        pair_features = np.array([create_pair_features(features, pair) for pair in pairs])
-        
-        # 호환성 점수 예측
-        compatibility_scores = self.predict(pair_features).flatten()
+        left, right = np.triu_indices(len(team), k=1)
+        pair_features = create_pair_features_batch(features, left, right)
         
-        # 평균 호환성 점수 반환
-        return float(np.mean(compatibility_scores))
+        # 호환성 점수 예측 후 평균 반환
+        return float(np.mean(self.predict_pairs(pair_features)))
         
     def save(self, path: str):
         """모델 저장 - 전체 모델 구조 포함"""
@@ -65,26 +88,75 @@ def create_model(input_dim: int) -> DeepMatchingModel:
     )
     return model
 
-def train_model(model: DeepMatchingModel, X: np.ndarray, y: np.ndarray, epochs: int = 20, batch_size: int = 32) -> tf.keras.callbacks.History:
-    """모델 학습"""
+def pair_dataset(X: np.ndarray, y: np.ndarray, indices: np.ndarray, batch_size: int = 32,
+                 shuffle: bool = False, seed: Optional[int] = None) -> tf.data.Dataset:
+    """X, y의 indices 행을 배치 단위로 읽는 tf.data 파이프라인
+
+    X, y는 메모리 배열이든 특성 저장소의 memmap이든 상관없다. shuffle이면 epoch마다 순서를 섞고,
+    배치 안에서는 인덱스를 정렬해 memmap을 앞에서부터 읽는다.
+    """
+    indices = np.asarray(indices, dtype=np.int64)
+    rng = np.random.default_rng(seed)
+
+    def batches():
+        order = rng.permutation(indices) if shuffle else indices
+        for start in range(0, len(order), batch_size):
+            idx = np.sort(order[start:start + batch_size])
+            yield np.asarray(X[idx], dtype=np.float32), np.asarray(y[idx], dtype=np.float32)
+
+    return tf.data.Dataset.from_generator(batches, output_signature=(
+        tf.TensorSpec(shape=(None, PAIR_FEATURE_DIM), dtype=tf.float32),
+        tf.TensorSpec(shape=(None,), dtype=tf.float32),
+    )).prefetch(tf.data.AUTOTUNE)
+
+def train_model(model: DeepMatchingModel, X: np.ndarray, y: np.ndarray, epochs: int = 20, batch_size: int = 32,
+                callbacks: Optional[List[tf.keras.callbacks.Callback]] = None,
+                save_path: Optional[str] = MODEL_PATH, indices: Optional[np.ndarray] = None,
+                validation_indices: Optional[np.ndarray] = None,
+                validation_split: float = 0.2) -> tf.keras.callbacks.History:
+    """모델 학습 (save_path가 None이면 저장하지 않음)
+
+    X, y는 tf.data로 배치 단위로 읽으므로 특성 저장소의 memmap을 그대로 넘겨도 된다.
+    validation_indices가 없으면 Keras validation_split과 같이 indices의 마지막 비율을 검증용으로 쓴다.
+    """
+    indices = np.arange(len(y)) if indices is None else np.asarray(indices)
+    if validation_indices is None:
+        split_at = int(np.floor(len(indices) * (1.0 - validation_split)))
+        indices, validation_indices = indices[:split_at], indices[split_at:]
+    
     # 모델 학습
     history = model.fit(
-        X, y,
+        pair_dataset(X, y, indices, batch_size, shuffle=True),
         epochs=epochs,
-        batch_size=batch_size,
-        validation_split=0.2,
+        validation_data=pair_dataset(X, y, validation_indices, batch_size) if len(validation_indices) else None,
         callbacks=[
             tf.keras.callbacks.EarlyStopping(patience=5, restore_best_weights=True)
-        ]
+        ] + list(callbacks or []),
+        verbose=0 if callbacks else "auto",
     )
     
     # 모델 저장
-    if not os.path.exists(MODEL_DIR):
-        os.makedirs(MODEL_DIR)
-    model.save(MODEL_PATH)
+    if save_path:
+        os.makedirs(os.path.dirname(save_path) or ".", exist_ok=True)
+        model.save(save_path)
+        export_lite_model(model, save_path)
     
     return history
 
+def export_lite_model(model: DeepMatchingModel, model_path: str, probe_size: int = 4096, seed: int = 0) -> float:
+    """가중치를 모델 디렉토리의 lite.npz로 내보내고 Keras 예측과 비교 (numpy 백엔드용)
+
+    무작위 쌍 특성 probe_size개로 두 예측의 최대 절대 차이를 재서 돌려주고,
+    LITE_PARITY_TOL을 넘으면 잘못 내보낸 것이므로 파일을 지우고 예외를 낸다.
+    """
+    path = export_lite(model.get_weights(), model_path)
+    probe = np.random.default_rng(seed).random((probe_size, PAIR_FEATURE_DIM), dtype=np.float32)
+    diff = float(np.max(np.abs(LiteMatchingModel(model.get_weights()).predict_pairs(probe) - model.predict_pairs(probe))))
+    if not diff <= LITE_PARITY_TOL:
+        os.remove(path)
+        raise RuntimeError(f"lite 모델 예측이 Keras와 다릅니다 (최대 차이 {diff:.2e})")
+    return diff
+
 def load_model(model_path: str = MODEL_PATH) -> Optional[DeepMatchingModel]:
     """저장된 모델 로드"""
     try:
@@ -99,7 +171,7 @@ def load_model(model_path: str = MODEL_PATH) -> Optional[DeepMatchingModel]:
         if isinstance(model, tf.keras.Model):
             # 기존 모델의 가중치를 새 DeepMatchingModel에 복사
             new_model = DeepMatchingModel()
-            new_model.build(input_shape=(None, 48))
+            new_model.build(input_shape=(None, PAIR_FEATURE_DIM))
             new_model.set_weights(model.get_weights())
             new_model.compile(
                 optimizer=tf.keras.optimizers.Adam(learning_rate=0.001),
@@ -112,86 +184,18 @@ def load_model(model_path: str = MODEL_PATH) -> Optional[DeepMatchingModel]:
         print(f"모델 로드 실패: {e}")
         return None
 
-def predict_compatibility(model: DeepMatchingModel, students: List[Student]) -> np.ndarray:
-    """모든 학생 쌍의 호환성 점수 예측"""
-    # 학생 특성 추출
-    features, pairs = prepare_pair_data(students)
-    
-    # 모든 쌍에 대한 특성 벡터 생성
-    pair_features = np.array([create_pair_features(features, pair) for pair in pairs])
-    
-    # 호환성 점수 예측
-    compatibility_scores = model.predict(pair_features).flatten()
-    
-    # 호환성 행렬 생성 (n x n 행렬, 대각선은 1.0)
-    n = len(students)
-    compatibility_matrix = np.ones((n, n))
-    
-    # 예측된 호환성 점수로 행렬 채우기
-    for (i, j), score in zip(pairs, compatibility_scores):
-        compatibility_matrix[i, j] = score
-        compatibility_matrix[j, i] = score  # 대칭 행렬
-    
-    return compatibility_matrix
-
-def greedy_match_with_model(model: DeepMatchingModel, students: List[Student], team_size: int, req_roles: Dict[str, int]) -> List[List[Student]]:
+def greedy_match_with_model(model: DeepMatchingModel, students: List[Student], team_size: int, req_roles: Dict[str, int],
+                            compatibility_matrix: Optional[np.ndarray] = None) -> List[List[Student]]:
     """딥러닝 모델을 사용한 팀 매칭 알고리즘"""
     if len(students) < team_size:
         return [students]  # 학생 수가 팀 크기보다 작으면 모두 한 팀으로
     
-    # 호환성 점수 예측
-    compatibility_matrix = predict_compatibility(model, students)
-    
-    # 팀 구성 알고리즘 (그리디 접근법)
-    remaining = list(range(len(students)))
-    teams = []
-    
-    # 역할 선호도 기반 정렬 (PM 우선)
-    role_priority = {"PM": 0, "FE": 1, "BE": 2, "Design": 3, "Any": 4}
-    remaining.sort(key=lambda i: (role_priority.get(students[i].role_pref, 4), -students[i].C))
-    
-    while remaining:
-        # 새 팀 시작
-        curr_team = [remaining.pop(0)]  # 첫 번째 학생으로 시작
-        
-        # 팀 완성
-        while len(curr_team) < team_size and remaining:
-            # 현재 팀과 가장 호환성이 높은 학생 찾기
-            best_idx, best_score = -1, -1
-            for i, student_idx in enumerate(remaining):
-                # 현재 팀원들과의 평균 호환성 계산
-                avg_score = sum(compatibility_matrix[student_idx, team_idx] for team_idx in curr_team) / len(curr_team)
-                
-                # 역할 커버리지 보너스 계산
-                role_bonus = 0
-                if students[student_idx].role_pref in req_roles:
-                    # 현재 팀의 역할 카운트
-                    role_counts = {}
-                    for idx in curr_team:
-                        role = students[idx].role_pref
-                        role_counts[role] = role_counts.get(role, 0) + 1
-                    
-                    # 필요한 역할이고 아직 충족되지 않았으면 보너스
-                    role = students[student_idx].role_pref
-                    if role_counts.get(role, 0) < req_roles.get(role, 0):
-                        role_bonus = 0.1
-                
-                # 최종 점수 = 호환성 + 역할 보너스
-                score = avg_score + role_bonus
-                
-                if score > best_score:
-                    best_idx, best_score = i, score
-            
-            # 가장 좋은 학생 추가
-            if best_idx >= 0:
-                curr_team.append(remaining.pop(best_idx))
-            else:
-                break
-        
-        # 팀 추가
-        teams.append([students[idx] for idx in curr_team])
-    
-    return teams
+    table = StudentTable(students)
+    # 호환성 점수 예측 (호출자가 이미 계산했다면 재사용)
+    if compatibility_matrix is None:
+        compatibility_matrix = predict_compatibility(model, table)
+    return [table.take(t) for t in greedy_team_indices(table, team_size, req_roles, compatibility_matrix)]
+
 
 def calculate_team_score(team: List[Student], compatibility_matrix: np.ndarray, req_roles: Dict[str, int]) -> float:
     """팀 점수 계산"""
@@ -0,0 +1,100 @@
+import os
+import json
+import time
+import shutil
+import numpy as np
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+from app.models import TeamData
+from app.data_processor import PAIR_FEATURE_DIM, create_pair_features_batch, team_pair_table
+
+# 한 번에 만들어 쓰는 쌍 특성 행 수 (96열 float64 기준 약 48MB)
+WRITE_CHUNK_PAIRS = 65536
+
+
+class FeatureStore:
+    """학습용 쌍 특성/레이블 저장소
+
+    데이터셋마다 <root>/<name>/ 디렉토리에 features.npy (P, 96) float32, labels.npy (P,) float32,
+    meta.json을 둔다. open()은 np.load(mmap_mode="r")로 열기 때문에 학습/평가 시 전체를 메모리에 올리지 않는다.
+    """
+
+    def __init__(self, root: str):
+        self.root = root
+        os.makedirs(root, exist_ok=True)
+
+    def path(self, name: str) -> str:
+        return os.path.join(self.root, name)
+
+    def write_teams(self, name: str, teams: List[TeamData], meta: Optional[Dict[str, Any]] = None) -> str:
+        """팀 목록의 쌍 특성/레이블 저장"""
+        features, left, right, labels = team_pair_table(teams)
+        return self.write_pairs(name, features, left, right, labels, dict(meta or {}, teams=len(teams)))
+
+    def write_pairs(self, name: str, features: np.ndarray, left: np.ndarray, right: np.ndarray, labels: np.ndarray,
+                    meta: Optional[Dict[str, Any]] = None) -> str:
+        """(학생 특성, 쌍 인덱스, 레이블)로 쌍 특성을 청크 단위로 만들어 저장 (쌍 특성 전체를 메모리에 만들지 않음)"""
+        tmp = self.path(f".{name}.tmp")
+        shutil.rmtree(tmp, ignore_errors=True)
+        os.makedirs(tmp)
+        path = os.path.join(tmp, "features.npy")
+        if len(left) == 0:
+            # 빈 파일은 memmap으로 만들 수 없다
+            np.save(path, np.zeros((0, PAIR_FEATURE_DIM), dtype=np.float32))
+        else:
+            X = np.lib.format.open_memmap(path, mode="w+", dtype=np.float32, shape=(len(left), PAIR_FEATURE_DIM))
+            for start in range(0, len(left), WRITE_CHUNK_PAIRS):
+                stop = start + WRITE_CHUNK_PAIRS
+                X[start:stop] = create_pair_features_batch(features, left[start:stop], right[start:stop])
+            X.flush()
+            del X
+        np.save(os.path.join(tmp, "labels.npy"), labels)
+        info = dict(meta or {}, pairs=int(len(left)), created_at=time.time())
+        with open(os.path.join(tmp, "meta.json"), "w", encoding="utf-8") as f:
+            json.dump(info, f, ensure_ascii=False)
+        return self._publish(tmp, name)
+
+    def write(self, name: str, X: np.ndarray, y: np.ndarray, meta: Optional[Dict[str, Any]] = None) -> str:
+        """이미 만든 (X, y) 배열 저장"""
+        tmp = self.path(f".{name}.tmp")
+        shutil.rmtree(tmp, ignore_errors=True)
+        os.makedirs(tmp)
+        np.save(os.path.join(tmp, "features.npy"), np.asarray(X, dtype=np.float32))
+        np.save(os.path.join(tmp, "labels.npy"), np.asarray(y, dtype=np.float32))
+        with open(os.path.join(tmp, "meta.json"), "w", encoding="utf-8") as f:
+            json.dump(dict(meta or {}, pairs=int(len(y)), created_at=time.time()), f, ensure_ascii=False)
+        return self._publish(tmp, name)
+
+    def _publish(self, tmp: str, name: str) -> str:
+        # 다 쓴 디렉토리를 이름만 바꿔 공개하므로 읽는 쪽이 반쯤 쓴 파일을 보지 않는다
+        final = self.path(name)
+        shutil.rmtree(final, ignore_errors=True)
+        os.replace(tmp, final)
+        return final
+
+    def open(self, name: str) -> Tuple[np.ndarray, np.ndarray, Dict[str, Any]]:
+        return open_features(self.path(name))
+
+    def names(self) -> List[str]:
+        """저장된 데이터셋 이름 (오래된 순)"""
+        names = [n for n in os.listdir(self.root)
+                 if not n.startswith(".") and os.path.exists(os.path.join(self.root, n, "meta.json"))]
+        return sorted(names, key=lambda n: os.path.getmtime(os.path.join(self.root, n, "meta.json")))
+
+    def remove(self, name: str):
+        shutil.rmtree(self.path(name), ignore_errors=True)
+
+    def prune(self, keep: int, protect: Sequence[str] = ()):
+        """최근 keep개 데이터셋만 남김 (protect에 있는 이름은 지우지 않음)"""
+        names = self.names()
+        for name in names[:max(0, len(names) - keep)]:
+            if name not in protect:
+                self.remove(name)
+
+
+def open_features(path: str) -> Tuple[np.ndarray, np.ndarray, Dict[str, Any]]:
+    """저장된 데이터셋을 memmap으로 열기 (features, labels, meta)"""
+    X = np.load(os.path.join(path, "features.npy"), mmap_mode="r")
+    y = np.load(os.path.join(path, "labels.npy"), mmap_mode="r")
+    with open(os.path.join(path, "meta.json"), encoding="utf-8") as f:
+        meta = json.load(f)
+    return X, y, meta
@@ -0,0 +1,206 @@
+import numpy as np
+from typing import Dict, List, Optional, Sequence, Set, Tuple
+from app.student_table import StudentTable
+from app.compatibility import CompatibilityMatrix, pair_score_matrix, pair_scores, team_sizes
+from app.availability import availability_jaccard_pairs
+from app.balancing import balance_teams
+
+
+class LocalScores:
+    """코호트 전체 N×N 행렬 없이 필요한 부분만 계산하는 쌍 점수 (증분 재매칭용)
+
+    새로 배치할 학생은 전체 학생과의 행을, 기존 팀은 팀 안의 쌍만 계산하므로
+    비용이 N²이 아니라 (바뀐 학생 수 × N + 팀 수 × m²)에 비례한다.
+    team_out이 쓰는 team_internal_score / mean_availability를 CompatibilityMatrix와 같은 값으로 제공한다.
+    """
+
+    def __init__(self, table: StudentTable, weights: Dict[str, float]):
+        self.table = table
+        self.weights = weights
+        self._rows: Dict[int, np.ndarray] = {}
+        self._pairs: Dict[Tuple[int, ...], Tuple[np.ndarray, np.ndarray]] = {}
+
+    def rows(self, idx: Sequence[int]) -> np.ndarray:
+        """idx 학생들과 전체 학생 간 점수 (len(idx) × N, 계산한 행은 재사용)"""
+        missing = [i for i in idx if i not in self._rows]
+        if missing:
+            rows = np.asarray(missing, dtype=np.intp)
+            avail = self.table.avail_index.jaccard(rows)
+            block = pair_score_matrix(self.table.ocean[rows], avail, self.weights, other=self.table.ocean)
+            self._rows.update(zip(missing, block))
+        return np.array([self._rows[i] for i in idx]).reshape(len(idx), len(self.table))
+
+    def prepare(self, teams: Sequence[Sequence[int]]):
+        """팀들의 팀 안 쌍 (가용시간 Jaccard, 쌍 점수)를 combinations 순서로 계산 (같은 크기 팀끼리 한 번에)"""
+        by_size: Dict[int, List[Tuple[int, ...]]] = {}
+        for team in teams:
+            key = tuple(team)
+            if key not in self._pairs:
+                by_size.setdefault(len(key), []).append(key)
+        index = self.table.avail_index
+        for size, keys in by_size.items():
+            members = np.array(keys, dtype=np.intp).reshape(len(keys), size)
+            a, b = (members[:, p].ravel() for p in np.triu_indices(size, 1))
+            avail = availability_jaccard_pairs(index.masks[a], index.masks[b])
+            scores = pair_scores(self.table.ocean[a], self.table.ocean[b], avail, self.weights)
+            n_pairs = size * (size - 1) // 2
+            for k, key in enumerate(keys):
+                self._pairs[key] = avail[k * n_pairs:(k + 1) * n_pairs], scores[k * n_pairs:(k + 1) * n_pairs]
+
+    def pairs(self, idx: Sequence[int]) -> Tuple[np.ndarray, np.ndarray]:
+        key = tuple(idx)
+        if key not in self._pairs:
+            self.prepare([key])
+        return self._pairs[key]
+
+    def contributions(self, idx: Sequence[int]) -> np.ndarray:
+        """팀원별로 같은 팀 다른 팀원과의 점수 합"""
+        scores = self.pairs(idx)[1]
+        a, b = np.triu_indices(len(idx), 1)
+        return np.bincount(a, scores, len(idx)) + np.bincount(b, scores, len(idx))
+
+    def pair_sum(self, idx: Sequence[int]) -> float:
+        return float(self.pairs(idx)[1].sum())
+
+    def team_internal_score(self, idx: Sequence[int]) -> float:
+        """CompatibilityMatrix.team_internal_score와 같은 순서로 합산"""
+        if len(idx) < 2:
+            return 0.0
+        scores = self.pairs(idx)[1].tolist()
+        return sum(scores) / len(scores)
+
+    def mean_availability(self, idx: Sequence[int]) -> float:
+        n = len(idx)
+        return sum(self.pairs(idx)[0].tolist()) / max(1, n * (n - 1) / 2)
+
+
+def _value(pair_sum: float, size: int, bonus: float) -> float:
+    """team_score와 같은 식 (반올림 전)"""
+    n_pairs = size * (size - 1) // 2
+    return (pair_sum / n_pairs if n_pairs else 0.0) + bonus
+
+
+def _away(home: Sequence[int], student: int, team: int) -> int:
+    """student가 team에 있을 때 원래 팀을 떠난 상태인지 (새 학생은 원래 팀이 없으므로 0)"""
+    return int(home[student] >= 0 and home[student] != team)
+
+
+def place_students(scores: LocalScores, teams: List[List[int]], home: Sequence[int], added: Sequence[int],
+                   team_size: int, req_roles: Dict[str, int], max_moved: int
+                   ) -> Tuple[List[List[int]], List[Optional[int]], Set[int]]:
+    """기존 배정(teams)에 새 학생(added)을 넣고 빈자리를 채운다 → (팀, 팀별 원래 위치, 바뀐 팀 위치)
+
+    teams는 빠진 학생을 이미 뺀 기존 팀(위치 유지, 빈 팀 포함), home은 학생별 원래 팀 위치(새 학생은 -1).
+    1) 새 학생을 (PM 여부, C) 내림차순으로 하나씩, 팀 내부 평균 점수 + 역할 보너스의 한계 이득이 가장 큰 팀에 넣는다.
+       정원(ceil(N / 팀 수)) 미만인 팀만 후보이고, 최소 인원(N // 팀 수)에 못 미치는 팀이 있으면 그 팀들이 먼저다.
+    2) 그래도 최소 인원에 못 미치는 팀은 인원이 남는 팀에서 두 팀 점수 합이 가장 좋아지는 학생을 데려온다.
+       원래 팀을 떠나는 기존 학생 수는 max_moved를 넘지 않는다 (새 학생은 세지 않음).
+    팀 수는 기존 팀 수와 team_sizes(N, team_size)의 팀 수 중 큰 값이고, 늘어난 팀은 비어 있던 팀 자리부터 쓴 뒤 뒤에 붙인다.
+    """
+    table = scores.table
+    n = len(table)
+    teams = [list(t) for t in teams]
+    origin: List[Optional[int]] = list(range(len(teams)))
+    active = [t for t, members in enumerate(teams) if members]
+    spare = [t for t, members in enumerate(teams) if not members]
+    target = max(len(active), len(team_sizes(n, team_size)), 1)
+    while len(active) < target:
+        if spare:
+            active.append(spare.pop(0))
+        else:
+            teams.append([])
+            origin.append(None)
+            active.append(len(teams) - 1)
+    active.sort()
+    floor, cap = n // target, -(-n // target)
+    scores.prepare([teams[t] for t in active])
+    sums = {t: scores.pair_sum(teams[t]) for t in active}
+    touched: Set[int] = set()
+
+    def bonus(members: List[int]) -> float:
+        return table.role_bonus(members, req_roles)
+
+    # 1) 새 학생 배치 (greedy_order와 같은 순서)
+    for s in sorted(added, key=lambda i: (not table.is_pm[i], -table.C[i])):
+        row = scores.rows([s])[0]
+        open_teams = [t for t in active if len(teams[t]) < cap]
+        short = [t for t in open_teams if len(teams[t]) < floor]
+        best, best_gain, best_cross = None, -np.inf, 0.0
+        for t in short or open_teams or active:
+            members = teams[t]
+            cross = float(row[members].sum()) if members else 0.0
+            gain = (_value(sums[t] + cross, len(members) + 1, bonus(members + [s]))
+                    - _value(sums[t], len(members), bonus(members)))
+            if gain > best_gain:
+                best, best_gain, best_cross = t, gain, cross
+        teams[best].append(s)
+        sums[best] += best_cross
+        touched.add(best)
+
+    # 2) 빈자리 채우기: 인원이 남는 팀의 학생을 옮긴다
+    moved = 0
+    while True:
+        short = [t for t in active if len(teams[t]) < floor]
+        donors = [t for t in active if len(teams[t]) > floor]
+        if not short or not donors:
+            break
+        best, best_delta = None, -np.inf
+        for r in short:
+            recv = teams[r]
+            cross = scores.rows(recv).sum(axis=0) if recv else np.zeros(n)
+            base_r = _value(sums[r], len(recv), bonus(recv))
+            for d in donors:
+                donor = teams[d]
+                contrib = scores.contributions(donor)
+                base_d = _value(sums[d], len(donor), bonus(donor))
+                for k, c in enumerate(donor):
+                    cost = _away(home, c, r) - _away(home, c, d)
+                    if moved + cost > max_moved:
+                        continue
+                    rest = donor[:k] + donor[k + 1:]
+                    delta = (_value(sums[r] + float(cross[c]), len(recv) + 1, bonus(recv + [c])) - base_r
+                             + _value(sums[d] - float(contrib[k]), len(rest), bonus(rest)) - base_d)
+                    if delta > best_delta:
+                        best, best_delta = (r, d, k, float(cross[c]), float(contrib[k]), cost), delta
+        if best is None:
+            break
+        r, d, k, cross_c, contrib_c, cost = best
+        c = teams[d].pop(k)
+        teams[r].append(c)
+        sums[r] += cross_c
+        sums[d] -= contrib_c
+        moved += cost
+        touched.update((r, d))
+    return teams, origin, touched
+
+
+def repair_teams(scores: LocalScores, teams: List[List[int]], touched: Set[int], home: Sequence[int],
+                 req_roles: Dict[str, int], max_moved: int, max_iterations: int = 50) -> List[List[int]]:
+    """바뀐 팀들끼리만 balance_teams 교환으로 점수 균형을 맞춘다 (teams를 제자리에서 바꾸고 반환)
+
+    바뀐 팀 학생들만으로 작은 CompatibilityMatrix를 만들어 교환하므로 나머지 팀은 그대로이고,
+    원래 팀을 떠난 기존 학생 수는 max_moved를 넘지 않는다.
+    """
+    positions = sorted(t for t in touched if teams[t])
+    if len(positions) < 2:
+        return teams
+    table = scores.table
+    local = [i for t in positions for i in teams[t]]
+    sub = StudentTable.from_columns([table.ids[i] for i in local], table.ocean[local],
+                                    [table.role_pref[i] for i in local], [table.availability[i] for i in local])
+    matrix = CompatibilityMatrix(sub, scores.weights)
+    where = {t: p for p, t in enumerate(positions)}
+    # 바뀌지 않은 팀 출신은 (있을 수 없지만) 항상 원래 팀을 떠난 것으로 센다
+    local_home = [where.get(home[i], len(positions)) if home[i] >= 0 else -1 for i in local]
+    offsets = np.cumsum([0] + [len(teams[t]) for t in positions])
+    local_teams = [list(range(offsets[p], offsets[p + 1])) for p in range(len(positions))]
+    balance_teams(matrix, local_teams, req_roles, swap_keys=sub.role_pref, roles=sub.roles,
+                  max_iterations=max_iterations, home=local_home, max_moves=max_moved)
+    for t, members in zip(positions, local_teams):
+        teams[t] = [local[k] for k in members]
+    return teams
+
+
+def moved_students(teams: Sequence[Sequence[int]], home: Sequence[int]) -> List[int]:
+    """원래 팀을 떠난 기존 학생 (teams의 위치 기준)"""
+    return [i for t, members in enumerate(teams) for i in members if _away(home, i, t)]
@@ -0,0 +1,155 @@
+import time
+import asyncio
+import functools
+import contextvars
+import multiprocessing
+import multiprocessing.util
+from collections import deque
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Any, Callable, Deque, Dict, Optional
+from app.metrics import METRICS, record_stage
+
+
+class LaneFull(Exception):
+    """레인의 대기열이 가득 차서 요청을 받을 수 없음 (엔드포인트에서 429로 응답)"""
+
+    def __init__(self, lane: str):
+        super().__init__(lane)
+        self.lane = lane
+
+
+class Lane:
+    """동시 실행 수와 대기열 길이가 정해진 실행 레인
+
+    요청은 이벤트 루프에서 자리(슬롯)를 기다리고, 자리를 얻으면 레인 전용 실행기에서 실행된다.
+    동시 실행이 max_concurrency개이고 대기 중인 요청이 max_queue개이면 새 요청은 기다리지 않고 LaneFull로 거절한다.
+    processes > 0이면 실행기는 spawn 프로세스 풀(GIL을 나눠 쓰지 않음), 0이면 레인 전용 스레드 풀이다.
+    """
+
+    def __init__(self, name: str, max_concurrency: int, max_queue: int, processes: int = 0):
+        self.name = name
+        self.max_concurrency = max(1, max_concurrency)
+        self.max_queue = max(0, max_queue)
+        self.processes = processes
+        self.active = 0
+        self.rejected = 0
+        self.completed = 0
+        self._waiters: Deque[asyncio.Future] = deque()
+        self._pool: Optional[ProcessPoolExecutor] = None
+        self._threads: Optional[ThreadPoolExecutor] = None
+        self._publish()
+
+    @property
+    def kind(self) -> str:
+        return "process" if self.processes > 0 else "thread"
+
+    def _publish(self):
+        METRICS.set(METRICS.lane_waiting, len(self._waiters), lane=self.name)
+        METRICS.set(METRICS.lane_active, self.active, lane=self.name)
+
+    async def acquire(self) -> float:
+        """자리를 얻을 때까지 기다린다 → 기다린 시간(초), 대기열이 가득 차면 LaneFull"""
+        started = time.perf_counter()
+        if self.active < self.max_concurrency and not self._waiters:
+            self.active += 1
+        else:
+            if len(self._waiters) >= self.max_queue:
+                self.rejected += 1
+                METRICS.inc(METRICS.lane_rejected, lane=self.name)
+                raise LaneFull(self.name)
+            waiter = asyncio.get_running_loop().create_future()
+            self._waiters.append(waiter)
+            self._publish()
+            try:
+                await waiter
+            except asyncio.CancelledError:
+                # 자리를 넘겨받은 직후에 취소되었으면 자리를 돌려준다
+                if waiter.cancelled():
+                    if waiter in self._waiters:
+                        self._waiters.remove(waiter)
+                else:
+                    self.release(ran=False)
+                self._publish()
+                raise
+        self._publish()
+        waited = time.perf_counter() - started
+        METRICS.observe(METRICS.lane_wait_seconds, waited, lane=self.name)
+        return waited
+
+    def release(self, ran: bool = True):
+        """자리 반납 (기다리는 요청이 있으면 자리를 그대로 넘긴다, 이벤트 루프에서만 호출)
+
+        ran=False이면 자리만 잡고 실행하지 못한 경우(취소, 실행기 제출 실패)로 completed에 세지 않는다.
+        """
+        if ran:
+            self.completed += 1
+        while self._waiters:
+            waiter = self._waiters.popleft()
+            if not waiter.done():
+                waiter.set_result(None)
+                break
+        else:
+            self.active -= 1
+        self._publish()
+
+    async def run(self, fn: Callable, *args: Any, local: bool = False) -> Any:
+        """자리를 얻어 fn(*args)를 레인 실행기에서 실행 (대기 시간은 queue 단계로 기록)
+
+        local=True이면 프로세스 레인이라도 이 프로세스의 레인 스레드에서 실행한다
+        (자체 프로세스 풀을 쓰는 작업을 워커 안에서 다시 풀로 띄우지 않기 위해). 동시 실행 수는 똑같이 센다.
+        스레드에서 실행할 때는 현재 contextvars(요청 타이밍/라벨)를 그대로 넘긴다.
+        """
+        record_stage("queue", await self.acquire())
+        loop = asyncio.get_running_loop()
+        try:
+            if self.processes > 0 and not local:
+                future = loop.run_in_executor(self._process_pool(), fn, *args)
+            else:
+                ctx = contextvars.copy_context()
+                future = loop.run_in_executor(self._thread_pool(), functools.partial(ctx.run, fn, *args))
+        except BaseException:
+            self.release(ran=False)
+            raise
+        # 요청이 끊겨도 실행이 끝날 때 자리를 반납한다 (shield: 요청 취소가 실행 중인 작업의 future를 취소하지 않도록,
+        # 실행 전에 취소된 작업(레인 종료)은 completed에 세지 않는다)
+        future.add_done_callback(lambda f: self.release(ran=not f.cancelled()))
+        try:
+            return await asyncio.shield(future)
+        except BrokenProcessPool:
+            # 워커가 죽으면 풀을 버리고 다음 요청에서 새로 띄운다
+            self._pool = None
+            raise
+
+    def _process_pool(self) -> Executor:
+        # 부모 프로세스에 TensorFlow가 로드되어 있을 수 있으므로 fork 대신 spawn (multistart와 동일)
+        if self._pool is None:
+            self._pool = ProcessPoolExecutor(max_workers=self.processes, mp_context=multiprocessing.get_context("spawn"))
+            # 프로세스가 끝날 때 자식 프로세스를 join하기 전에 워커를 내린다 (이 프로세스가 multiprocessing 자식이어도 동작,
+            # 풀의 내부 큐가 닫히기 전에 종료 신호가 전달되도록 큐 finalizer(우선순위 10)보다 먼저 실행)
+            multiprocessing.util.Finalize(None, self._pool.shutdown, kwargs={"wait": True, "cancel_futures": True},
+                                          exitpriority=20)
+        return self._pool
+
+    def _thread_pool(self) -> Executor:
+        if self._threads is None:
+            self._threads = ThreadPoolExecutor(max_workers=self.max_concurrency, thread_name_prefix=f"lane-{self.name}")
+        return self._threads
+
+    def start(self, warmup: Optional[Callable[[], Any]] = None):
+        """프로세스 레인이면 워커를 미리 띄워 warmup을 실행한다 (첫 요청이 프로세스 시작/임포트 시간을 기다리지 않도록)"""
+        if self.processes > 0 and warmup is not None:
+            pool = self._process_pool()
+            for _ in range(self.processes):
+                pool.submit(warmup)
+
+    def shutdown(self):
+        for executor in (self._pool, self._threads):
+            if executor is not None:
+                executor.shutdown(wait=False, cancel_futures=True)
+        self._pool = self._threads = None
+
+    def stats(self) -> Dict[str, Any]:
+        return {"kind": self.kind, "workers": self.processes if self.processes > 0 else self.max_concurrency,
+                "max_concurrency": self.max_concurrency, "max_queue": self.max_queue, "active": self.active,
+                "queued": len(self._waiters), "rejected": self.rejected, "completed": self.completed}
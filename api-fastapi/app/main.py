@@ -1,45 +1,146 @@
 
-from fastapi import FastAPI, HTTPException, Header, Depends
-from pydantic import BaseModel, Field
-from typing import Dict, List, Optional
-from math import isfinite
+import time
+_BOOT_STARTED = time.perf_counter()
+
+from contextlib import asynccontextmanager
+from fastapi import FastAPI, HTTPException, Header, Depends, Request, Response, BackgroundTasks
+from fastapi.responses import FileResponse, JSONResponse, ORJSONResponse, PlainTextResponse, StreamingResponse
+from fastapi.exceptions import RequestValidationError
+from starlette.concurrency import iterate_in_threadpool
+from pydantic import BaseModel, Field, ValidationError
+from typing import Any, Dict, List, Optional, Tuple
+from concurrent.futures import ThreadPoolExecutor
 import os
+import json
+import uuid
 import numpy as np
 from dotenv import load_dotenv
 
+try:
+    import orjson
+except ImportError:  # requirements.txt에 있지만, 없는 환경에서는 빠른 경로도 표준 json으로 직렬화
+    orjson = None
+
 # Load environment variables
 load_dotenv()
 
-# 딥러닝 모델 관련 모듈 임포트
+# 딥러닝(TensorFlow) 관련 모듈은 처음 필요할 때 임포트한다 (app.model_registry.deep_module)
+# 서빙 경로(/match/run_deep)는 TensorFlow를 임포트하지 않는 app.deep_inference만 쓴다
 from app.models import Student, TeamData
-from app.data_processor import extract_student_features, prepare_training_data, save_team_data, load_team_data
-from app.deep_matching import DeepMatchingModel, train_model, load_model, greedy_match_with_model
+from app.data_processor import team_pair_table
+from app.compatibility import CompatibilityMatrix, bucketed_assign, iter_bucketed_assign, weights_namespace
+from app.student_table import StudentTable
+from app.availability import availability_overlap
+from app.balancing import balance_teams
+from app.multistart import multistart_match, shutdown_pool
+from app.optimal import optimal_match
+from app.compat_cache import CompatCache
+from app.model_registry import ModelRegistry, inference_module
+from app.training_jobs import TrainingJobManager
+from app.feature_store import FeatureStore
+from app.team_history import TeamHistoryStore, DEFAULT_COHORT, DEFAULT_TERM
+from app.metrics import (METRICS, MetricsMiddleware, collect_stages, mark_serialization, merge_stages, observe_cohort,
+                         record_stage, set_label, stage, timed_endpoint)
+from app.profiling import PROFILE_MODES, ProfileStore
+from app.lanes import Lane, LaneFull
+from app.result_cache import IdempotencyConflict, ResultCache, request_key
+from app.incremental import LocalScores, moved_students, place_students, repair_teams
+
+# 딥러닝 모델 초기화
+MODEL_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "models")
+os.makedirs(MODEL_PATH, exist_ok=True)
+# DEEP_BACKEND=numpy이면 /match/run_deep이 TensorFlow 없이 lite.npz 가중치의 NumPy 순전파로 추론한다
+# (DEEP_QUANTIZE=float16|int8이면 가중치 양자화)
+MODEL_REGISTRY = ModelRegistry(MODEL_PATH, backend=os.getenv("DEEP_BACKEND", "keras"),
+                               quantize=os.getenv("DEEP_QUANTIZE", "none"))
+# 학습은 별도 프로세스에서 한 번에 하나씩 실행하고, 끝나면 새 버전으로 교체
+# 학습 데이터(쌍 특성/레이블)는 특성 저장소에 memmap 가능한 .npy로 쓴다
+FEATURE_STORE = FeatureStore(os.path.join(MODEL_PATH, "features"))
+TRAINING_JOBS = TrainingJobManager(MODEL_REGISTRY, FEATURE_STORE)
+# 팀 이력 (코호트/학기별 Parquet 파티션, 매칭 실행마다 추가)
+TEAM_HISTORY = TeamHistoryStore(os.getenv("TEAM_HISTORY_DIR") or os.path.join(MODEL_PATH, "history"))
+RECORD_MATCH_HISTORY = os.getenv("RECORD_MATCH_HISTORY", "1") == "1"
+# 이력 쓰기 전용 스레드: 요청(연결)과 무관하게 결과마다 한 번, 순서대로 추가한다
+HISTORY_WRITER = ThreadPoolExecutor(max_workers=1, thread_name_prefix="team-history")
+# 요청 단위 프로파일 (?profile=cprofile|sample), 최근 PROFILE_KEEP개만 보관
+PROFILING_ENABLED = os.getenv("PROFILING_ENABLED", "1") == "1"
+PROFILES = ProfileStore(os.getenv("PROFILE_DIR") or os.path.join(MODEL_PATH, "profiles"),
+                        keep=int(os.getenv("PROFILE_KEEP", "50")))
+# 1이면 시작 시 백그라운드에서 모델 로드/워밍업, 0이면 첫 딥러닝 요청 때 로드
+DEEP_MODEL_WARMUP = os.getenv("DEEP_MODEL_WARMUP", "1") == "1"
+# 딥러닝 요청이 모델 로드를 기다리는 최대 시간 (초)
+DEEP_MODEL_WAIT_S = float(os.getenv("DEEP_MODEL_WAIT_S", "30"))
+STARTUP_MS: Optional[float] = None
+
+# 실행 레인: 가벼운 엔드포인트(채점, 상태 조회)는 이벤트 루프에서 바로 처리하고,
+# CPU를 오래 쓰는 매칭/딥러닝/학습 요청은 각자의 레인에서 동시 실행 수와 대기열 길이를 제한해 실행한다 (가득 차면 429)
+# 매칭: MATCH_WORKERS개 spawn 프로세스 (0이면 이 프로세스의 스레드), 기본 CPU 수
+# 동시 실행 수 MATCH_CONCURRENCY는 기본 워커 수(스레드면 1), 대기열 MATCH_QUEUE는 기본 16
+MATCH_WORKERS = int(os.getenv("MATCH_WORKERS", str(os.cpu_count() or 1)))
+MATCH_LANE = Lane("match", int(os.getenv("MATCH_CONCURRENCY", "0")) or max(1, MATCH_WORKERS),
+                  int(os.getenv("MATCH_QUEUE", "16")), processes=MATCH_WORKERS)
+# 딥러닝 매칭: 모델이 이 프로세스에 있으므로 전용 스레드에서 실행 (추론은 GIL을 놓는다)
+DEEP_LANE = Lane("deep", int(os.getenv("DEEP_CONCURRENCY", "1")), int(os.getenv("DEEP_QUEUE", "4")))
+# 학습 데이터 준비 (학습 자체는 TrainingJobManager의 별도 프로세스)
+TRAIN_LANE = Lane("train", 1, int(os.getenv("TRAIN_QUEUE", "2")))
+LANES = (MATCH_LANE, DEEP_LANE, TRAIN_LANE)
 
-app = FastAPI(title="NeXeed AI Service", version="0.2.0")
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    global STARTUP_MS
+    if DEEP_MODEL_WARMUP:
+        MODEL_REGISTRY.start_warmup()
+    # 매칭 워커 프로세스는 백그라운드에서 미리 띄워 둔다
+    MATCH_LANE.start(_match_worker_warmup)
+    STARTUP_MS = round((time.perf_counter() - _BOOT_STARTED) * 1000, 1)
+    print(f"서버 시작 준비 완료 ({STARTUP_MS}ms)")
+    yield
+    for lane in LANES:
+        lane.shutdown()
+    TRAINING_JOBS.shutdown()
+    shutdown_pool()
+    HISTORY_WRITER.shutdown(wait=True)
+
+app = FastAPI(title="NeXeed AI Service", version="0.2.0", lifespan=lifespan)
+# 요청 수/단계별 지연 시간 집계 (/metrics), X-Timing 응답 헤더
+app.add_middleware(MetricsMiddleware)
 
 # API Key Authentication
 API_KEY = os.getenv("API_KEY", "nexeed-ai-key-2024")
 
-def verify_api_key(x_api_key: str = Header(None)):
+async def verify_api_key(x_api_key: str = Header(None)):
     if x_api_key != API_KEY:
         raise HTTPException(status_code=401, detail="Invalid API Key")
     return x_api_key
 
-# 딥러닝 모델 초기화
-MODEL_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "models")
-os.makedirs(MODEL_PATH, exist_ok=True)
-DEEP_MODEL = None
+# 코호트별 쌍 호환성 행렬 캐시 (메모리 한도 초과분은 선택적으로 디스크로)
+COMPAT_CACHE = CompatCache(
+    max_bytes=int(os.getenv("COMPAT_CACHE_MB", "256")) * 1024 * 1024,
+    spill_dir=os.getenv("COMPAT_CACHE_SPILL_DIR") or None,
+)
 
-# 모델 로드 시도
-try:
-    DEEP_MODEL = load_model(os.path.join(MODEL_PATH, "team_matching_model"))
-    if DEEP_MODEL is not None:
-        print("딥러닝 모델 로드 성공")
-    else:
-        print("딥러닝 모델이 없습니다. 기본 그리디 알고리즘을 사용합니다.")
-except Exception as e:
-    print("딥러닝 모델이 없습니다. 기본 그리디 알고리즘을 사용합니다.")
-    print("새 모델이 필요할 경우 /match/train 엔드포인트를 사용하세요.")
+# 같은 매칭 요청의 완료된 응답 캐시와 동시 실행 합치기 (MATCH_RESULT_CACHE_SIZE=0이면 합치기만 한다)
+RESULT_CACHE = ResultCache(int(os.getenv("MATCH_RESULT_CACHE_SIZE", "64")),
+                           float(os.getenv("MATCH_RESULT_CACHE_TTL_S", "300")))
+
+@app.get("/ready")
+async def ready(model: bool = False):
+    """준비 상태 확인
+
+    기본 엔드포인트(/score, /match/run)는 시작 즉시 준비된다.
+    model=true이면 딥러닝 모델이 준비되지 않은 동안 503을 반환한다.
+    lanes는 실행 레인별 동시 실행/대기 요청 수와 거절(429) 횟수.
+    """
+    body = {"status": "ok", "startup_ms": STARTUP_MS, "model": MODEL_REGISTRY.status(),
+            "lanes": {lane.name: lane.stats() for lane in LANES}}
+    if model and body["model"]["state"] != "ready":
+        return JSONResponse(status_code=503, content=body)
+    return body
+
+@app.get("/metrics")
+async def metrics():
+    """Prometheus 텍스트 형식 지표 (요청 수, 요청/단계별 지연 시간, 코호트 크기, 추론 배치 크기, 레인 대기열)"""
+    return PlainTextResponse(METRICS.render(), media_type="text/plain; version=0.0.4")
 
 # ----- Scoring -----
 
@@ -64,36 +165,117 @@ def reverse_code(x:int, scale:int) -> int:
 def to_01(avg: float, scale:int) -> float:
     return round((avg - 1.0) / (scale - 1.0), 4)
 
+# 문항 번호 → 성격 요소 (1-6 O, 7-12 C, 13-18 E, 19-24 A, 25-30 N)와 역문항 마스크를 한 번만 계산
+TRAITS = ("O", "C", "E", "A", "N")
+QUESTION_KEYS = tuple(f"Q{i}" for i in range(1, 31))
+QUESTION_TRAIT = np.repeat(np.arange(len(TRAITS)), 6)
+REVERSE_MASK = np.array([i in REVERSE[TRAITS[QUESTION_TRAIT[i-1]]] for i in range(1, 31)])
+
+def validate_answers(answers: Dict[str,int], scale: int) -> Optional[str]:
+    """응답 하나의 오류 메시지 (문제가 없으면 None)"""
+    if scale not in (5,7):
+        return "scale must be 5 or 7"
+    for key in QUESTION_KEYS:
+        if key not in answers:
+            return f"Missing {key}"
+        if not (1 <= answers[key] <= scale):
+            return f"{key} out of range"
+    return None
+
+def score_answer_matrix(answers: np.ndarray, scales: np.ndarray) -> List[List[float]]:
+    """(M,30) 응답 행렬을 행별 OCEAN 점수 5개 목록으로 한 번에 변환
+
+    역문항 뒤집기와 요소별 평균을 벡터 연산으로 처리하고, 반올림은 to_01과 같은 결과가 되도록
+    Python round를 사용한다.
+    """
+    scales = scales.reshape(-1, 1)
+    coded = np.where(REVERSE_MASK[None, :], (scales + 1) - answers, answers)
+    avg = coded.reshape(len(coded), len(TRAITS), 6).sum(axis=2) / 6
+    raw = (avg - 1.0) / (scales - 1.0)
+    return [[round(v, 4) for v in row] for row in raw.tolist()]
+
 @app.post("/score/bigfive", response_model=OCEAN)
-def score_bigfive(req: ScoreRequest):
-    if req.scale not in (5,7):
-        raise HTTPException(400, "scale must be 5 or 7")
-    groups = {"O":[], "C":[], "E":[], "A":[], "N":[]}
-    for i in range(1,31):
-        key = f"Q{i}"
-        if key not in req.answers:
-            raise HTTPException(400, f"Missing {key}")
-        v = req.answers[key]
-        if not (1 <= v <= req.scale):
-            raise HTTPException(400, f"{key} out of range")
-        if i in REVERSE["O"]|REVERSE["C"]|REVERSE["E"]|REVERSE["A"]|REVERSE["N"]:
-            # find which trait it belongs to
-            trait = next(t for t, s in REVERSE.items() if i in s)
-            # overwrite v reversed but also ensure trait mapping by i
-        # map i→trait
-        if   1<=i<=6:  trait="O"
-        elif 7<=i<=12: trait="C"
-        elif 13<=i<=18:trait="E"
-        elif 19<=i<=24:trait="A"
-        else:          trait="N"
-        if i in REVERSE[trait]:
-            v = reverse_code(v, req.scale)
-        groups[trait].append(v)
-    out = {}
-    for t, arr in groups.items():
-        avg = sum(arr)/len(arr)
-        out[t] = to_01(avg, req.scale)
-    return OCEAN(**out)
+@timed_endpoint
+async def score_bigfive(req: ScoreRequest):
+    error = validate_answers(req.answers, req.scale)
+    if error:
+        raise HTTPException(400, error)
+    answers = np.array([[req.answers[k] for k in QUESTION_KEYS]], dtype=np.int64)
+    scores = score_answer_matrix(answers, np.array([req.scale]))[0]
+    return OCEAN(**dict(zip(TRAITS, scores)))
+
+class BatchScoreItem(BaseModel):
+    index: int
+    scores: Optional[OCEAN] = None
+    error: Optional[str] = None
+
+class BatchScoreResponse(BaseModel):
+    results: List[BatchScoreItem]
+    ok: int
+    failed: int
+
+def score_bigfive_rows(rows: List[Any]) -> BatchScoreResponse:
+    """여러 응답을 검증한 뒤 유효한 행만 (M,30) 행렬로 묶어 한 번에 채점
+
+    행별 검증 오류는 해당 행의 error로 돌려주고 나머지 행은 그대로 채점한다.
+    """
+    results = [BatchScoreItem(index=i) for i in range(len(rows))]
+    valid, answers, scales = [], [], []
+    for i, row in enumerate(rows):
+        try:
+            item = row if isinstance(row, ScoreRequest) else ScoreRequest.model_validate(row)
+        except ValidationError as e:
+            results[i].error = "; ".join(
+                (".".join(str(x) for x in err["loc"]) + ": " if err["loc"] else "") + err["msg"] for err in e.errors())
+            continue
+        error = validate_answers(item.answers, item.scale)
+        if error:
+            results[i].error = error
+            continue
+        valid.append(i)
+        answers.append([item.answers[k] for k in QUESTION_KEYS])
+        scales.append(item.scale)
+    if valid:
+        scores = score_answer_matrix(np.array(answers, dtype=np.int64), np.array(scales, dtype=np.int64))
+        for i, row in zip(valid, scores):
+            results[i].scores = OCEAN(**dict(zip(TRAITS, row)))
+    return BatchScoreResponse(results=results, ok=len(valid), failed=len(rows) - len(valid))
+
+@app.post("/score/bigfive/batch", response_model=BatchScoreResponse)
+@timed_endpoint
+async def score_bigfive_batch(request: Request):
+    """여러 학생의 설문 응답을 한 번에 채점
+
+    - JSON: {"items": [ScoreRequest, ...]} 또는 [ScoreRequest, ...]
+    - NDJSON (Content-Type: application/x-ndjson): 한 줄에 ScoreRequest 하나
+    """
+    rows: List[Any] = []
+    if "ndjson" in request.headers.get("content-type", ""):
+        buf = b""
+        async for chunk in request.stream():
+            buf += chunk
+            *lines, buf = buf.split(b"\n")
+            rows.extend(_parse_ndjson_line(line) for line in lines if line.strip())
+        if buf.strip():
+            rows.append(_parse_ndjson_line(buf))
+    else:
+        try:
+            body = json.loads(await request.body())
+        except ValueError:
+            raise HTTPException(400, "invalid JSON body")
+        rows = body.get("items") if isinstance(body, dict) else body
+        if not isinstance(rows, list):
+            raise HTTPException(400, "body must be a list or {\"items\": [...]}")
+    observe_cohort(len(rows))
+    with stage("scoring"):
+        return score_bigfive_rows(rows)
+
+def _parse_ndjson_line(line: bytes) -> Any:
+    # 깨진 줄도 해당 행의 검증 오류로 남도록 문자열 그대로 넘긴다
+    try:
+        return json.loads(line)
+    except ValueError:
+        return line.decode("utf-8", "replace")
 
 # ----- Matching -----
 
@@ -102,9 +284,19 @@ from itertools import combinations
 
 # Student 클래스는 data_processor.py에서 임포트
 
-class MatchRequest(BaseModel):
+MATCH_STRATEGIES = ("greedy", "multistart", "optimal")
+
+class MatchOptions(BaseModel):
+    """학생 목록을 뺀 매칭 옵션 (요청 형식과 관계없이 배정/이력 기록에 쓰는 필드)"""
     team_size: int = 4
     required_roles: Dict[str,int] = {"PM":1,"FE":1,"BE":1,"Design":1}
+    strategy: str = "greedy"        # "greedy" | "multistart" | "optimal"
+    seeds: int = 8                  # multistart/optimal: 무작위 그리디 seed 수
+    time_budget_ms: int = 2000      # multistart/optimal: 전체 시간 예산 (ms)
+    cohort: Optional[str] = None    # 팀 이력 파티션 (없으면 "default")
+    term: Optional[str] = None
+
+class MatchRequest(MatchOptions):
     students: List[Student]
 
 class MemberOut(BaseModel):
@@ -116,8 +308,25 @@ class TeamOut(BaseModel):
     members: List[MemberOut]
     reasons: List[str] = []
 
+class WorkerTiming(BaseModel):
+    pid: int
+    seeds_run: int
+    elapsed_ms: float
+    best_total: float
+
+class SolverInfo(BaseModel):
+    method: str                     # cp_sat | branch_and_bound | local_search | trivial
+    status: str                     # optimal | feasible
+    objective: float                # 전체 team_score 합 (반올림 전)
+    bound: float                    # 목적함수 상한
+    gap: float                      # (bound - objective) / objective
+    elapsed_ms: float
+
 class MatchResponse(BaseModel):
     teams: List[TeamOut]
+    workers: Optional[List[WorkerTiming]] = None  # multistart 워커별 실행 정보
+    solver: Optional[SolverInfo] = None  # optimal 풀이 정보
+    run_id: Optional[str] = None    # 팀 이력에 기록된 실행 ID (성과 레이블 기록 시 사용)
 
 def clamp(x: float, lo=0.0, hi=1.0) -> float:
     return max(lo, min(hi, x))
@@ -139,12 +348,15 @@ def pair_score(a: Student, b: Student) -> float:
     sO = 1 - abs(a.O - b.O)
     # 신경성은 낮을수록 좋으므로 평균을 1로 나누어 정규화
     sN = 1 - ((a.N + b.N)/2.0)
-    sav = jaccard(parse_slots(a.availability), parse_slots(b.availability))
+    # 가용시간은 문자열별로 한 번만 비트마스크로 해석해 popcount로 Jaccard 계산
+    sav = availability_overlap(a.availability, b.availability)
     base = (W["C"]*sC + W["A"]*sA + W["E"]*sE + W["O"]*sO + W["N"]*sN + W["AVAIL"]*sav)
     return clamp(base)
 
-def team_internal_score(team: List[Student]) -> float:
+def team_internal_score(team: List[Student], matrix: Optional[CompatibilityMatrix] = None) -> float:
     if len(team) < 2: return 0.0
+    if matrix is not None:
+        return matrix.team_internal_score(matrix.indices(team))
     pairs = list(combinations(team, 2))
     return sum(pair_score(a,b) for a,b in pairs) / len(pairs)
 
@@ -159,158 +371,642 @@ def role_coverage_bonus(team: List[Student], req: Dict[str,int]) -> float:
         ok += min(counts.get(r,0), rc)
     return 0.1 * (ok / max(1, need))
 
-def team_score(team: List[Student], req: Dict[str,int]) -> float:
-    return round(team_internal_score(team) + role_coverage_bonus(team, req), 3)
+def team_score(team: List[Student], req: Dict[str,int], matrix: Optional[CompatibilityMatrix] = None) -> float:
+    return round(team_internal_score(team, matrix) + role_coverage_bonus(team, req), 3)
+
+def team_score_idx(matrix: CompatibilityMatrix, idx: List[int], req: Dict[str,int]) -> float:
+    """team_score의 인덱스 버전 (StudentTable 행 인덱스)"""
+    return round(matrix.team_internal_score(idx) + matrix.table.role_bonus(idx, req), 3)
 
-def greedy_match(students: List[Student], team_size:int, req_roles: Dict[str,int]) -> List[List[Student]]:
-    remaining = students[:]
-    remaining.sort(key=lambda x: (x.role_pref=="PM", x.C), reverse=True)
-    teams: List[List[Student]] = []
+def greedy_match(students: List[Student], team_size:int, req_roles: Dict[str,int],
+                 matrix: Optional[CompatibilityMatrix] = None) -> List[List[Student]]:
+    if matrix is None:
+        matrix = CompatibilityMatrix(students, W)
+    return [matrix.table.take(t) for t in greedy_match_idx(matrix, team_size, req_roles)]
+
+def greedy_match_idx(matrix: CompatibilityMatrix, team_size:int, req_roles: Dict[str,int]) -> List[List[int]]:
+    table = matrix.table
+    order = table.greedy_order()
     
-    # 첫 번째 패스: 기본 그리디 매칭
-    while remaining:
-        curr = [remaining.pop(0)]
-        while len(curr) < team_size and remaining:
-            best_i, best_gain = None, -1e9
-            base = team_internal_score(curr)
-            for i, cand in enumerate(remaining):
-                sc = team_internal_score(curr+[cand]) - base
-                # add small role coverage gain
-                sc += role_coverage_bonus(curr+[cand], req_roles) - role_coverage_bonus(curr, req_roles)
-                if sc > best_gain: best_gain, best_i = sc, i
-            curr.append(remaining.pop(best_i))
-        teams.append(curr)
+    # 첫 번째 패스: 역할 풀 기반 그리디 매칭
+    # 필요한 역할 자리는 해당 역할 학생 중에서만, 나머지 자리는 전체에서 행렬 점수로 고른다 (pair_score 재계산 없음)
+    # 팀 크기는 team_sizes (team_size에 가장 가깝게, 팀 간 차이 최대 1명)
+    teams = bucketed_assign(matrix.scores, order, table.roles, team_size, req_roles)
     
     # 균등화 제거: 자연스러운 점수 분포 허용
     return teams
 
-def balance_team_scores(teams: List[List[Student]], req_roles: Dict[str,int]) -> List[List[Student]]:
-    """팀 간 점수 균형을 맞추기 위한 멤버 교환"""
+def balance_team_scores(teams: List[List[Student]], req_roles: Dict[str,int],
+                        matrix: Optional[CompatibilityMatrix] = None) -> List[List[Student]]:
+    """팀 간 점수 균형을 맞추기 위한 멤버 교환
+
+    최고·최저 팀과 다른 모든 팀 사이의 같은 역할 멤버 교환을 한 번에 평가해,
+    전체 점수 편차를 줄이는(같으면 점수 합을 늘리는) 교환만 적용한다 (balancing.balance_teams).
+    """
     if len(teams) < 2:
         return teams
-    
-    max_iterations = 50
-    for iteration in range(max_iterations):
-        # 각 팀의 점수 계산
-        team_scores = [team_score(team, req_roles) for team in teams]
-        
-        # 점수 차이가 충분히 작으면 종료
-        if max(team_scores) - min(team_scores) < 0.05:
-            break
-            
-        # 가장 높은 점수 팀과 가장 낮은 점수 팀 찾기
-        max_idx = team_scores.index(max(team_scores))
-        min_idx = team_scores.index(min(team_scores))
-        
-        best_swap = None
-        best_improvement = 0
-        
-        # 두 팀 간 멤버 교환 시도
-        for i, member_high in enumerate(teams[max_idx]):
-            for j, member_low in enumerate(teams[min_idx]):
-                # 역할이 같은 멤버끼리만 교환
-                if member_high.role_pref != member_low.role_pref:
-                    continue
-                    
-                # 임시로 교환해보기
-                temp_high = teams[max_idx][:]
-                temp_low = teams[min_idx][:]
-                temp_high[i] = member_low
-                temp_low[j] = member_high
-                
-                # 새로운 점수 계산
-                new_high_score = team_score(temp_high, req_roles)
-                new_low_score = team_score(temp_low, req_roles)
-                
-                # 점수 차이 개선 정도 계산
-                old_diff = abs(team_scores[max_idx] - team_scores[min_idx])
-                new_diff = abs(new_high_score - new_low_score)
-                improvement = old_diff - new_diff
-                
-                if improvement > best_improvement:
-                    best_improvement = improvement
-                    best_swap = (max_idx, min_idx, i, j)
-        
-        # 최적의 교환 실행
-        if best_swap and best_improvement > 0.01:
-            max_idx, min_idx, i, j = best_swap
-            member_high = teams[max_idx][i]
-            member_low = teams[min_idx][j]
-            teams[max_idx][i] = member_low
-            teams[min_idx][j] = member_high
-        else:
-            break
-    
+    if matrix is None:
+        matrix = CompatibilityMatrix([m for t in teams for m in t], W)
+    idx_teams = balance_team_idx(matrix, [matrix.indices(t) for t in teams], req_roles)
+    for team, idx in zip(teams, idx_teams):
+        team[:] = matrix.table.take(idx)
     return teams
 
-@app.post("/match/run", response_model=MatchResponse)
-def match_run(req: MatchRequest, api_key: str = Depends(verify_api_key)):
+def balance_team_idx(matrix: CompatibilityMatrix, idx_teams: List[List[int]], req_roles: Dict[str,int]) -> List[List[int]]:
+    """balance_team_scores의 인덱스 버전 (idx_teams를 제자리에서 바꾸고 반환)"""
+    if len(idx_teams) < 2:
+        return idx_teams
+    # 역할이 같은 멤버끼리만 교환
+    balance_teams(matrix, idx_teams, req_roles, swap_keys=matrix.table.role_pref, roles=matrix.table.roles)
+    return idx_teams
+
+def record_match(req: MatchOptions, table: Optional[StudentTable], teams: List[List[int]],
+                 source: str) -> Optional[str]:
+    """매칭 결과를 팀 이력 쓰기 스레드에 넘긴다 (성과 레이블은 아직 모르므로 NaN)
+
+    결과를 계산한 쪽에서 한 번만 부른다. 합쳐진(coalesced) 요청이나 먼저 끊긴 클라이언트와 무관하게 기록된다.
+    table이 없으면(매칭 레인의 워커 프로세스에서 배정한 경우) 쓰기 스레드에서 요청으로부터 학생 목록을 만든다.
+    """
+    if not RECORD_MATCH_HISTORY:
+        return None
+    run_id = uuid.uuid4().hex[:12]
+    HISTORY_WRITER.submit(_append_match_history, table, req, teams, req.cohort or DEFAULT_COHORT,
+                          req.term or DEFAULT_TERM, run_id, source)
+    return run_id
+
+def _append_match_history(table: Optional[StudentTable], req: MatchOptions, teams: List[List[int]], cohort: str,
+                          term: str, run_id: str, source: str):
+    try:
+        students = table.students if table is not None else request_students(req)
+        team_data = [TeamData(team_id=f"team_{i}", members=[students[j] for j in t], performance_score=float("nan"),
+                              success_rate=float("nan"))
+                     for i, t in enumerate(teams)]
+        TEAM_HISTORY.append_teams(team_data, cohort, term, run_id, source)
+    except Exception as e:
+        print(f"팀 이력 기록 실패 (run_id={run_id}): {e}")
+
+def team_members(table: StudentTable, idx: List[int]) -> List[MemberOut]:
+    """응답 직전에만 행 인덱스를 MemberOut으로 변환"""
+    return [MemberOut(student_id=table.ids[i], role_assigned=table.role_pref[i]) for i in idx]
+
+def team_out(table: StudentTable, matrix: CompatibilityMatrix, idx: List[int], req_roles: Dict[str,int]) -> TeamOut:
+    return TeamOut(
+        score=team_score_idx(matrix, idx, req_roles),
+        members=team_members(table, idx),
+        reasons=[
+            f"평균 C={round(table.mean_c(idx),3)}",
+            f"가용시간 평균겹침≈{round(matrix.mean_availability(idx),3)}",
+            f"공통 가용 슬롯={table.avail_index.common_slots(idx)}",
+        ]
+    )
+
+def check_match_request(req: MatchOptions, size: int):
+    set_label("strategy", req.strategy)
+    observe_cohort(size)
     if req.team_size < 2:
         raise HTTPException(400, "team_size must be >=2")
-    studs = req.students
-    teams = greedy_match(studs, req.team_size, req.required_roles)
-    
+    if req.strategy not in MATCH_STRATEGIES:
+        raise HTTPException(400, f"strategy must be one of {', '.join(MATCH_STRATEGIES)}")
+
+def assign_teams(req: MatchOptions, table: StudentTable, matrix: CompatibilityMatrix, balance: bool = True):
+    """strategy에 따른 팀 배정 → (팀 인덱스 리스트, multistart 워커 정보, optimal 풀이 정보)"""
+    with stage("assignment"):
+        teams, workers, solver = _assign(req, table, matrix)
     # 팀 점수 균형화 적용
-    teams = balance_team_scores(teams, req.required_roles)
-    
+    if balance and req.strategy == "greedy":
+        with stage("balancing"):
+            teams = balance_team_idx(matrix, teams, req.required_roles)
+    return teams, workers, solver
+
+def _assign(req: MatchOptions, table: StudentTable, matrix: CompatibilityMatrix):
+    workers = solver = None
+    if req.strategy == "multistart":
+        # 여러 seed + 지역 탐색 중 전체 점수 합이 가장 큰 배정 사용
+        teams, workers = multistart_match(
+            matrix.scores, table.roles, table.C, table.is_pm,
+            req.team_size, req.required_roles, req.seeds, req.time_budget_ms)
+    elif req.strategy == "optimal":
+        # 팀 크기를 고정한 배정 문제로 풀고 최적성 간격(gap)을 함께 반환
+        teams, solver = optimal_match(
+            matrix.scores, table.roles, table.C, table.is_pm,
+            req.team_size, req.required_roles, req.seeds, req.time_budget_ms)
+    else:
+        teams = greedy_match_idx(matrix, req.team_size, req.required_roles)
+    return teams, workers, solver
+
+def check_profile(profile: Optional[str]):
+    if not profile:
+        return
+    if not PROFILING_ENABLED:
+        raise HTTPException(403, "profiling is disabled (PROFILING_ENABLED=0)")
+    if profile not in PROFILE_MODES:
+        raise HTTPException(400, f"profile must be one of {', '.join(PROFILE_MODES)}")
+
+def profile_meta(endpoint: str, strategy: str, size: int, team_size: int) -> Dict[str, Any]:
+    return {"endpoint": endpoint, "strategy": strategy, "students": size, "team_size": team_size}
+
+def run_profiled(profile: Optional[str], response: Response, endpoint: str, req: MatchRequest, fn, *args):
+    """profile이 주어지면 이 요청의 처리를 프로파일해 저장하고 X-Profile-Id 헤더로 ID를 알려준다"""
+    if not profile:
+        return fn(*args)
+    check_profile(profile)
+    meta = profile_meta(endpoint, req.strategy, len(req.students), req.team_size)
+    with PROFILES.capture(profile, meta) as profile_id:
+        result = fn(*args)
+    response.headers["X-Profile-Id"] = profile_id
+    return result
+
+async def run_in_lane(lane: Lane, fn, *args, local: bool = False):
+    """lane에서 fn(*args) 실행 (대기열이 가득 차면 429)"""
+    try:
+        return await lane.run(fn, *args, local=local)
+    except LaneFull:
+        raise HTTPException(429, f"{lane.name} lane is busy, retry later", headers={"Retry-After": "1"})
+
+# 매칭 레인 워커에 넘기는 학생 열: (student_id, (N,5) OCEAN, role_pref, availability)
+StudentColumnsPayload = Tuple[List[str], np.ndarray, List[str], List[str]]
+
+def match_options(req: MatchOptions) -> MatchOptions:
+    """학생 목록을 뺀 옵션만 (워커 프로세스로 보낼 때 학생 객체를 pickle하지 않도록)"""
+    return MatchOptions.model_construct(**{k: getattr(req, k) for k in MatchOptions.model_fields})
+
+async def run_match_job(req: MatchOptions, columns: StudentColumnsPayload, lean: bool, profile: Optional[str],
+                        response: Optional[Response], endpoint: str):
+    """매칭 레인에서 배정/reasons까지 실행 → (팀 출력, 팀 인덱스, workers, solver)
+
+    워커에서 잰 단계 시간은 이 요청의 지표/X-Timing에 합치고, 프로파일 ID는 X-Profile-Id 헤더로 알려준다.
+    multistart는 자체 프로세스 풀을 쓰므로 워커 프로세스가 아니라 이 프로세스의 레인 스레드에서 실행한다.
+    """
+    meta = profile_meta(endpoint, req.strategy, len(columns[0]), req.team_size) if profile else None
+    out, teams, workers, solver, stages, profile_id = await run_in_lane(
+        MATCH_LANE, _match_job, match_options(req), columns, lean, profile, meta,
+        local=req.strategy == "multistart")
+    merge_stages(stages)
+    if profile_id is not None:
+        response.headers["X-Profile-Id"] = profile_id
+    return out, teams, workers, solver
+
+def _match_job(req: MatchOptions, columns: StudentColumnsPayload, lean: bool, profile: Optional[str],
+               meta: Optional[Dict[str, Any]]):
+    """매칭 레인 워커에서 실행되는 작업 (프로세스 레인이면 워커 프로세스에서 이 모듈을 임포트해 실행)"""
+    with collect_stages() as stages:
+        if profile:
+            with PROFILES.capture(profile, meta) as profile_id:
+                result = _match_columns(req, columns, lean)
+        else:
+            profile_id = None
+            result = _match_columns(req, columns, lean)
+    return (*result, stages, profile_id)
+
+def _match_columns(req: MatchOptions, columns: StudentColumnsPayload, lean: bool):
+    # 학생 열 배열은 요청당 한 번만 만들고, 쌍 점수도 한 번만 계산 (같은 코호트는 워커의 캐시에서 재사용)
+    with stage("feature_build"):
+        table = StudentTable.from_columns(*columns)
+        matrix = CompatibilityMatrix(table, W, COMPAT_CACHE)
+    teams, workers, solver = assign_teams(req, table, matrix)
+    with stage("reasons"):
+        if lean:
+            out = lean_teams(table, matrix, teams, req.required_roles)
+        else:
+            out = [team_out(table, matrix, t, req.required_roles) for t in teams]
+    return out, teams, workers, solver
+
+def _match_worker_warmup() -> int:
+    # 워커 프로세스에서 이 모듈(과 numpy/pydantic)을 미리 임포트해 둔다
+    return os.getpid()
+
+def student_columns(students: List[Student]) -> StudentColumnsPayload:
+    return ([s.student_id for s in students], np.array([(s.O, s.C, s.E, s.A, s.N) for s in students], dtype=np.float64),
+            [s.role_pref for s in students], [s.availability for s in students])
+
+def request_students(req: MatchOptions) -> List[Student]:
+    """요청 형식(학생 객체 목록/열 배열)과 관계없이 Student 목록"""
+    if isinstance(req, ColumnarMatchRequest):
+        return StudentTable.from_columns(*columnar_payload(req.columns)).students
+    if isinstance(req, MatchUpdateRequest):
+        return update_roster(req)
+    return req.students
+
+def match_namespace(req: MatchOptions, **extra: Any) -> Dict[str, Any]:
+    """결과 캐시 키에 들어가는 요청 옵션과 점수식 버전 (required_roles는 순서가 결과에 영향을 주므로 목록으로)"""
+    options = {k: getattr(req, k) for k in ("team_size", "strategy", "seeds", "time_budget_ms")}
+    return dict(options, required_roles=list(req.required_roles.items()), score=weights_namespace(W),
+                cohort=req.cohort or DEFAULT_COHORT, term=req.term or DEFAULT_TERM, **extra)
+
+async def cached_match(endpoint: str, namespace: Dict[str, Any], columns: StudentColumnsPayload, compute,
+                       idempotency_key: Optional[str], cache_control: Optional[str]):
+    """같은 요청이면 캐시된 응답을, 실행 중이면 그 결과를 돌려준다 → (결과, "hit" | "coalesced" | "miss")
+
+    Idempotency-Key는 엔드포인트별로 처음 요청에 묶이고, 같은 키로 다른 요청이 오면 422.
+    Cache-Control: no-cache이면 캐시된 응답 대신 다시 계산한다.
+    """
+    key = request_key(dict(namespace, endpoint=endpoint), *columns)
+    try:
+        result, outcome = await RESULT_CACHE.get_or_compute(
+            key, compute, idempotency_key=f"{endpoint}:{idempotency_key}" if idempotency_key else None,
+            refresh="no-cache" in (cache_control or "").lower())
+    except IdempotencyConflict:
+        raise HTTPException(422, "Idempotency-Key was already used with a different request")
+    METRICS.inc(METRICS.result_cache, endpoint=endpoint, outcome=outcome)
+    return result, outcome
+
+@app.post("/match/run", response_model=MatchResponse)
+@timed_endpoint
+async def match_run(req: MatchRequest, response: Response,
+                    profile: Optional[str] = None, idempotency_key: Optional[str] = Header(None),
+                    cache_control: Optional[str] = Header(None), api_key: str = Depends(verify_api_key)):
+    """기본 매칭 (profile=cprofile|sample이면 이 요청의 프로파일을 저장)
+
+    배정은 매칭 레인(기본: 워커 프로세스)에서 실행되고, 레인 대기열이 가득 차면 429를 반환한다.
+    같은 요청(학생, 옵션)이 다시 오면 캐시된 응답(같은 run_id)을 돌려주고, 동시에 오면 한 번만 계산한다 (X-Cache 헤더).
+    """
+    check_match_request(req, len(req.students))
+    check_profile(profile)
+    with stage("feature_build"):
+        columns = student_columns(req.students)
+
+    async def compute() -> MatchResponse:
+        out, teams, workers, solver = await run_match_job(req, columns, False, profile, response, "/match/run")
+        return MatchResponse(teams=out, workers=workers, solver=solver,
+                             run_id=record_match(req, None, teams, req.strategy))
+
+    if profile:
+        return await compute()
+    result, outcome = await cached_match("/match/run", match_namespace(req), columns, compute, idempotency_key,
+                                         cache_control)
+    response.headers["X-Cache"] = outcome
+    return result
+
+
+class StreamMatchRequest(MatchRequest):
+    balance: bool = False           # greedy: 팀 균형화 (켜면 균형화가 끝난 뒤에 팀이 전송됨)
+    progress_ms: int = 250          # progress 이벤트 최소 간격 (ms)
+
+@app.post("/match/run/stream")
+@timed_endpoint
+async def match_run_stream(req: StreamMatchRequest, background_tasks: BackgroundTasks,
+                           api_key: str = Depends(verify_api_key)):
+    """팀이 확정될 때마다 NDJSON 한 줄씩 전송
+
+    줄 형식 ("type"으로 구분):
+    - progress: {"stage", "teams", "assigned", "total", "objective", "elapsed_ms"}
+    - team:     {"index", "score", "members", "reasons"} (/match/run의 TeamOut과 같은 필드)
+    - done:     {"teams", "objective", "elapsed_ms", "run_id", "workers", "solver"}
+    - error:    {"detail"} (전송 도중 오류)
+    균형화 없는 greedy는 팀이 만들어지는 즉시 전송되고, 나머지 strategy는 배정이 끝난 뒤 전송된다.
+    팀을 만드는 대로 보내야 하므로 워커 프로세스가 아니라 이 프로세스의 스레드에서 실행하되,
+    매칭 레인의 자리를 잡고 실행한다 (전송이 끝나거나 연결이 끊기면 반납).
+    """
+    check_match_request(req, len(req.students))
+    try:
+        record_stage("queue", await MATCH_LANE.acquire())
+    except LaneFull:
+        raise HTTPException(429, "match lane is busy, retry later", headers={"Retry-After": "1"})
+    # 백그라운드 작업은 스트림이 끝난 뒤(연결이 끊겨도) 실행되므로 자리 반납을 맨 앞에 둔다
+    background_tasks.add_task(_release_lane, MATCH_LANE)
+    return StreamingResponse(iterate_in_threadpool(_stream_match(req)),
+                             media_type="application/x-ndjson")
+
+async def _release_lane(lane: Lane):
+    lane.release()
+
+def _stream_match(req: StreamMatchRequest):
+    started = time.perf_counter()
+    n = len(req.students)
+
+    def line(obj: Dict[str, Any]) -> str:
+        return json.dumps(obj, ensure_ascii=False) + "\n"
+
+    def progress(stage: str, teams: int, assigned: int, objective: Optional[float]) -> str:
+        return line({"type": "progress", "stage": stage, "teams": teams, "assigned": assigned, "total": n,
+                     "objective": None if objective is None else round(objective, 3), "elapsed_ms": round((time.perf_counter() - started) * 1000, 1)})
+
+    try:
+        with stage("feature_build"):
+            table = StudentTable(req.students)
+            matrix = CompatibilityMatrix(table, W, COMPAT_CACHE)
+        yield progress("matrix", 0, 0, None)
+        workers = solver = None
+        if req.strategy == "greedy" and not req.balance:
+            # 팀이 완성되는 즉시 전송 (뒤에 오는 팀 때문에 바뀌지 않음)
+            assigned = iter_bucketed_assign(matrix.scores, table.greedy_order(), table.roles,
+                                            req.team_size, req.required_roles)
+        else:
+            assigned, workers, solver = assign_teams(req, table, matrix, balance=req.balance)
+            yield progress("assignment", len(assigned), n, None)
+
+        teams: List[List[int]] = []
+        objective, members, last = 0.0, 0, time.perf_counter()
+        for idx in assigned:
+            out = team_out(table, matrix, idx, req.required_roles)
+            yield line({"type": "team", "index": len(teams), **out.model_dump()})
+            teams.append(idx)
+            objective += out.score
+            members += len(idx)
+            if (time.perf_counter() - last) * 1000 >= req.progress_ms:
+                last = time.perf_counter()
+                yield progress("teams", len(teams), members, objective)
+        yield line({"type": "done", "teams": len(teams), "objective": round(objective, 3),
+                    "elapsed_ms": round((time.perf_counter() - started) * 1000, 1),
+                    "run_id": record_match(req, table, teams, req.strategy),
+                    "workers": workers, "solver": solver})
+    except Exception as e:
+        # 응답 헤더가 이미 나갔으므로 오류도 한 줄로 알린다
+        yield line({"type": "error", "detail": str(e)})
+
+
+class StudentColumns(BaseModel):
+    """열 단위 학생 목록 (모든 배열의 길이가 같아야 함)"""
+    student_id: List[str]
+    O: List[float]
+    C: List[float]
+    E: List[float]
+    A: List[float]
+    N: List[float]
+    role_pref: Optional[List[str]] = None       # 없으면 모두 "Any"
+    availability: Optional[List[str]] = None    # 없으면 모두 ""
+
+class ColumnarMatchRequest(MatchOptions):
+    columns: StudentColumns
+
+def columnar_payload(cols: StudentColumns) -> StudentColumnsPayload:
+    n = len(cols.student_id)
+    return (cols.student_id, np.column_stack([cols.O, cols.C, cols.E, cols.A, cols.N]),
+            cols.role_pref or ["Any"] * n, cols.availability or [""] * n)
+
+def lean_teams(table: StudentTable, matrix: CompatibilityMatrix, teams: List[List[int]],
+               req_roles: Dict[str,int]) -> List[Dict[str, Any]]:
+    """TeamOut과 같은 모양의 dict 목록 (쌍 점수/가용시간 평균은 같은 크기 팀끼리 한 번에 계산)"""
+    internal, avail = matrix.team_stats(teams)
     out = []
-    for t in teams:
-        sc = team_score(t, req.required_roles)
-        out.append(TeamOut(
-            score=sc,
-            members=[MemberOut(student_id=m.student_id, role_assigned=m.role_pref) for m in t],
-            reasons=[
-                f"평균 C={round(sum(m.C for m in t)/len(t),3)}",
-                f"가용시간 평균겹침≈{round(sum(jaccard(parse_slots(a.availability),parse_slots(b.availability)) for a,b in combinations(t,2))/max(1,len(t)*(len(t)-1)/2),3)}",
-            ]
-        ))
-    return MatchResponse(teams=out)
+    for idx, s_int, s_av in zip(teams, internal.tolist(), avail.tolist()):
+        out.append({
+            "score": round(s_int + table.role_bonus(idx, req_roles), 3),
+            "members": [{"student_id": table.ids[i], "role_assigned": table.role_pref[i]} for i in idx],
+            "reasons": [f"평균 C={round(table.mean_c(idx),3)}", f"가용시간 평균겹침≈{round(s_av,3)}",
+                        f"공통 가용 슬롯={table.avail_index.common_slots(idx)}"],
+        })
+    return out
+
+@app.post("/match/run/columnar", response_model=MatchResponse)
+@timed_endpoint
+async def match_run_columnar(request: Request,
+                             idempotency_key: Optional[str] = Header(None), cache_control: Optional[str] = Header(None),
+                             api_key: str = Depends(verify_api_key)):
+    """열 단위 요청을 받는 /match/run 빠른 경로
+
+    본문은 ColumnarMatchRequest: 학생을 객체 목록 대신 열 배열(student_id, O..N, role_pref, availability)로 받아
+    pydantic이 JSON에서 바로 검증하고, 응답은 pydantic 모델 대신 dict로 만들어 orjson으로 직렬화한다.
+    응답 형식과 결과 캐시/Idempotency-Key 처리는 /match/run과 같다.
+    """
+    with stage("parse"):
+        body = await request.body()
+        try:
+            req = ColumnarMatchRequest.model_validate_json(body)
+        except ValidationError as e:
+            raise RequestValidationError(e.errors(include_url=False), body=body)
+    cols = req.columns
+    n = len(cols.student_id)
+    check_match_request(req, n)
+    optional = [c for c in (cols.role_pref, cols.availability) if c is not None]
+    if any(len(c) != n for c in (cols.O, cols.C, cols.E, cols.A, cols.N, *optional)):
+        raise HTTPException(400, "all columns must have the same length as student_id")
+    with stage("feature_build"):
+        columns = columnar_payload(cols)
+
+    async def compute() -> Dict[str, Any]:
+        out, teams, workers, solver = await run_match_job(req, columns, True, None, None, "/match/run/columnar")
+        return {"teams": out, "workers": workers, "solver": solver,
+                "run_id": record_match(req, None, teams, req.strategy)}
+
+    content, outcome = await cached_match("/match/run/columnar", match_namespace(req), columns, compute,
+                                          idempotency_key, cache_control)
+    mark_serialization()
+    headers = {"X-Cache": outcome}
+    return ORJSONResponse(content, headers=headers) if orjson is not None else JSONResponse(content, headers=headers)
+
+
+class MatchUpdateRequest(MatchOptions):
+    """기존 배정에 학생 추가/제외를 반영하는 증분 재매칭 요청 (strategy/seeds/time_budget_ms는 쓰지 않음)"""
+    students: List[Student]         # 기존 배정의 학생 (teams에 있는 학생 모두)
+    teams: List[List[str]]          # 기존 배정 (팀별 student_id, 이전 응답의 팀 순서)
+    add: List[Student] = []         # 새로 들어온 학생
+    remove: List[str] = []          # 빠진 학생 ID
+    max_moved: int = 0              # 다른 팀으로 옮길 수 있는 기존 학생 수 (새 학생은 세지 않음)
+
+class MatchUpdateResponse(MatchResponse):
+    origin: List[Optional[int]] = []  # 팀별 요청 teams에서의 위치 (새로 만든 팀은 None)
+    moved: List[str] = []             # 원래 팀을 떠난 기존 학생 ID
+
+def update_roster(req: MatchUpdateRequest) -> List[Student]:
+    """갱신 후 학생 목록: 남은 기존 학생(요청 순서) + 새 학생"""
+    removed = set(req.remove)
+    return [s for s in req.students if s.student_id not in removed] + list(req.add)
 
+def check_update_request(req: MatchUpdateRequest):
+    if req.max_moved < 0:
+        raise HTTPException(400, "max_moved must be >=0")
+    known = [s.student_id for s in req.students]
+    if len(set(known)) != len(known):
+        raise HTTPException(400, "duplicate student_id in students")
+    assigned = [sid for team in req.teams for sid in team]
+    if len(set(assigned)) != len(assigned) or set(assigned) != set(known):
+        raise HTTPException(400, "teams must list every student in students exactly once")
+    unknown = sorted(set(req.remove) - set(known))
+    if unknown:
+        raise HTTPException(400, f"unknown student_id in remove: {', '.join(unknown[:10])}")
+    # 빠진 학생은 같은 ID로 다시 추가할 수 있다 (학생 정보 갱신)
+    staying = set(known) - set(req.remove)
+    added = [s.student_id for s in req.add]
+    if len(set(added)) != len(added) or staying & set(added):
+        raise HTTPException(400, "add must contain new student_ids only")
+
+def update_assignment(req: MatchUpdateRequest, roster: List[Student]) -> Tuple[List[List[int]], List[int], List[int], List[int]]:
+    """요청 배정 → (갱신 후 학생 인덱스 기준 팀, 학생별 원래 팀 위치(새 학생은 -1), 새 학생 인덱스, 학생이 빠진 팀 위치)"""
+    n_kept = len(roster) - len(req.add)
+    index = {s.student_id: i for i, s in enumerate(roster[:n_kept])}
+    teams = [[index[sid] for sid in team if sid in index] for team in req.teams]
+    home = [-1] * len(roster)
+    for t, team in enumerate(teams):
+        for i in team:
+            home[i] = t
+    shrunk = [t for t, (team, before) in enumerate(zip(teams, req.teams)) if len(team) < len(before)]
+    return teams, home, list(range(n_kept, len(roster))), shrunk
+
+@app.post("/match/update", response_model=MatchUpdateResponse)
+@timed_endpoint
+async def match_update(req: MatchUpdateRequest, api_key: str = Depends(verify_api_key)):
+    """증분 재매칭: 기존 배정(teams)에 학생 추가(add)/제외(remove)만 반영
+
+    코호트 전체를 다시 배정하지 않고 새 학생과 빈자리만 채운 뒤(쌍 점수 한계 이득 기준), 바뀐 팀들끼리만
+    balance_team_scores 방식의 교환으로 균형을 맞춘다. 쌍 점수는 바뀐 학생의 행과 팀 안의 블록만 계산한다.
+    원래 팀을 떠나는 기존 학생은 max_moved명까지이고, 매칭 레인에서 실행된다 (대기열이 가득 차면 429).
+    """
+    check_update_request(req)
+    roster = update_roster(req)
+    check_match_request(req, len(roster))
+    with stage("feature_build"):
+        columns = student_columns(roster)
+        teams, home, added, shrunk = update_assignment(req, roster)
+    out, teams, origin, moved, stages = await run_in_lane(
+        MATCH_LANE, _update_job, match_options(req), columns, teams, home, added, shrunk, req.max_moved)
+    merge_stages(stages)
+    return MatchUpdateResponse(teams=out, origin=origin, moved=[columns[0][i] for i in moved],
+                               run_id=record_match(req, None, teams, "update"))
+
+def _update_job(req: MatchOptions, columns: StudentColumnsPayload, teams: List[List[int]], home: List[int],
+                added: List[int], shrunk: List[int], max_moved: int):
+    """매칭 레인 워커에서 실행되는 증분 재매칭 → (팀 출력, 팀 인덱스, 팀별 원래 위치, 옮긴 학생 인덱스, 단계 시간)"""
+    with collect_stages() as stages:
+        with stage("feature_build"):
+            table = StudentTable.from_columns(*columns)
+            scores = LocalScores(table, W)
+        with stage("assignment"):
+            teams, origin, touched = place_students(scores, teams, home, added, req.team_size, req.required_roles,
+                                                    max_moved)
+        with stage("balancing"):
+            teams = repair_teams(scores, teams, touched | set(shrunk), home, req.required_roles, max_moved)
+        moved = moved_students(teams, home)
+        # 모두 빠져서 빈 팀은 응답에서 뺀다 (origin으로 원래 위치를 알 수 있음)
+        kept = [t for t, members in enumerate(teams) if members]
+        teams, origin = [teams[t] for t in kept], [origin[t] for t in kept]
+        with stage("reasons"):
+            scores.prepare(teams)
+            out = [team_out(table, scores, t, req.required_roles) for t in teams]
+    return out, teams, origin, moved, stages
 
 @app.post("/match/run_deep", response_model=MatchResponse)
-def match_run_deep(req: MatchRequest, api_key: str = Depends(verify_api_key)):
-    """딥러닝 모델을 사용한 팀 매칭 실행"""
+@timed_endpoint
+async def match_run_deep(req: MatchRequest, response: Response,
+                         profile: Optional[str] = None, idempotency_key: Optional[str] = Header(None),
+                         cache_control: Optional[str] = Header(None), api_key: str = Depends(verify_api_key)):
+    """딥러닝 모델을 사용한 팀 매칭 실행 (profile=cprofile|sample이면 이 요청의 프로파일을 저장)
+
+    딥러닝 레인의 스레드에서 실행되고, 레인 대기열이 가득 차면 429를 반환한다.
+    모델이 준비된 상태면 /match/run처럼 결과 캐시를 거친다 (키에 모델 버전 포함).
+    """
+    check_profile(profile)
+
+    async def compute() -> MatchResponse:
+        return await run_in_lane(DEEP_LANE, run_profiled, profile, response, "/match/run_deep", req, _match_run_deep,
+                                 req)
+
+    version = MODEL_REGISTRY.version if MODEL_REGISTRY.state == "ready" else None
+    if profile or version is None:
+        return await compute()
+    result, outcome = await cached_match("/match/run_deep", match_namespace(req, model=version),
+                                         student_columns(req.students), compute, idempotency_key, cache_control)
+    response.headers["X-Cache"] = outcome
+    return result
+
+def _match_run_deep(req: MatchRequest) -> MatchResponse:
+    set_label("strategy", "deep")
+    observe_cohort(len(req.students))
     if req.team_size < 2:
         raise HTTPException(400, "team_size must be >=2")
     
-    # 딥러닝 모델 확인
-    global DEEP_MODEL
-    if DEEP_MODEL is None:
+    # 딥러닝 모델 확인 (아직 로드 전이면 여기서 로드를 시작하고 기다림)
+    model = MODEL_REGISTRY.get(timeout=DEEP_MODEL_WAIT_S)
+    if model is None:
+        if MODEL_REGISTRY.state == "loading":
+            raise HTTPException(503, "딥러닝 모델을 로드하는 중입니다. 잠시 후 다시 시도하세요.")
         raise HTTPException(503, "딥러닝 모델이 로드되지 않았습니다. /match/train 엔드포인트로 모델을 먼저 학습하세요.")
+    deep = inference_module()
     
-    studs = req.students
+    with stage("feature_build"):
+        table = StudentTable(req.students)
+    
+    # 호환성 점수는 요청당 한 번만 예측하고, 팀 점수는 이 행렬에서 모은다
+    # 캐시에 들어갈 크기면 코호트 캐시를 거치고,
+    if len(table) ** 2 * 4 <= COMPAT_CACHE.max_bytes // 2:
+        with stage("inference"):
+            compat = deep.predict_compatibility_cached(model, table, COMPAT_CACHE)
+        return _deep_match_response(req, table, compat)
+    # 아니면 메모리 한도 안에서 타일 단위로 예측한 상삼각 float32 저장소를 사용
+    with stage("inference"):
+        compat = deep.predict_compatibility_streaming(model, table)
+    try:
+        return _deep_match_response(req, table, compat)
+    finally:
+        compat.close()
+
+
+def _deep_match_response(req: MatchRequest, table: StudentTable, compat) -> MatchResponse:
+    deep = inference_module()
+    with stage("feature_build"):
+        matrix = CompatibilityMatrix(table, W, COMPAT_CACHE)
     
     # 딥러닝 모델을 사용한 팀 매칭
-    teams = greedy_match_with_model(DEEP_MODEL, studs, req.team_size, req.required_roles)
+    with stage("assignment"):
+        teams = deep.greedy_team_indices(table, req.team_size, req.required_roles, compat)
     
-    out = []
-    for t in teams:
-        # 딥러닝 모델 점수와 기존 점수 모두 계산
-        deep_score = DEEP_MODEL.predict_team_compatibility(t)
-        traditional_score = team_score(t, req.required_roles)
-        
-        # 최종 점수는 딥러닝 모델 점수 사용
-        out.append(TeamOut(
-            score=round(float(deep_score), 3),
-            members=[MemberOut(student_id=m.student_id, role_assigned=m.role_pref) for m in t],
-            reasons=[
-                f"딥러닝 모델 점수={round(float(deep_score), 3)}",
-                f"전통적 점수={round(traditional_score, 3)}",
-                f"평균 C={round(sum(m.C for m in t)/len(t), 3)}",
-                f"가용시간 평균겹침≈{round(sum(jaccard(parse_slots(a.availability),parse_slots(b.availability)) for a,b in combinations(t,2))/max(1,len(t)*(len(t)-1)/2), 3)}",
-            ]
-        ))
+    with stage("reasons"):
+        out = [_deep_team_out(deep, table, matrix, compat, idx, req.required_roles) for idx in teams]
+    
+    return MatchResponse(teams=out, run_id=record_match(req, table, teams, "deep"))
+
+
+def _deep_team_out(deep, table: StudentTable, matrix: CompatibilityMatrix, compat, idx: List[int],
+                   req_roles: Dict[str,int]) -> TeamOut:
+    # 딥러닝 모델 점수와 기존 점수 모두 계산
+    deep_score = deep.team_compatibility(compat, idx)
+    traditional_score = team_score_idx(matrix, idx, req_roles)
     
-    return MatchResponse(teams=out)
+    # 최종 점수는 딥러닝 모델 점수 사용
+    return TeamOut(
+        score=round(float(deep_score), 3),
+        members=team_members(table, idx),
+        reasons=[
+            f"딥러닝 모델 점수={round(float(deep_score), 3)}",
+            f"전통적 점수={round(traditional_score, 3)}",
+            f"평균 C={round(table.mean_c(idx), 3)}",
+            f"가용시간 평균겹침≈{round(matrix.mean_availability(idx), 3)}",
+            f"공통 가용 슬롯={table.avail_index.common_slots(idx)}",
+        ]
+    )
+
+
+@app.get("/debug/profile")
+def list_profiles(api_key: str = Depends(verify_api_key)):
+    """저장된 요청 프로파일 목록 (최신순)"""
+    return {"profiles": PROFILES.list()}
+
+@app.get("/debug/profile/{profile_id}")
+def get_profile(profile_id: str, format: str = "text", sort: str = "cumulative", limit: int = 40,
+                api_key: str = Depends(verify_api_key)):
+    """요청 프로파일 조회
+
+    - format=text: cprofile은 pstats 표 (sort 기준 상위 limit개), sample은 collapsed stack 상위 limit줄
+    - format=raw: 원본 파일 (.prof는 pstats/snakeviz로, .collapsed는 flamegraph/speedscope로 열 수 있음)
+    """
+    path = PROFILES.raw_path(profile_id)
+    if path is None:
+        raise HTTPException(404, "profile not found")
+    if format == "raw":
+        return FileResponse(path, filename=os.path.basename(path))
+    if format != "text":
+        raise HTTPException(400, "format must be text or raw")
+    try:
+        return PlainTextResponse(PROFILES.text(profile_id, sort, limit))
+    except KeyError:
+        raise HTTPException(400, f"unknown sort key: {sort}")
+
+@app.get("/cache/stats")
+async def cache_stats(api_key: str = Depends(verify_api_key)):
+    """호환성 캐시 적중/미스/퇴출 통계 (results: 매칭 결과 캐시의 적중/합치기/미스 통계)"""
+    return dict(COMPAT_CACHE.stats(), results=RESULT_CACHE.stats())
 
 
 class TrainRequest(BaseModel):
     """모델 학습 요청 스키마"""
     team_size: int = 4
     required_roles: Dict[str, int] = {"PM":1, "FE":1, "BE":1, "Design":1}
-    students: List[Student]
+    students: List[Student] = []
     existing_teams: Optional[List[List[str]]] = None  # 기존 팀 구성 (학생 ID 리스트의 리스트)
     epochs: int = 50
+    cohort: Optional[str] = None      # 팀 이력 파티션
+    term: Optional[str] = None
+    from_history: bool = False        # True면 students 대신 팀 이력(cohort/term, 없으면 전체)의 레이블 있는 팀으로 학습
 
 
 class TrainResponse(BaseModel):
@@ -318,14 +1014,49 @@ class TrainResponse(BaseModel):
     success: bool
     message: str
     metrics: Dict[str, float] = {}
+    job_id: Optional[str] = None     # 학습 작업 ID (GET /match/train/{job_id}로 진행 상황 조회)
+
+
+class TrainJobStatus(BaseModel):
+    """학습 작업 상태"""
+    job_id: str
+    status: str                      # queued | running | succeeded | failed | cancelled
+    epoch: int
+    epochs: int
+    metrics: Dict[str, float] = {}   # 마지막 epoch 지표 + 학습 데이터 정보
+    history: List[Dict[str, float]] = []
+    version: Optional[str] = None     # 성공 시 교체된 모델 버전
+    error: Optional[str] = None
+    created_at: float
+    started_at: Optional[float] = None
+    finished_at: Optional[float] = None
 
 
 @app.post("/match/train", response_model=TrainResponse)
-def train_deep_model(req: TrainRequest, api_key: str = Depends(verify_api_key)):
-    """딥러닝 모델 학습 엔드포인트"""
-    global DEEP_MODEL
-    
+async def train_deep_model(req: TrainRequest, api_key: str = Depends(verify_api_key)):
+    """딥러닝 모델 학습 엔드포인트
+
+    학습 데이터만 만든 뒤 작업 대기열에 넣고 바로 반환한다. 학습은 별도 프로세스에서 실행되며,
+    끝나면 새 모델 버전이 로드/워밍업된 뒤 서빙 모델과 교체된다.
+    학습 데이터 준비는 학습 레인의 스레드에서 한 번에 하나씩 실행한다 (대기열이 가득 차면 429).
+    """
+    return await run_in_lane(TRAIN_LANE, _train_deep_model, req)
+
+def _train_deep_model(req: TrainRequest) -> TrainResponse:
     try:
+        if req.from_history:
+            # 팀 이력을 NumPy 배열로 바로 읽어 쌍 특성을 만든다 (Student 객체 생성 없음)
+            pairs = TEAM_HISTORY.pair_table(req.cohort, req.term)
+            if len(pairs[1]) == 0:
+                raise HTTPException(400, "팀 이력에 성과 레이블이 있는 팀이 없습니다")
+            job = TRAINING_JOBS.submit(pairs, req.epochs, info={"students_count": len(pairs[0])})
+            return TrainResponse(
+                success=True,
+                message="딥러닝 모델 학습 작업이 등록되었습니다 (팀 이력)",
+                metrics=job.info,
+                job_id=job.job_id
+            )
+        
         # 학습 데이터 준비
         students = req.students
         
@@ -351,40 +1082,79 @@ def train_deep_model(req: TrainRequest, api_key: str = Depends(verify_api_key)):
                 success_rate=1.0
             ))
         
-        # 학습 데이터 준비
-        X_train, y_train = prepare_training_data(team_data)
-        
-        # 모델 초기화 또는 로드
-        if DEEP_MODEL is None:
-            DEEP_MODEL = DeepMatchingModel()
-        
-        # 모델 학습
-        history = train_model(DEEP_MODEL, X_train, y_train, epochs=req.epochs)
-        
-        # 모델 저장
-        model_path = os.path.join(MODEL_PATH, "team_matching_model")
-        DEEP_MODEL.save(model_path)
-        
         # 팀 데이터 저장 (추후 분석용)
-        data_path = os.path.join(MODEL_PATH, "team_data.pkl")
-        save_team_data(students, teams, data_path)
+        TEAM_HISTORY.append_teams(team_data, req.cohort or DEFAULT_COHORT, req.term or DEFAULT_TERM, source="train")
         
-        # 학습 메트릭 반환
-        metrics = {
-            "final_loss": float(history.history["loss"][-1]),
-            "final_accuracy": float(history.history["accuracy"][-1]) if "accuracy" in history.history else 0.0,
+        # 쌍 특성/레이블을 특성 저장소에 쓰고 작업 등록
+        job = TRAINING_JOBS.submit(team_pair_table(team_data), req.epochs, info={
             "teams_count": len(teams),
-            "students_count": len(students)
-        }
-        
+            "students_count": len(students),
+        })
         return TrainResponse(
             success=True,
-            message="딥러닝 모델 학습 완료",
-            metrics=metrics
+            message="딥러닝 모델 학습 작업이 등록되었습니다",
+            metrics=job.info,
+            job_id=job.job_id
         )
         
+    except HTTPException:
+        raise
     except Exception as e:
         return TrainResponse(
             success=False,
             message=f"모델 학습 중 오류 발생: {str(e)}"
         )
+
+
+@app.get("/match/train", response_model=List[TrainJobStatus])
+async def list_train_jobs(api_key: str = Depends(verify_api_key)):
+    """학습 작업 목록 (최근 작업 순)"""
+    return [TrainJobStatus(**job.to_dict()) for job in reversed(TRAINING_JOBS.list())]
+
+
+@app.get("/match/train/{job_id}", response_model=TrainJobStatus)
+async def get_train_job(job_id: str, api_key: str = Depends(verify_api_key)):
+    """학습 작업 진행 상황 (epoch별 지표)"""
+    job = TRAINING_JOBS.get(job_id)
+    if job is None:
+        raise HTTPException(404, "학습 작업을 찾을 수 없습니다")
+    return TrainJobStatus(**job.to_dict())
+
+
+@app.delete("/match/train/{job_id}", response_model=TrainJobStatus)
+async def cancel_train_job(job_id: str, api_key: str = Depends(verify_api_key)):
+    """학습 작업 취소 (실행 중이면 다음 배치에서 중단되고 모델은 교체되지 않음)"""
+    job = TRAINING_JOBS.cancel(job_id)
+    if job is None:
+        raise HTTPException(404, "학습 작업을 찾을 수 없습니다")
+    return TrainJobStatus(**job.to_dict())
+
+
+class TeamLabel(BaseModel):
+    team_id: str                     # 매칭 응답의 팀 순서 기준 "team_<i>"
+    performance_score: float
+    success_rate: float = 0.0
+
+
+class LabelRequest(BaseModel):
+    """매칭 실행(run_id)의 팀 성과 레이블 기록 요청"""
+    run_id: str
+    cohort: Optional[str] = None
+    term: Optional[str] = None
+    labels: List[TeamLabel]
+
+
+@app.post("/history/labels")
+def record_labels(req: LabelRequest, api_key: str = Depends(verify_api_key)):
+    """팀 성과 레이블 추가 (같은 팀에 여러 번 기록하면 최신 값 사용)"""
+    if not req.labels:
+        raise HTTPException(400, "labels must not be empty")
+    n = TEAM_HISTORY.append_labels(req.run_id, {l.team_id: (l.performance_score, l.success_rate) for l in req.labels},
+                                   req.cohort or DEFAULT_COHORT, req.term or DEFAULT_TERM)
+    return {"recorded": n}
+
+
+@app.get("/history")
+def history_partitions(api_key: str = Depends(verify_api_key)):
+    """팀 이력 파티션(cohort, term)별 멤버 행/실행 수"""
+    return {"partitions": TEAM_HISTORY.partitions()}
@@ -0,0 +1,295 @@
+import os
+import time
+import bisect
+import inspect
+import functools
+import threading
+import contextvars
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterator, List, Optional, Sequence, Tuple
+
+# 단계별 소요 시간(초) 구간
+SECONDS_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+# 코호트 크기 / 추론 배치 크기 구간
+SIZE_BUCKETS = (10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000, 25000)
+BATCH_BUCKETS = (1, 16, 64, 256, 1024, 4096, 8192, 16384, 65536)
+
+# X-Timing 응답 헤더: 환경 변수로 항상 켜거나, 요청에 X-Timing 헤더가 있을 때만 붙인다
+TIMING_HEADER = os.getenv("TIMING_HEADER", "0") == "1"
+
+Labels = Tuple[Tuple[str, str], ...]
+
+
+class Histogram:
+    """누적 구간 히스토그램 (Prometheus histogram 형식)"""
+
+    def __init__(self, name: str, help: str, buckets: Sequence[float]):
+        self.name = name
+        self.help = help
+        self.buckets = tuple(buckets)
+        self._series: Dict[Labels, List[float]] = {}  # 라벨 → [구간별 개수..., +Inf 개수, 합계]
+
+    def observe(self, value: float, labels: Labels):
+        series = self._series.get(labels)
+        if series is None:
+            series = self._series[labels] = [0.0] * (len(self.buckets) + 2)
+        series[bisect.bisect_left(self.buckets, value)] += 1
+        series[-1] += value
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        for labels, series in sorted(self._series.items()):
+            cumulative = 0.0
+            for le, count in zip([*map(_format_value, self.buckets), "+Inf"], series[:-1]):
+                cumulative += count
+                lines.append(f"{self.name}_bucket{_format_labels(labels + (('le', le),))} {_format_value(cumulative)}")
+            lines.append(f"{self.name}_sum{_format_labels(labels)} {_format_value(series[-1])}")
+            lines.append(f"{self.name}_count{_format_labels(labels)} {_format_value(cumulative)}")
+        return lines
+
+
+class Counter:
+    def __init__(self, name: str, help: str):
+        self.name = name
+        self.help = help
+        self._series: Dict[Labels, float] = {}
+
+    def inc(self, labels: Labels, value: float = 1.0):
+        self._series[labels] = self._series.get(labels, 0.0) + value
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} counter"]
+        lines.extend(f"{self.name}{_format_labels(labels)} {_format_value(v)}" for labels, v in sorted(self._series.items()))
+        return lines
+
+
+class Gauge:
+    def __init__(self, name: str, help: str):
+        self.name = name
+        self.help = help
+        self._series: Dict[Labels, float] = {}
+
+    def set(self, labels: Labels, value: float):
+        self._series[labels] = value
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} gauge"]
+        lines.extend(f"{self.name}{_format_labels(labels)} {_format_value(v)}" for labels, v in sorted(self._series.items()))
+        return lines
+
+
+def _format_labels(labels: Labels) -> str:
+    if not labels:
+        return ""
+    escaped = (f'{k}="{_escape(str(v))}"' for k, v in labels)
+    return "{" + ",".join(escaped) + "}"
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _format_value(v: float) -> str:
+    return str(int(v)) if float(v).is_integer() else repr(float(v))
+
+
+class MetricsRegistry:
+    """프로세스 단위 지표 저장소 (관측은 잠금 한 번 + 구간 이진 탐색이라 항상 켜 둘 수 있다)"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.requests = Counter("matching_requests_total", "HTTP requests by endpoint, strategy and status")
+        self.request_seconds = Histogram("matching_request_seconds", "Total request latency", SECONDS_BUCKETS)
+        self.stage_seconds = Histogram("matching_stage_seconds", "Per-stage latency within a request", SECONDS_BUCKETS)
+        self.cohort_size = Histogram("matching_cohort_size", "Students per matching request", SIZE_BUCKETS)
+        self.inference_batch = Histogram("matching_inference_batch_size", "Pairs per model inference call",
+                                         BATCH_BUCKETS)
+        self.lane_waiting = Gauge("matching_lane_queue_depth", "Requests waiting for an execution lane slot")
+        self.lane_active = Gauge("matching_lane_active", "Requests running in an execution lane")
+        self.lane_wait_seconds = Histogram("matching_lane_wait_seconds", "Time spent queued before a lane slot",
+                                           SECONDS_BUCKETS)
+        self.lane_rejected = Counter("matching_lane_rejected_total", "Requests rejected with 429 because a lane queue was full")
+        self.result_cache = Counter("matching_result_cache_total", "Match result cache lookups by outcome (hit, coalesced, miss)")
+
+    def observe(self, histogram: Histogram, value: float, **labels: str):
+        key = tuple(sorted(labels.items()))
+        with self._lock:
+            histogram.observe(value, key)
+
+    def inc(self, counter: Counter, value: float = 1.0, **labels: str):
+        key = tuple(sorted(labels.items()))
+        with self._lock:
+            counter.inc(key, value)
+
+    def set(self, gauge: Gauge, value: float, **labels: str):
+        key = tuple(sorted(labels.items()))
+        with self._lock:
+            gauge.set(key, value)
+
+    def render(self) -> str:
+        with self._lock:
+            lines: List[str] = []
+            for metric in (self.requests, self.request_seconds, self.stage_seconds, self.cohort_size,
+                           self.inference_batch, self.lane_waiting, self.lane_active, self.lane_wait_seconds,
+                           self.lane_rejected, self.result_cache):
+                lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+METRICS = MetricsRegistry()
+
+
+class RequestTiming:
+    """요청 하나의 단계별 시간 (ms)과 라벨 (엔드포인트, strategy)"""
+
+    def __init__(self, scope, started: float, collect_only: bool = False):
+        self.scope = scope
+        self.started = started
+        # collect_only: 히스토그램에는 쓰지 않고 stages만 모은다 (워커 프로세스에서 모아 요청 프로세스로 넘길 때)
+        self.collect_only = collect_only
+        self.stages: Dict[str, float] = {}
+        self.labels: Dict[str, str] = {}
+        self.handler_done: Optional[float] = None
+
+
+_current: contextvars.ContextVar[Optional[RequestTiming]] = contextvars.ContextVar("request_timing", default=None)
+
+
+def _endpoint(timing: Optional[RequestTiming] = None) -> str:
+    """지표 라벨용 엔드포인트 경로 템플릿 (등록되지 않은 경로는 "other"로 묶어 라벨 수가 늘지 않게 한다)"""
+    timing = timing or _current.get()
+    route = timing.scope.get("route") if timing else None
+    return getattr(route, "path", "other")
+
+
+def record_stage(name: str, seconds: float):
+    """단계 시간을 히스토그램과 현재 요청의 X-Timing에 기록 (같은 단계가 여러 번이면 합산)"""
+    timing = _current.get()
+    if timing is not None:
+        timing.stages[name] = timing.stages.get(name, 0.0) + seconds * 1000
+        if timing.collect_only:
+            return
+    METRICS.observe(METRICS.stage_seconds, seconds, endpoint=_endpoint(), stage=name)
+
+
+@contextmanager
+def collect_stages() -> Iterator[Dict[str, float]]:
+    """with 블록 안의 stage() 시간을 지표에 쓰지 않고 dict(ms)로 모은다 (merge_stages로 요청 쪽에 기록)"""
+    token = _current.set(RequestTiming({}, time.perf_counter(), collect_only=True))
+    try:
+        yield _current.get().stages
+    finally:
+        _current.reset(token)
+
+
+def merge_stages(stages: Dict[str, float]):
+    """다른 프로세스/컨텍스트에서 collect_stages로 모은 단계 시간을 현재 요청에 기록"""
+    for name, ms in stages.items():
+        record_stage(name, ms / 1000)
+
+
+@contextmanager
+def stage(name: str) -> Iterator[None]:
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        record_stage(name, time.perf_counter() - started)
+
+
+def set_label(key: str, value: str):
+    """현재 요청의 지표 라벨 설정 (예: strategy)"""
+    timing = _current.get()
+    if timing is not None:
+        timing.labels[key] = value
+
+
+def observe_cohort(size: int):
+    METRICS.observe(METRICS.cohort_size, size, endpoint=_endpoint())
+
+
+def observe_inference_batch(size: int):
+    METRICS.observe(METRICS.inference_batch, size)
+
+
+def mark_serialization():
+    """핸들러 안에서 직접 응답 본문을 만드는 경우, 지금부터 응답 시작까지를 serialization 단계로 기록"""
+    timing = _current.get()
+    if timing is not None:
+        timing.handler_done = time.perf_counter()
+
+
+def timed_endpoint(fn: Callable) -> Callable:
+    """엔드포인트 함수 래퍼
+
+    미들웨어 진입부터 함수 시작까지(본문 읽기, JSON 파싱, pydantic 검증, 의존성)를 validate 단계로,
+    함수 반환부터 응답 시작까지(response_model 직렬화)를 serialization 단계로 기록한다.
+    """
+    def before():
+        timing = _current.get()
+        if timing is not None:
+            record_stage("validate", time.perf_counter() - timing.started)
+
+    def after():
+        timing = _current.get()
+        if timing is not None and timing.handler_done is None:
+            timing.handler_done = time.perf_counter()
+
+    if inspect.iscoroutinefunction(fn):
+        @functools.wraps(fn)
+        async def wrapper(*args, **kwargs):
+            before()
+            try:
+                return await fn(*args, **kwargs)
+            finally:
+                after()
+    else:
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            before()
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                after()
+    return wrapper
+
+
+class MetricsMiddleware:
+    """요청 수/지연 시간 집계와 X-Timing 헤더를 붙이는 ASGI 미들웨어
+
+    스트리밍 응답도 그대로 통과시키기 위해 BaseHTTPMiddleware 대신 send를 감싼다.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+        timing = RequestTiming(scope, time.perf_counter())
+        token = _current.set(timing)
+        want_header = TIMING_HEADER or any(k == b"x-timing" for k, _ in scope.get("headers", ()))
+        status = {"code": 500}
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                status["code"] = message["status"]
+                now = time.perf_counter()
+                if timing.handler_done is not None:
+                    record_stage("serialization", now - timing.handler_done)
+                if want_header:
+                    parts = [f"{k}={v:.2f}" for k, v in timing.stages.items()]
+                    parts.append(f"total={(now - timing.started) * 1000:.2f}")
+                    message = dict(message, headers=[*message.get("headers", []),
+                                                     (b"x-timing", ", ".join(parts).encode("latin-1"))])
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            elapsed = time.perf_counter() - timing.started
+            endpoint = _endpoint(timing)
+            METRICS.inc(METRICS.requests, endpoint=endpoint, strategy=timing.labels.get("strategy", ""),
+                        status=str(status["code"]))
+            METRICS.observe(METRICS.request_seconds, elapsed, endpoint=endpoint)
+            _current.reset(token)
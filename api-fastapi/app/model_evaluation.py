@@ -1,19 +1,20 @@
 import os
 import numpy as np
-import matplotlib.pyplot as plt
 import pickle
-from typing import List, Dict, Tuple, Any
-from sklearn.model_selection import train_test_split
-from sklearn.metrics import mean_squared_error, mean_absolute_error, r2_score
+from typing import List, Dict, Tuple, Any, Union
+# matplotlib / sklearn은 임포트 비용이 커서 실제로 쓰는 함수 안에서 임포트한다
 
-from app.data_processor import extract_student_features, prepare_training_data, load_team_data
-from app.deep_matching import DeepMatchingModel, train_model, load_model
+from app.models import TeamData
+from app.data_processor import extract_student_features, prepare_training_data, load_team_data, PAIR_FEATURE_DIM
+from app.deep_matching import DeepMatchingModel, create_model, train_model, load_model
+from app.feature_store import open_features
 
 
 def evaluate_model(model: DeepMatchingModel, X_test: np.ndarray, y_test: np.ndarray) -> Dict[str, float]:
     """모델 성능 평가"""
-    # 예측 수행
-    y_pred = model.predict(X_test)
+    from sklearn.metrics import mean_squared_error, mean_absolute_error, r2_score
+    # 예측 수행 (청크 단위 추론)
+    y_pred = model.predict_pairs(X_test)
     
     # 평가 지표 계산
     mse = mean_squared_error(y_test, y_pred)
@@ -28,19 +29,30 @@ def evaluate_model(model: DeepMatchingModel, X_test: np.ndarray, y_test: np.ndar
     }
 
 
-def cross_validate(students: List, teams: List[List], test_size: float = 0.2, epochs: int = 50) -> Dict[str, Any]:
-    """교차 검증 수행"""
-    # 학습 데이터 준비
-    X, y = prepare_training_data(students, teams)
+def cross_validate(data: Union[str, List[TeamData]], test_size: float = 0.2, epochs: int = 50) -> Dict[str, Any]:
+    """교차 검증 수행
+
+    Args:
+        data: 특성 저장소 데이터셋 경로 (memmap으로 스트리밍) 또는 팀 목록
+    """
+    from sklearn.model_selection import train_test_split
+    # 학습 데이터 준비 (저장소면 메모리에 올리지 않고 인덱스만 나눈다)
+    if isinstance(data, str):
+        X, y, _ = open_features(data)
+    else:
+        X, y = prepare_training_data(data)
     
-    # 학습/테스트 데이터 분할
-    X_train, X_test, y_train, y_test = train_test_split(X, y, test_size=test_size, random_state=42)
+    # 학습/테스트 인덱스 분할
+    train_idx, test_idx = train_test_split(np.arange(len(y)), test_size=test_size, random_state=42)
+    test_idx = np.sort(test_idx)
     
     # 모델 초기화 및 학습
-    model = DeepMatchingModel()
-    history = train_model(model, X_train, y_train, epochs=epochs, validation_data=(X_test, y_test))
+    model = create_model(PAIR_FEATURE_DIM)
+    history = train_model(model, X, y, epochs=epochs, save_path=None,
+                          indices=train_idx, validation_indices=test_idx)
     
     # 모델 평가
+    X_test, y_test = np.asarray(X[test_idx]), np.asarray(y[test_idx])
     metrics = evaluate_model(model, X_test, y_test)
     
     return {
@@ -53,6 +65,7 @@ def cross_validate(students: List, teams: List[List], test_size: float = 0.2, ep
 
 def plot_learning_curves(history, save_path: str = None):
     """학습 곡선 시각화"""
+    import matplotlib.pyplot as plt
     plt.figure(figsize=(12, 5))
     
     # 손실 그래프
@@ -89,6 +102,7 @@ def plot_learning_curves(history, save_path: str = None):
 
 def compare_models(traditional_scores: List[float], deep_scores: List[float], true_scores: List[float] = None):
     """전통적 알고리즘과 딥러닝 모델 비교"""
+    import matplotlib.pyplot as plt
     plt.figure(figsize=(10, 6))
     
     x = np.arange(len(traditional_scores))
@@ -141,11 +155,11 @@ def run_full_evaluation(data_path: str, model_path: str, output_dir: str, epochs
     # 출력 디렉토리 생성
     os.makedirs(output_dir, exist_ok=True)
     
-    # 데이터 로드
-    students, teams = load_team_data(data_path)
+    # 데이터 로드 (특성 저장소 데이터셋이면 그대로 스트리밍, 아니면 팀 이력 저장소)
+    data = data_path if os.path.exists(os.path.join(data_path, "meta.json")) else load_team_data(data_path)
     
     # 교차 검증 수행
-    cv_results = cross_validate(students, teams, epochs=epochs)
+    cv_results = cross_validate(data, epochs=epochs)
     
     # 학습 곡선 저장
     curve_path = os.path.join(output_dir, 'learning_curves.png')
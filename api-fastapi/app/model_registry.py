@@ -0,0 +1,185 @@
+import os
+import time
+import shutil
+import threading
+from typing import Any, Dict, List, Optional
+
+# 모델 상태
+#   not_loaded: 아직 로드를 시작하지 않음 (TensorFlow 미임포트)
+#   loading:    백그라운드에서 TensorFlow 임포트/모델 로드/워밍업 중
+#   ready:      추론 가능
+#   missing:    저장된 모델 파일이 없음 (/match/train으로 학습 필요)
+#   failed:     로드 중 오류
+
+# 학습으로 만든 모델은 <model_dir>/versions/<version>에 저장하고,
+# 서빙 중인 버전 이름은 <model_dir>/CURRENT 파일에 기록한다 (재시작 시 이 버전을 로드)
+VERSIONS_DIR = "versions"
+CURRENT_FILE = "CURRENT"
+
+
+def deep_module():
+    """TensorFlow를 끌어오는 deep_matching 모듈을 처음 필요할 때 임포트"""
+    from app import deep_matching
+    return deep_matching
+
+
+def inference_module():
+    """TensorFlow 없이 쓰는 추론 모듈 (쌍 점수 예측, 팀 배정, NumPy 백엔드)"""
+    from app import deep_inference
+    return deep_inference
+
+
+def load_serving_model(path: str, backend: str = "keras", quantize: str = "none") -> Any:
+    """서빙용 모델 로드 (없으면 None)
+
+    numpy 백엔드는 모델 디렉토리의 lite.npz로 NumPy 순전파 모델을 만들어 TensorFlow를 임포트하지 않는다.
+    lite.npz가 없는 (이전에 학습한) 모델이면 한 번만 TensorFlow로 SavedModel을 읽어 내보낸다.
+    """
+    if backend == "numpy":
+        model = inference_module().load_lite(path, quantize)
+        if model is not None or not os.path.exists(path):
+            return model
+        keras_model = deep_module().load_model(path)
+        if keras_model is None:
+            return None
+        diff = deep_module().export_lite_model(keras_model, path)
+        print(f"lite 모델 내보내기: {path} (Keras와 최대 차이 {diff:.2e})")
+        return inference_module().load_lite(path, quantize)
+    return deep_module().load_model(path)
+
+
+class ModelRegistry:
+    """딥러닝 모델의 지연 로드, 워밍업, 버전 교체 관리
+
+    TensorFlow 임포트, SavedModel 로드, 더미 배치 추론(그래프 트레이스)을 백그라운드 스레드에서 한 번만 수행한다.
+    딥러닝을 쓰지 않는 요청은 이 과정과 무관하게 바로 처리된다.
+    새 버전은 완전히 로드/워밍업한 뒤 참조만 바꿔 끼우므로, 요청 시작 시 get()으로 받은 모델은 요청이 끝날 때까지 그대로다.
+    """
+
+    def __init__(self, model_dir: str, legacy_name: str = "team_matching_model", keep_versions: int = 3,
+                 backend: str = "keras", quantize: str = "none"):
+        inference = inference_module()
+        if backend not in inference.DEEP_BACKENDS:
+            raise ValueError(f"backend must be one of {', '.join(inference.DEEP_BACKENDS)}")
+        if quantize not in inference.QUANTIZE_MODES:
+            raise ValueError(f"quantize must be one of {', '.join(inference.QUANTIZE_MODES)}")
+        self.model_dir = model_dir
+        self.backend = backend
+        self.quantize = quantize
+        self.legacy_path = os.path.join(model_dir, legacy_name)
+        self.keep_versions = keep_versions
+        self.model = None
+        self.version: Optional[str] = None
+        self.state = "not_loaded"
+        self.error: Optional[str] = None
+        self.timings: Dict[str, float] = {}
+        self._lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+
+    def version_path(self, version: str) -> str:
+        return os.path.join(self.model_dir, VERSIONS_DIR, version)
+
+    def current_version(self) -> Optional[str]:
+        """CURRENT 파일에 기록된 버전 (없으면 None)"""
+        try:
+            with open(os.path.join(self.model_dir, CURRENT_FILE), encoding="utf-8") as f:
+                version = f.read().strip()
+        except OSError:
+            return None
+        return version if version and os.path.exists(self.version_path(version)) else None
+
+    def start_warmup(self) -> threading.Thread:
+        """백그라운드 로드/워밍업 시작 (이미 시작했으면 기존 스레드 반환)"""
+        with self._lock:
+            if self._thread is None:
+                if self.state == "not_loaded":
+                    self.state = "loading"
+                self._thread = threading.Thread(target=self._load, name="model-warmup", daemon=True)
+                self._thread.start()
+            return self._thread
+
+    def _load(self):
+        version = self.current_version()
+        path = self.version_path(version) if version else self.legacy_path
+        # 모델 파일이 없으면 TensorFlow를 임포트하지 않는다
+        if not os.path.exists(path):
+            with self._lock:
+                if self.model is None:
+                    self.state = "missing"
+            print("딥러닝 모델이 없습니다. 기본 그리디 알고리즘을 사용합니다.")
+            print("새 모델이 필요할 경우 /match/train 엔드포인트를 사용하세요.")
+            return
+        try:
+            started = time.perf_counter()
+            # numpy 백엔드는 TensorFlow 대신 NumPy 추론 모듈만 임포트한다
+            inference = inference_module() if self.backend == "numpy" else deep_module()
+            imported = time.perf_counter()
+            model = load_serving_model(path, self.backend, self.quantize)
+            if model is None:
+                raise RuntimeError(f"모델 로드 실패: {path}")
+            loaded = time.perf_counter()
+            inference.warm_up(model)
+            done = time.perf_counter()
+            with self._lock:
+                self.timings = {
+                    "import_ms": round((imported - started) * 1000, 1),
+                    "load_ms": round((loaded - imported) * 1000, 1),
+                    "warmup_ms": round((done - loaded) * 1000, 1),
+                }
+                # 로드 도중 학습으로 새 모델이 들어왔으면 덮어쓰지 않는다
+                if self.model is None:
+                    self.model = model
+                    self.version = version or "legacy"
+                    self.state = "ready"
+            print(f"딥러닝 모델 로드 성공 ({self.version}, {self.timings})")
+        except Exception as e:
+            with self._lock:
+                if self.model is None:
+                    self.state = "failed"
+                    self.error = str(e)
+            print(f"딥러닝 모델 로드 실패: {e}")
+
+    def load_version(self, path: str) -> Any:
+        """저장된 모델을 로드하고 더미 배치로 워밍업 (실패하면 예외)"""
+        model = load_serving_model(path, self.backend, self.quantize)
+        if model is None:
+            raise RuntimeError(f"모델 로드 실패: {path}")
+        inference_module().warm_up(model)
+        return model
+
+    def get(self, timeout: Optional[float] = None) -> Any:
+        """모델 반환 (로드 전이면 로드를 시작하고 timeout초까지 기다림, 준비되지 않으면 None)"""
+        if self.model is not None:
+            return self.model
+        self.start_warmup().join(timeout)
+        return self.model
+
+    def swap(self, model: Any, version: str):
+        """워밍업이 끝난 새 버전으로 서빙 모델을 교체하고 CURRENT에 기록"""
+        with self._lock:
+            self.model = model
+            self.version = version
+            self.state = "ready"
+            self.error = None
+        pointer = os.path.join(self.model_dir, CURRENT_FILE)
+        tmp = pointer + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            f.write(version)
+        os.replace(tmp, pointer)
+        self._prune_versions(version)
+
+    def _prune_versions(self, current: str):
+        """최근 keep_versions개를 남기고 오래된 버전 디렉토리 삭제"""
+        root = os.path.join(self.model_dir, VERSIONS_DIR)
+        try:
+            versions: List[str] = sorted(os.listdir(root))
+        except OSError:
+            return
+        for old in versions[:-self.keep_versions]:
+            if old != current:
+                shutil.rmtree(os.path.join(root, old), ignore_errors=True)
+
+    def status(self) -> Dict[str, Any]:
+        with self._lock:
+            return {"state": self.state, "version": self.version, "error": self.error, "backend": self.backend,
+                    "quantize": self.quantize, **self.timings}
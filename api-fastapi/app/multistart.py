@@ -0,0 +1,175 @@
+import os
+import time
+import numpy as np
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, List, Optional, Sequence, Tuple
+from app.compatibility import greedy_assign
+from app.balancing import TeamState
+
+# 워커 프로세스 풀 (요청마다 새로 띄우지 않도록 모듈 단위로 재사용)
+_POOL: Optional[ProcessPoolExecutor] = None
+MAX_WORKERS = int(os.getenv("MULTISTART_WORKERS", "0")) or (os.cpu_count() or 1)
+
+
+def get_pool() -> ProcessPoolExecutor:
+    """멀티스타트용 프로세스 풀
+
+    부모 프로세스에 TensorFlow가 로드되어 있을 수 있으므로 fork 대신 spawn으로 워커를 띄운다.
+    """
+    global _POOL
+    if _POOL is None:
+        _POOL = ProcessPoolExecutor(max_workers=MAX_WORKERS, mp_context=multiprocessing.get_context("spawn"))
+    return _POOL
+
+
+def shutdown_pool():
+    """멀티스타트 프로세스 풀 종료 (서버 종료 시 호출, 다음 get_pool()에서 새로 띄운다)"""
+    global _POOL
+    if _POOL is not None:
+        _POOL.shutdown(wait=True, cancel_futures=True)
+        _POOL = None
+
+
+def seed_order(students_c: Sequence[float], is_pm: Sequence[bool], seed: int) -> List[int]:
+    """그리디 시작 순서
+
+    seed 0은 기존 greedy_match와 같은 (PM 우선, C 내림차순) 순서이고,
+    나머지 seed는 PM 우선만 유지한 채 순서를 무작위로 섞는다.
+    """
+    n = len(students_c)
+    if seed == 0:
+        return sorted(range(n), key=lambda i: (is_pm[i], students_c[i]), reverse=True)
+    rng = np.random.default_rng(seed)
+    perm = rng.permutation(n).tolist()
+    return sorted(perm, key=lambda i: not is_pm[i])
+
+
+def total_score(scores: np.ndarray, teams: Sequence[Sequence[int]], roles: Sequence[str],
+                req_roles: Dict[str, int]) -> float:
+    """팀별 team_score(반올림 포함)의 합"""
+    return float(sum(TeamState(t, scores, roles, req_roles).score for t in teams))
+
+
+def local_search(scores: np.ndarray, teams: List[List[int]], roles: Sequence[str],
+                 req_roles: Dict[str, int], deadline: float) -> List[List[int]]:
+    """팀 간 멤버 교환(2-opt)으로 전체 team_score 합을 개선하는 지역 탐색
+
+    A[s, t] = 학생 s와 팀 t 멤버들의 쌍 점수 합을 유지하면, 팀 x의 멤버 i와 다른 팀 학생 c를
+    맞바꿀 때의 두 팀 점수 변화를 (팀 크기 × N) 벡터 연산 한 번으로 모두 구할 수 있다.
+    팀마다 가장 좋은 개선 교환을 적용하고, 개선이 없거나 deadline이 지나면 종료한다.
+    탐색 중에는 반올림 전 점수를 목적함수로 사용한다.
+    """
+    n, n_teams = scores.shape[0], len(teams)
+    if n_teams < 2:
+        return teams
+    teams = [list(t) for t in teams]
+    team_of = np.empty(n, dtype=np.intp)
+    for t, members in enumerate(teams):
+        team_of[members] = t
+    A = np.stack([scores[:, members].sum(axis=1) for members in teams], axis=1)
+    diag = np.diag(scores).copy()
+    sizes = np.array([len(t) for t in teams])
+    n_pairs = np.maximum(1, sizes * (sizes - 1) // 2).astype(np.float64)
+
+    role_ids: Dict[str, int] = {}
+    rcode = np.array([role_ids.setdefault(r, len(role_ids)) for r in roles], dtype=np.intp)
+    for r in req_roles:
+        role_ids.setdefault(r, len(role_ids))
+    req = np.zeros(len(role_ids), dtype=np.int64)
+    for r, rc in req_roles.items():
+        req[role_ids[r]] = rc
+    in_req = np.zeros(len(role_ids), dtype=bool)
+    in_req[[role_ids[r] for r in req_roles]] = True
+    need = max(1, sum(req_roles.values()))
+    counts = np.zeros((n_teams, len(role_ids)), dtype=np.int64)
+    np.add.at(counts, (team_of, rcode), 1)
+
+    improved = True
+    while improved and time.time() < deadline:
+        improved = False
+        # 역할 보너스 변화: 나가는 역할이 필요 수 이하면 커버리지 -1, 들어오는 역할이 부족하면 +1
+        lose = in_req[rcode] & (counts[team_of, rcode] <= req[rcode])
+        gain_flag = in_req[None, :] & (counts < req[None, :])
+        contrib = A[np.arange(n), team_of] - diag
+        for x in range(n_teams):
+            X = np.array(teams[x], dtype=np.intp)
+            SX = scores[X]
+            delta_x = (A[:, x][None, :] - SX - contrib[X][:, None]) / n_pairs[x]
+            delta_y = (A[X][:, team_of] - SX - contrib[None, :]) / n_pairs[team_of][None, :]
+            d_ok = (gain_flag[x, rcode][None, :].astype(np.int64) - lose[X][:, None]
+                    + gain_flag[team_of[None, :], rcode[X][:, None]] - lose[None, :])
+            d_ok[rcode[X][:, None] == rcode[None, :]] = 0
+            gain = delta_x + delta_y + 0.1 * d_ok / need
+            gain[:, team_of == x] = -np.inf
+            i, c = np.unravel_index(int(np.argmax(gain)), gain.shape)
+            if gain[i, c] <= 1e-9:
+                continue
+            a, c = int(X[i]), int(c)
+            y = int(team_of[c])
+            teams[x][int(i)] = c
+            teams[y][teams[y].index(c)] = a
+            team_of[a], team_of[c] = y, x
+            A[:, x] += scores[:, c] - scores[:, a]
+            A[:, y] += scores[:, a] - scores[:, c]
+            counts[x, rcode[a]] -= 1; counts[x, rcode[c]] += 1
+            counts[y, rcode[c]] -= 1; counts[y, rcode[a]] += 1
+            lose = in_req[rcode] & (counts[team_of, rcode] <= req[rcode])
+            gain_flag[[x, y]] = in_req[None, :] & (counts[[x, y]] < req[None, :])
+            touched = np.array(teams[x] + teams[y], dtype=np.intp)
+            contrib[touched] = A[touched, team_of[touched]] - diag[touched]
+            improved = True
+        if time.time() >= deadline:
+            break
+    return teams
+
+
+def run_seeds(scores: np.ndarray, roles: Sequence[str], students_c: Sequence[float], is_pm: Sequence[bool],
+              team_size: int, req_roles: Dict[str, int], seeds: Sequence[int], deadline: float) -> Dict:
+    """워커 하나가 맡은 seed들을 실행하고 가장 좋은 배정을 반환"""
+    started = time.time()
+    best_teams, best_total, done = None, -1.0, 0
+    for seed in seeds:
+        # 첫 seed는 시간이 지나도 실행해 항상 결과를 하나는 낸다
+        if done and time.time() >= deadline:
+            break
+        order = seed_order(students_c, is_pm, seed)
+        teams = greedy_assign(scores, order, roles, team_size, req_roles)
+        teams = local_search(scores, teams, roles, req_roles, deadline)
+        total = total_score(scores, teams, roles, req_roles)
+        if total > best_total:
+            best_total, best_teams = total, teams
+        done += 1
+    return {
+        "pid": os.getpid(),
+        "seeds_run": done,
+        "elapsed_ms": round((time.time() - started) * 1000, 1),
+        "best_total": round(best_total, 3),
+        "teams": best_teams,
+    }
+
+
+def multistart_match(scores: np.ndarray, roles: Sequence[str], students_c: Sequence[float], is_pm: Sequence[bool],
+                     team_size: int, req_roles: Dict[str, int], n_seeds: int = 8,
+                     time_budget_ms: int = 2000) -> Tuple[List[List[int]], List[Dict]]:
+    """K개의 무작위 그리디 seed + 지역 탐색을 프로세스 풀에서 병렬 실행
+
+    Returns:
+        전체 team_score 합이 가장 큰 배정(인덱스 리스트)과 워커별 실행 정보
+    """
+    deadline = time.time() + time_budget_ms / 1000.0
+    n_seeds = max(1, n_seeds)
+    n_tasks = min(n_seeds, MAX_WORKERS)
+    chunks = [list(range(k, n_seeds, n_tasks)) for k in range(n_tasks)]
+    args = (scores, list(roles), list(students_c), list(is_pm), team_size, dict(req_roles))
+
+    if n_tasks == 1:
+        results = [run_seeds(*args, chunks[0], deadline)]
+    else:
+        pool = get_pool()
+        futures = [pool.submit(run_seeds, *args, chunk, deadline) for chunk in chunks]
+        results = [f.result() for f in futures]
+
+    best = max(results, key=lambda r: r["best_total"])
+    workers = [{k: v for k, v in r.items() if k != "teams"} for r in results]
+    return best["teams"], workers
@@ -0,0 +1,283 @@
+import os
+import time
+import numpy as np
+from itertools import combinations
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+from app.compatibility import greedy_assign, team_sizes
+from app.multistart import local_search, seed_order
+
+# 정확해 탐색을 시도하는 코호트 크기 상한
+#   CP-SAT: OR-Tools가 설치되어 있을 때 (쌍 변수 수가 N²×팀 수로 늘어나므로 중간 크기까지만)
+#   분기한정: OR-Tools가 없을 때의 순수 Python 정확해 탐색
+CPSAT_MAX_STUDENTS = int(os.getenv("OPTIMAL_CPSAT_MAX_STUDENTS", "60"))
+BNB_MAX_STUDENTS = int(os.getenv("OPTIMAL_BNB_MAX_STUDENTS", "12"))
+# CP-SAT 목적함수 정수화 배율
+CPSAT_SCALE = 10000
+
+try:
+    from ortools.sat.python import cp_model
+except ImportError:  # requirements.txt에 있지만, 없는 환경에서는 분기한정 + 지역 탐색만 사용
+    cp_model = None
+
+
+def _n_pairs(size: int) -> int:
+    return size * (size - 1) // 2
+
+
+def team_value(scores: np.ndarray, members: Sequence[int], roles: Sequence[str], req_roles: Dict[str, int]) -> float:
+    """team_score의 반올림 전 값 (팀 내부 쌍 점수 평균 + 역할 커버리지 보너스)"""
+    internal = 0.0
+    if len(members) >= 2:
+        block = scores[np.ix_(members, members)]
+        internal = float(np.triu(block, 1).sum()) / _n_pairs(len(members))
+    counts: Dict[str, int] = {}
+    for m in members:
+        counts[roles[m]] = counts.get(roles[m], 0) + 1
+    ok = sum(min(counts.get(r, 0), rc) for r, rc in req_roles.items())
+    return internal + 0.1 * (ok / max(1, sum(req_roles.values())))
+
+
+def objective(scores: np.ndarray, teams: Sequence[Sequence[int]], roles: Sequence[str],
+              req_roles: Dict[str, int]) -> float:
+    return float(sum(team_value(scores, t, roles, req_roles) for t in teams))
+
+
+def student_bounds(scores: np.ndarray, sizes: Sequence[int]) -> np.ndarray:
+    """학생별 팀 내부 점수 기여 상한
+
+    크기 s인 팀의 내부 평균은 (1/2)Σ_i(팀 안에서 i의 쌍 점수 합) / C(s,2)이고,
+    i의 쌍 점수 합은 i와 점수가 가장 높은 s-1명과의 합을 넘을 수 없다.
+    """
+    n = scores.shape[0]
+    if n < 2:
+        return np.zeros(n)
+    S = scores.astype(np.float64, copy=True)
+    np.fill_diagonal(S, -np.inf)
+    top = np.cumsum(-np.sort(-S, axis=1)[:, :n - 1], axis=1)
+    bound = np.zeros(n)
+    for s in set(sizes):
+        if s >= 2:
+            bound = np.maximum(bound, top[:, s - 2] / (2 * _n_pairs(s)))
+    return bound
+
+
+def role_bonus_bound(sizes: Sequence[int], roles: Sequence[str], req_roles: Dict[str, int]) -> float:
+    """전체 역할 보너스 상한 (팀마다 min(팀 크기, 필요 인원), 역할마다 min(학생 수, 팀 수 × 필요 수))"""
+    need = sum(req_roles.values())
+    per_team = sum(min(s, need) for s in sizes)
+    per_role = sum(min(sum(1 for r in roles if r == role), len(sizes) * rc) for role, rc in req_roles.items())
+    return 0.1 * min(per_team, per_role) / max(1, need)
+
+
+def upper_bound(scores: np.ndarray, sizes: Sequence[int], roles: Sequence[str], req_roles: Dict[str, int]) -> float:
+    return float(student_bounds(scores, sizes).sum()) + role_bonus_bound(sizes, roles, req_roles)
+
+
+def search_feasible(scores: np.ndarray, roles: Sequence[str], students_c: Sequence[float], is_pm: Sequence[bool],
+                    team_size: int, req_roles: Dict[str, int], n_seeds: int, deadline: float) -> List[List[int]]:
+    """그리디 seed(팀 크기는 team_sizes) + 교환 지역 탐색으로 좋은 실행 가능해를 찾는다"""
+    best, best_value = None, -np.inf
+    for seed in range(max(1, n_seeds)):
+        if best is not None and time.time() >= deadline:
+            break
+        teams = greedy_assign(scores, seed_order(students_c, is_pm, seed), roles, team_size, req_roles)
+        teams = local_search(scores, teams, roles, req_roles, deadline)
+        value = objective(scores, teams, roles, req_roles)
+        if value > best_value:
+            best, best_value = teams, value
+    return best
+
+
+def branch_and_bound(scores: np.ndarray, sizes: Sequence[int], roles: Sequence[str], req_roles: Dict[str, int],
+                     incumbent: List[List[int]], deadline: float) -> Tuple[List[List[int]], bool]:
+    """작은 코호트용 정확해 분기한정
+
+    팀을 하나씩 만든다. 새 팀은 남은 크기 중 하나를 고르고, 남은 학생 중 번호가 가장 작은 학생을 첫 멤버로 둔다
+    (같은 크기 팀의 순서 대칭 제거). 남은 학생들의 student_bounds 합 + 남은 팀 역할 보너스 상한이
+    현재 최선해 이하인 가지는 버린다.
+
+    Returns:
+        (최선 배정, 탐색 완료 여부) - deadline을 넘기면 그때까지의 최선해와 False
+    """
+    n = scores.shape[0]
+    bounds = student_bounds(scores, sizes)
+    need = max(1, sum(req_roles.values()))
+    best = [list(t) for t in incumbent]
+    best_value = objective(scores, best, roles, req_roles)
+    state = {"nodes": 0, "timed_out": False}
+
+    def rest_bound(remaining: Sequence[int], rest_sizes: Sequence[int]) -> float:
+        bonus = sum(0.1 * min(s, need) / need for s in rest_sizes)
+        return float(bounds[list(remaining)].sum()) + bonus
+
+    def expand(remaining: List[int], rest_sizes: List[int], teams: List[List[int]], value: float):
+        nonlocal best, best_value
+        if not remaining:
+            if value > best_value + 1e-12:
+                best, best_value = [list(t) for t in teams], value
+            return
+        state["nodes"] += 1
+        if state["nodes"] % 256 == 0 and time.time() >= deadline:
+            state["timed_out"] = True
+        if state["timed_out"] or value + rest_bound(remaining, rest_sizes) <= best_value + 1e-12:
+            return
+        first, others = remaining[0], remaining[1:]
+        for size in sorted(set(rest_sizes), reverse=True):
+            sizes_left = list(rest_sizes)
+            sizes_left.remove(size)
+            # 팀 가치가 높은 후보부터 보면 좋은 해를 일찍 찾아 가지치기가 빨라진다
+            candidates = []
+            for rest in combinations(others, size - 1):
+                members = [first, *rest]
+                candidates.append((team_value(scores, members, roles, req_roles), members))
+            candidates.sort(key=lambda c: -c[0])
+            for team_val, members in candidates:
+                chosen = set(members)
+                left = [i for i in remaining if i not in chosen]
+                if value + team_val + rest_bound(left, sizes_left) <= best_value + 1e-12:
+                    continue
+                teams.append(members)
+                expand(left, sizes_left, teams, value + team_val)
+                teams.pop()
+                if state["timed_out"]:
+                    return
+
+    expand(list(range(n)), list(sizes), [], 0.0)
+    return best, not state["timed_out"]
+
+
+def _size_slots(sizes: Sequence[int]) -> Dict[int, List[int]]:
+    """팀 크기 → 그 크기인 팀 위치 목록"""
+    slots: Dict[int, List[int]] = {}
+    for t, size in enumerate(sizes):
+        slots.setdefault(size, []).append(t)
+    return slots
+
+
+def solve_cpsat(scores: np.ndarray, sizes: Sequence[int], roles: Sequence[str], req_roles: Dict[str, int],
+                hint: List[List[int]], time_limit_s: float) -> Optional[Dict[str, Any]]:
+    """CP-SAT 정수계획 모델 (OR-Tools가 없으면 None)
+
+    x[i,t]: 학생 i가 팀 t에 배정, y[i,j,t] ≤ x[i,t], x[j,t]: 두 학생이 같은 팀,
+    cov[t,r] ≤ min(필요 수, 팀 t의 역할 r 인원): 역할 커버리지.
+    목적함수는 Σ_t (Σ y·pair_score / C(s_t,2) + 0.1·Σ cov / 필요 인원)을 CPSAT_SCALE배 정수화한 값이다.
+    """
+    if cp_model is None:
+        return None
+    n, T = scores.shape[0], len(sizes)
+    need = max(1, sum(req_roles.values()))
+    model = cp_model.CpModel()
+    x = [[model.NewBoolVar(f"x{i}_{t}") for t in range(T)] for i in range(n)]
+    for i in range(n):
+        model.AddExactlyOne(x[i])
+    for t, size in enumerate(sizes):
+        model.Add(sum(x[i][t] for i in range(n)) == size)
+    # 대칭 제거: 크기가 같은 팀끼리만 가장 작은 학생 번호 순으로 둔다
+    # (다음 팀에 학생 i가 있으면 앞 팀에는 i보다 번호가 작은 학생이 있어야 한다)
+    slots = _size_slots(sizes)
+    for same in slots.values():
+        for a, b in zip(same, same[1:]):
+            for i in range(n):
+                model.Add(x[i][b] <= sum(x[j][a] for j in range(i)))
+
+    terms = []
+    for t, size in enumerate(sizes):
+        if size < 2:
+            continue
+        for i in range(n):
+            for j in range(i + 1, n):
+                coef = int(round(float(scores[i, j]) / _n_pairs(size) * CPSAT_SCALE))
+                if coef <= 0:
+                    continue
+                y = model.NewBoolVar(f"y{i}_{j}_{t}")
+                model.AddImplication(y, x[i][t])
+                model.AddImplication(y, x[j][t])
+                terms.append(coef * y)
+        for r, rc in req_roles.items():
+            members = [x[i][t] for i in range(n) if roles[i] == r]
+            if not members or rc <= 0:
+                continue
+            cov = model.NewIntVar(0, rc, f"cov{t}_{r}")
+            model.Add(cov <= sum(members))
+            terms.append(int(round(0.1 / need * CPSAT_SCALE)) * cov)
+    model.Maximize(sum(terms))
+
+    # 힌트 팀은 같은 크기 자리에 대칭 제거와 같은 순서로 놓는다
+    by_size: Dict[int, List[List[int]]] = {}
+    for members in hint:
+        by_size.setdefault(len(members), []).append(sorted(members))
+    if all(len(by_size.get(size, [])) == len(same) for size, same in slots.items()):
+        for size, same in slots.items():
+            for t, members in zip(same, sorted(by_size[size])):
+                chosen = set(members)
+                for i in range(n):
+                    model.AddHint(x[i][t], i in chosen)
+
+    solver = cp_model.CpSolver()
+    solver.parameters.max_time_in_seconds = max(0.05, time_limit_s)
+    solver.parameters.num_search_workers = os.cpu_count() or 1
+    status = solver.Solve(model)
+    if status not in (cp_model.OPTIMAL, cp_model.FEASIBLE):
+        return None
+    teams = [[i for i in range(n) if solver.Value(x[i][t])] for t in range(T)]
+    return {
+        "teams": teams,
+        "optimal": status == cp_model.OPTIMAL,
+        "bound": solver.BestObjectiveBound() / CPSAT_SCALE,
+    }
+
+
+def optimal_match(scores: np.ndarray, roles: Sequence[str], students_c: Sequence[float], is_pm: Sequence[bool],
+                  team_size: int, req_roles: Dict[str, int], n_seeds: int = 8,
+                  time_budget_ms: int = 2000) -> Tuple[List[List[int]], Dict[str, Any]]:
+    """팀 크기를 team_sizes로 고정하고 전체 team_score 합(반올림 전)을 최대화
+
+    1) 그리디 seed + 교환 지역 탐색으로 실행 가능해를 구하고 (예산의 절반까지)
+    2) 남은 시간 동안 CP-SAT(OR-Tools 설치 시) 또는 분기한정(작은 코호트)으로 정확해를 찾는다.
+    상한은 CP-SAT의 목적함수 상한, 탐색을 끝낸 분기한정이면 최적값, 그 외에는 upper_bound를 쓴다.
+
+    Returns:
+        (팀 인덱스 리스트, 풀이 정보: method / status / objective / bound / gap / elapsed_ms)
+    """
+    started = time.time()
+    deadline = started + time_budget_ms / 1000.0
+    n = scores.shape[0]
+    sizes = team_sizes(n, team_size)
+    if len(sizes) <= 1:
+        # 빈 코호트는 팀 없음, 한 팀이면 전원
+        teams = [list(range(n))] if n else []
+        value = objective(scores, teams, roles, req_roles)
+        return teams, _solver_info("trivial", True, value, value, started)
+
+    teams = search_feasible(scores, roles, students_c, is_pm, team_size, req_roles, n_seeds,
+                            started + (deadline - started) / 2)
+    bound = upper_bound(scores, sizes, roles, req_roles)
+    method, proven = "local_search", False
+
+    if cp_model is not None and n <= CPSAT_MAX_STUDENTS:
+        result = solve_cpsat(scores, sizes, roles, req_roles, teams, deadline - time.time())
+        if result is not None:
+            method, proven = "cp_sat", result["optimal"]
+            if objective(scores, result["teams"], roles, req_roles) > objective(scores, teams, roles, req_roles):
+                teams = result["teams"]
+            # 계수 반올림 오차만큼 여유를 둔다
+            bound = min(bound, result["bound"] + (n * n + len(sizes)) / CPSAT_SCALE)
+    elif n <= BNB_MAX_STUDENTS:
+        teams, proven = branch_and_bound(scores, sizes, roles, req_roles, teams, deadline)
+        method = "branch_and_bound"
+
+    value = objective(scores, teams, roles, req_roles)
+    if proven and method == "branch_and_bound":
+        bound = value
+    return teams, _solver_info(method, proven, value, max(bound, value), started)
+
+
+def _solver_info(method: str, proven: bool, value: float, bound: float, started: float) -> Dict[str, Any]:
+    return {
+        "method": method,
+        "status": "optimal" if proven else "feasible",
+        "objective": round(value, 4),
+        "bound": round(bound, 4),
+        "gap": round((bound - value) / max(abs(value), 1e-9), 4),
+        "elapsed_ms": round((time.time() - started) * 1000, 1),
+    }
@@ -0,0 +1,108 @@
+import os
+import tempfile
+import numpy as np
+from typing import Optional, Tuple
+
+
+class PairScoreStore:
+    """학생 쌍 점수를 상삼각(i < j) 부분만 float32로 저장하는 대칭 행렬
+
+    n(n-1)/2개 값만 행 우선으로 이어 붙여 저장하므로 행 i의 (j > i) 값들은 연속 구간이다.
+    path를 주면 np.memmap 파일에 저장해 메모리에 올리지 않는다.
+    compatibility_matrix[i, j] 형태의 인덱싱은 밀집 행렬과 동일하게 동작한다 (대각선은 1.0).
+    """
+
+    def __init__(self, n: int, path: Optional[str] = None):
+        self.n = n
+        self.size = n * (n - 1) // 2
+        self.path = path
+        if path:
+            self.values = np.memmap(path, dtype=np.float32, mode="w+", shape=(max(1, self.size),))
+        else:
+            self.values = np.zeros(max(1, self.size), dtype=np.float32)
+        rows = np.arange(n, dtype=np.int64)
+        # 행 i의 시작 위치: i*(2n-i-1)/2
+        self._offsets = rows * (2 * n - rows - 1) // 2
+
+    @property
+    def shape(self) -> Tuple[int, int]:
+        return (self.n, self.n)
+
+    @property
+    def nbytes(self) -> int:
+        return self.size * 4
+
+    def offset(self, i: int) -> int:
+        return int(self._offsets[i])
+
+    def row_span(self, start: int, stop: int) -> Tuple[int, int]:
+        """행 [start, stop)이 차지하는 저장 구간"""
+        end = self.offset(stop) if stop < self.n else self.size
+        return self.offset(start), end
+
+    def _flat(self, i, j):
+        lo = np.minimum(i, j)
+        hi = np.maximum(i, j)
+        return self._offsets[lo] + (hi - lo - 1)
+
+    def __getitem__(self, key):
+        i, j = key
+        if np.isscalar(i) and np.isscalar(j):
+            if i == j:
+                return 1.0
+            return float(self.values[self._flat(int(i), int(j))])
+        i, j = np.broadcast_arrays(np.asarray(i), np.asarray(j))
+        out = np.ones(i.shape, dtype=np.float32)
+        off = i != j
+        out[off] = self.values[self._flat(i[off], j[off])]
+        return out
+
+    def row(self, i: int) -> np.ndarray:
+        """행 i 전체 (길이 n, 대각선 1.0)"""
+        out = np.empty(self.n, dtype=np.float32)
+        js = np.arange(i)
+        out[:i] = self.values[self._offsets[js] + (i - js - 1)]
+        out[i] = 1.0
+        start = self.offset(i)
+        out[i + 1:] = self.values[start:start + self.n - i - 1]
+        return out
+
+    def to_dense(self) -> np.ndarray:
+        dense = np.ones((self.n, self.n), dtype=np.float32)
+        left, right = np.triu_indices(self.n, k=1)
+        dense[left, right] = self.values[:self.size]
+        dense[right, left] = self.values[:self.size]
+        return dense
+
+    def close(self):
+        """memmap 파일 정리"""
+        if self.path:
+            del self.values
+            try:
+                os.remove(self.path)
+            except OSError:
+                pass
+            self.path = None
+
+
+def create_store(n: int, memory_limit_bytes: int, store_dir: Optional[str] = None) -> PairScoreStore:
+    """저장소 크기가 메모리 한도의 절반을 넘으면 memmap 파일로 만든다"""
+    if n * (n - 1) // 2 * 4 > memory_limit_bytes // 2:
+        fd, path = tempfile.mkstemp(prefix="pair_scores_", suffix=".f32", dir=store_dir)
+        os.close(fd)
+        return PairScoreStore(n, path)
+    return PairScoreStore(n)
+
+
+def row_tiles(store: PairScoreStore, max_pairs: int):
+    """쌍 개수가 max_pairs를 넘지 않도록 연속된 행 구간 [start, stop)을 생성"""
+    n = store.n
+    start = 0
+    while start < n - 1:
+        stop = start + 1
+        count = n - start - 1
+        while stop < n - 1 and count + (n - stop - 1) <= max_pairs:
+            count += n - stop - 1
+            stop += 1
+        yield start, stop
+        start = stop
@@ -0,0 +1,167 @@
+import os
+import io
+import sys
+import json
+import time
+import uuid
+import pstats
+import cProfile
+import threading
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, List, Optional
+
+PROFILE_MODES = ("cprofile", "sample")
+# 샘플링 간격 (ms)
+SAMPLE_INTERVAL_MS = float(os.getenv("PROFILE_SAMPLE_MS", "5"))
+
+
+class StackSampler:
+    """한 스레드의 Python 스택을 주기적으로 읽어 collapsed stack("a;b;c 개수")으로 모으는 샘플링 프로파일러
+
+    대상 스레드에 훅을 걸지 않으므로 함수 호출마다 드는 비용이 없고, 샘플링 스레드가 간격마다 GIL을 잠깐 잡는 비용만 든다.
+    """
+
+    def __init__(self, thread_id: int, interval_ms: float = SAMPLE_INTERVAL_MS):
+        self.thread_id = thread_id
+        self.interval = interval_ms / 1000
+        self.counts: Dict[str, int] = {}
+        self.samples = 0
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="stack-sampler", daemon=True)
+
+    def start(self):
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            if frame is None:
+                continue
+            stack: List[str] = []
+            while frame is not None:
+                code = frame.f_code
+                stack.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})")
+                frame = frame.f_back
+            key = ";".join(reversed(stack))
+            self.counts[key] = self.counts.get(key, 0) + 1
+            self.samples += 1
+
+    def collapsed(self) -> str:
+        """flamegraph.pl / speedscope에서 바로 읽을 수 있는 collapsed stack 텍스트"""
+        return "".join(f"{k} {v}\n" for k, v in sorted(self.counts.items(), key=lambda kv: -kv[1]))
+
+
+class ProfileStore:
+    """요청 단위 프로파일 저장소
+
+    <root>/<profile_id>.json 에 메타데이터(엔드포인트, 학생 수, 소요 시간 등)를,
+    cprofile은 <profile_id>.prof (pstats 덤프), sample은 <profile_id>.collapsed 를 둔다.
+    최근 keep개만 남기고 오래된 것부터 지운다.
+    """
+
+    def __init__(self, root: str, keep: int = 50):
+        self.root = root
+        self.keep = keep
+        self._lock = threading.Lock()
+
+    def _path(self, profile_id: str, ext: str) -> str:
+        return os.path.join(self.root, f"{profile_id}.{ext}")
+
+    @contextmanager
+    def capture(self, mode: str, meta: Optional[Dict[str, Any]] = None) -> Iterator[str]:
+        """with 블록 안에서 현재 스레드를 프로파일하고 끝나면 저장 (블록에서 예외가 나도 저장) → profile_id"""
+        if mode not in PROFILE_MODES:
+            raise ValueError(f"profile must be one of {', '.join(PROFILE_MODES)}")
+        profile_id = uuid.uuid4().hex[:12]
+        profiler = sampler = None
+        if mode == "cprofile":
+            profiler = cProfile.Profile()
+        else:
+            sampler = StackSampler(threading.get_ident())
+        started = time.perf_counter()
+        error = None
+        if profiler is not None:
+            profiler.enable()
+        else:
+            sampler.start()
+        try:
+            yield profile_id
+        except Exception as e:
+            error = repr(e)
+            raise
+        finally:
+            if profiler is not None:
+                profiler.disable()
+            else:
+                sampler.stop()
+            elapsed_ms = round((time.perf_counter() - started) * 1000, 1)
+            info = dict(meta or {}, profile_id=profile_id, mode=mode, elapsed_ms=elapsed_ms, error=error,
+                        created_at=time.time())
+            if sampler is not None:
+                info["samples"] = sampler.samples
+            self._save(profile_id, info, profiler, sampler)
+
+    def _save(self, profile_id: str, info: Dict[str, Any], profiler: Optional[cProfile.Profile],
+              sampler: Optional[StackSampler]):
+        with self._lock:
+            os.makedirs(self.root, exist_ok=True)
+            if profiler is not None:
+                profiler.dump_stats(self._path(profile_id, "prof"))
+            else:
+                with open(self._path(profile_id, "collapsed"), "w", encoding="utf-8") as f:
+                    f.write(sampler.collapsed())
+            with open(self._path(profile_id, "json"), "w", encoding="utf-8") as f:
+                json.dump(info, f, ensure_ascii=False)
+            self._prune()
+
+    def _prune(self):
+        metas = sorted((os.path.getmtime(os.path.join(self.root, n)), n[:-5])
+                       for n in os.listdir(self.root) if n.endswith(".json"))
+        for _, old in metas[:max(0, len(metas) - self.keep)]:
+            for ext in ("json", "prof", "collapsed"):
+                try:
+                    os.remove(self._path(old, ext))
+                except FileNotFoundError:
+                    pass
+
+    def list(self) -> List[Dict[str, Any]]:
+        """저장된 프로파일 메타데이터 (최신순)"""
+        if not os.path.isdir(self.root):
+            return []
+        out = []
+        for n in os.listdir(self.root):
+            if n.endswith(".json"):
+                with open(os.path.join(self.root, n), encoding="utf-8") as f:
+                    out.append(json.load(f))
+        return sorted(out, key=lambda m: -m["created_at"])
+
+    def meta(self, profile_id: str) -> Optional[Dict[str, Any]]:
+        path = self._path(profile_id, "json")
+        if not profile_id.isalnum() or not os.path.exists(path):
+            return None
+        with open(path, encoding="utf-8") as f:
+            return json.load(f)
+
+    def raw_path(self, profile_id: str) -> Optional[str]:
+        """저장된 원본 파일 (.prof 또는 .collapsed) 경로"""
+        meta = self.meta(profile_id)
+        if meta is None:
+            return None
+        return self._path(profile_id, "prof" if meta["mode"] == "cprofile" else "collapsed")
+
+    def text(self, profile_id: str, sort: str = "cumulative", limit: int = 40) -> Optional[str]:
+        """사람이 읽는 요약: cprofile은 pstats 표(sort 기준 상위 limit개), sample은 collapsed stack 상위 limit줄"""
+        path = self.raw_path(profile_id)
+        if path is None:
+            return None
+        if path.endswith(".collapsed"):
+            with open(path, encoding="utf-8") as f:
+                return "".join(f.readlines()[:limit])
+        buf = io.StringIO()
+        stats = pstats.Stats(path, stream=buf)
+        stats.strip_dirs().sort_stats(sort).print_stats(limit)
+        return buf.getvalue()
@@ -0,0 +1,112 @@
+import json
+import time
+import asyncio
+import hashlib
+import numpy as np
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Optional, Sequence, Tuple
+
+
+class IdempotencyConflict(Exception):
+    """같은 Idempotency-Key가 다른 요청 본문에 다시 쓰임"""
+
+
+def request_key(namespace: Dict[str, Any], ids: Sequence[str], ocean: np.ndarray, role_pref: Sequence[str],
+                availability: Sequence[str]) -> str:
+    """매칭 요청의 정규화 해시
+
+    namespace(엔드포인트, team_size, required_roles, strategy, 점수식/모델 버전 등)와 학생 열을 해시한다.
+    학생 순서와 required_roles 순서는 배정 결과에 영향을 주므로 그대로 넣고, 결과에 쓰이지 않는 필드(이름, 전공 등)는 뺀다.
+    """
+    h = hashlib.blake2b(json.dumps(namespace, sort_keys=True, ensure_ascii=False).encode("utf-8"), digest_size=16)
+    for column in (ids, role_pref, availability):
+        h.update(b"\x1e")
+        h.update("\x1f".join(v or "" for v in column).encode("utf-8"))
+    h.update(np.ascontiguousarray(ocean, dtype=np.float64).tobytes())
+    return h.hexdigest()
+
+
+class ResultCache:
+    """완료된 매칭 응답의 TTL/LRU 캐시 + 같은 요청의 동시 실행 합치기(coalescing)
+
+    같은 키의 요청이 실행 중이면 새로 계산하지 않고 그 결과를 함께 기다리며, 끝난 결과는 ttl_s초 동안 최대 max_entries개 보관한다.
+    Idempotency-Key는 처음 쓰인 요청 키에 묶이고, 같은 키로 다른 요청이 오면 IdempotencyConflict.
+    이벤트 루프에서만 사용한다 (잠금 없음).
+    """
+
+    def __init__(self, max_entries: int = 64, ttl_s: float = 300.0):
+        self.max_entries = max_entries
+        self.ttl_s = ttl_s
+        self._entries: "OrderedDict[str, Tuple[float, Any]]" = OrderedDict()
+        self._idempotency: "OrderedDict[str, Tuple[float, str]]" = OrderedDict()
+        self._inflight: Dict[str, asyncio.Task] = {}
+        self._stats = {"hits": 0, "misses": 0, "coalesced": 0, "evictions": 0, "expired": 0, "conflicts": 0}
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_entries > 0 and self.ttl_s > 0
+
+    async def get_or_compute(self, key: str, compute: Callable[[], Awaitable[Any]],
+                             idempotency_key: Optional[str] = None, refresh: bool = False) -> Tuple[Any, str]:
+        """캐시된 결과, 실행 중인 같은 요청의 결과, 또는 compute()의 결과 → (결과, "hit" | "coalesced" | "miss")
+
+        refresh=True이면 캐시된 결과를 쓰지 않고 다시 계산한다 (실행 중인 같은 요청에는 합류).
+        compute가 실패하면 기다리던 요청 모두 같은 예외를 받고, 결과는 캐시하지 않는다.
+        """
+        now = time.monotonic()
+        if idempotency_key:
+            self._bind(idempotency_key, key, now)
+        if not refresh:
+            entry = self._get(key, now)
+            if entry is not None:
+                self._stats["hits"] += 1
+                return entry, "hit"
+        task = self._inflight.get(key)
+        if task is not None:
+            self._stats["coalesced"] += 1
+            # 기다리던 요청의 연결이 끊겨도 공유 계산은 취소하지 않는다
+            return await asyncio.shield(task), "coalesced"
+        self._stats["misses"] += 1
+        task = asyncio.ensure_future(compute())
+        self._inflight[key] = task
+        task.add_done_callback(lambda t: self._finish(key, t))
+        return await asyncio.shield(task), "miss"
+
+    def _bind(self, idempotency_key: str, key: str, now: float):
+        bound = self._idempotency.get(idempotency_key)
+        if bound is not None and now - bound[0] <= self.ttl_s and bound[1] != key:
+            self._stats["conflicts"] += 1
+            raise IdempotencyConflict(idempotency_key)
+        self._idempotency[idempotency_key] = (now, key)
+        self._idempotency.move_to_end(idempotency_key)
+        while len(self._idempotency) > max(self.max_entries, 1) * 4:
+            self._idempotency.popitem(last=False)
+
+    def _get(self, key: str, now: float) -> Optional[Any]:
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        if now - entry[0] > self.ttl_s:
+            del self._entries[key]
+            self._stats["expired"] += 1
+            return None
+        self._entries.move_to_end(key)
+        return entry[1]
+
+    def _finish(self, key: str, task: asyncio.Task):
+        self._inflight.pop(key, None)
+        if not self.enabled or task.cancelled() or task.exception() is not None:
+            return
+        self._entries[key] = (time.monotonic(), task.result())
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self._stats["evictions"] += 1
+
+    def stats(self) -> Dict[str, int]:
+        return dict(self._stats, entries=len(self._entries), inflight=len(self._inflight),
+                    max_entries=self.max_entries, ttl_s=self.ttl_s)
+
+    def clear(self):
+        self._entries.clear()
+        self._idempotency.clear()
@@ -0,0 +1,106 @@
+import numpy as np
+from typing import Dict, List, Optional, Sequence, Union
+from app.models import Student
+from app.compat_cache import row_key
+from app.data_processor import encode_columns
+from app.availability import AvailabilityIndex
+
+OCEAN_KEYS = ("O", "C", "E", "A", "N")
+
+
+class StudentTable:
+    """요청 학생 목록의 열 단위 표현
+
+    요청마다 한 번 만들어 매칭 핫 패스(그리디, 균형화, 딥러닝 그리디, reasons 계산)가 Student 객체 대신
+    행 인덱스로 이 배열들을 읽는다. 응답(MemberOut)이나 이력 기록처럼 Student가 필요한 곳에서만 students를 쓴다.
+    """
+
+    def __init__(self, students: Sequence[Student]):
+        self._students: Optional[List[Student]] = list(students)
+        self._init_columns([s.student_id for s in self._students],
+                           np.array([(s.O, s.C, s.E, s.A, s.N) for s in self._students], dtype=np.float64),
+                           [s.role_pref for s in self._students], [s.availability for s in self._students])
+
+    @classmethod
+    def from_columns(cls, ids: Sequence[str], ocean: np.ndarray, role_pref: Sequence[str],
+                     availability: Sequence[str]) -> "StudentTable":
+        """열 배열에서 바로 만든다 (열 단위 요청용, Student 객체는 필요할 때만 만든다)"""
+        table = cls.__new__(cls)
+        table._students = None
+        table._init_columns(list(ids), np.asarray(ocean, dtype=np.float64), list(role_pref), list(availability))
+        return table
+
+    def _init_columns(self, ids: List[str], ocean: np.ndarray, role_pref: List[str], availability: List[str]):
+        self.ids = ids
+        # 같은 ID가 여러 번 들어오면 첫 번째 행
+        self.id_index: Dict[str, int] = {}
+        for i, sid in enumerate(self.ids):
+            self.id_index.setdefault(sid, i)
+        self.ocean = ocean.reshape(-1, 5)
+        # reasons의 평균 C는 기존과 같은 Python 합산 순서로 계산
+        self.C: List[float] = self.ocean[:, 1].tolist()
+        # 원래 역할 문자열 (응답의 role_assigned, 교환 키, 딥러닝 정렬에 사용)
+        self.role_pref = role_pref
+        # 역할 커버리지 계산용 역할 (공백 제거, 비어 있으면 "Any")과 정수 코드
+        self.roles: List[str] = [(r or "Any").strip() for r in self.role_pref]
+        self.role_ids: Dict[str, int] = {}
+        codes = [self.role_ids.setdefault(r, len(self.role_ids)) for r in self.roles]
+        self.role_code = np.array(codes, dtype=np.int8 if len(self.role_ids) <= 127 else np.int32)
+        self.is_pm: List[bool] = [r == "PM" for r in self.role_pref]
+        self.availability = availability
+        # 가용시간은 학생마다 한 번만 해석 (쌍 점수 Jaccard, 딥러닝 특성, 팀 공통 가용시간이 같이 사용)
+        self.avail_index = AvailabilityIndex(self.availability)
+        self._row_keys: Optional[List[str]] = None
+        self._features: Optional[np.ndarray] = None
+
+    @property
+    def students(self) -> List[Student]:
+        """Student 목록 (from_columns로 만든 경우 처음 접근할 때 열에서 만든다)"""
+        if self._students is None:
+            self._students = [
+                Student.model_construct(student_id=sid, role_pref=r, availability=a, O=o[0], C=o[1], E=o[2], A=o[3], N=o[4])
+                for sid, r, a, o in zip(self.ids, self.role_pref, self.availability, self.ocean.tolist())]
+        return self._students
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    def row_keys(self) -> List[str]:
+        """캐시용 학생 행 해시 (student_row_key와 동일)"""
+        if self._row_keys is None:
+            self._row_keys = [row_key(o, a, r) for o, a, r in zip(self.ocean.tolist(), self.availability, self.role_pref)]
+        return self._row_keys
+
+    def features(self) -> np.ndarray:
+        """딥러닝 모델 입력용 (N, 24) float32 학생 특성 (extract_feature_matrix를 float32로 바꾼 값과 동일)"""
+        if self._features is None:
+            self._features = encode_columns(self.ocean, self.role_pref, self.availability, np.float32,
+                                            index=self.avail_index)
+        return self._features
+
+    def greedy_order(self) -> List[int]:
+        """(PM 여부, C) 내림차순 정렬 순서 (동점은 입력 순서 유지, sorted(..., reverse=True)와 동일)"""
+        return np.lexsort((-self.ocean[:, 1], -np.asarray(self.is_pm, dtype=np.int8))).tolist()
+
+    def role_bonus(self, idx: Sequence[int], req: Dict[str, int]) -> float:
+        """role_coverage_bonus와 같은 식의 역할 커버리지 보너스"""
+        counts: Dict[str, int] = {}
+        for i in idx:
+            r = self.roles[i]
+            counts[r] = counts.get(r, 0) + 1
+        ok = 0; need = 0
+        for r, rc in req.items():
+            need += rc
+            ok += min(counts.get(r, 0), rc)
+        return 0.1 * (ok / max(1, need))
+
+    def mean_c(self, idx: Sequence[int]) -> float:
+        return sum(self.C[i] for i in idx) / max(1, len(idx))
+
+    def take(self, idx: Sequence[int]) -> List[Student]:
+        return [self.students[i] for i in idx]
+
+
+def as_table(students: Union[StudentTable, Sequence[Student]]) -> StudentTable:
+    """이미 만든 StudentTable은 그대로, Student 목록이면 새로 만든다"""
+    return students if isinstance(students, StudentTable) else StudentTable(students)
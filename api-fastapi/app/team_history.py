@@ -0,0 +1,248 @@
+import os
+import time
+import uuid
+import threading
+import numpy as np
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.dataset as ds
+import pyarrow.parquet as pq
+from urllib.parse import quote
+from typing import Dict, List, Optional, Sequence, Tuple
+from app.models import Student, TeamData
+from app.data_processor import encode_columns, team_pair_indices
+
+# 팀 멤버 행 (학생 속성 + 팀 배정 + 배정 시점의 성과 레이블)
+MEMBER_SCHEMA = pa.schema([
+    ("run_id", pa.string()),
+    ("position", pa.int32()),       # run 안에서의 행 순서 (같은 팀 멤버가 연속)
+    ("team_id", pa.string()),
+    ("student_id", pa.string()),
+    ("name", pa.string()),
+    ("major", pa.string()),
+    ("role_pref", pa.string()),
+    ("availability", pa.string()),
+    ("O", pa.float64()),
+    ("C", pa.float64()),
+    ("E", pa.float64()),
+    ("A", pa.float64()),
+    ("N", pa.float64()),
+    ("performance_score", pa.float64()),
+    ("success_rate", pa.float64()),
+    ("source", pa.string()),
+    ("created_at", pa.float64()),
+])
+
+# 나중에 들어오는 팀 성과 레이블 (같은 팀은 가장 최근 기록이 우선)
+LABEL_SCHEMA = pa.schema([
+    ("run_id", pa.string()),
+    ("team_id", pa.string()),
+    ("performance_score", pa.float64()),
+    ("success_rate", pa.float64()),
+    ("recorded_at", pa.float64()),
+])
+
+# 디렉토리 이름(cohort=.../term=...)으로만 존재하는 파티션 열 (숫자처럼 보여도 문자열로 읽는다)
+PARTITIONING = ds.partitioning(pa.schema([("cohort", pa.string()), ("term", pa.string())]), flavor="hive")
+
+DEFAULT_COHORT = "default"
+DEFAULT_TERM = "default"
+
+
+class TeamHistoryStore:
+    """코호트/학기별로 파티션된 팀 이력 저장소 (Parquet, 추가 전용)
+
+    <root>/members/cohort=<c>/term=<t>/part-*.parquet 에 팀 멤버 행을,
+    <root>/labels/cohort=<c>/term=<t>/part-*.parquet 에 이후 수집한 팀 성과 레이블을 쓴다.
+    기존 파일은 고치지 않고 매 기록마다 새 파일을 추가하며, 읽을 때 cohort/term 조건으로 파티션을 걸러낸다.
+    """
+
+    def __init__(self, root: str):
+        self.root = root
+        self._lock = threading.Lock()
+
+    def _partition_dir(self, table: str, cohort: str, term: str) -> str:
+        return os.path.join(self.root, table, f"cohort={quote(cohort, safe='')}", f"term={quote(term, safe='')}")
+
+    def _write(self, table: str, data: pa.Table, cohort: str, term: str) -> str:
+        """파티션 디렉토리에 새 Parquet 파일 추가 (임시 이름으로 쓴 뒤 이름을 바꿔 반쯤 쓴 파일이 읽히지 않게 함)"""
+        directory = self._partition_dir(table, cohort, term)
+        os.makedirs(directory, exist_ok=True)
+        name = f"part-{time.strftime('%Y%m%d%H%M%S')}-{uuid.uuid4().hex[:8]}.parquet"
+        tmp = os.path.join(directory, f".{name}.tmp")
+        pq.write_table(data, tmp)
+        path = os.path.join(directory, name)
+        os.replace(tmp, path)
+        return path
+
+    def append_teams(self, teams: Sequence[TeamData], cohort: str = DEFAULT_COHORT, term: str = DEFAULT_TERM,
+                     run_id: Optional[str] = None, source: str = "match") -> str:
+        """팀 배정 한 번(run)을 멤버 행으로 추가하고 run_id 반환"""
+        run_id = run_id or uuid.uuid4().hex[:12]
+        members = [(t, m) for t in teams for m in t.members]
+        now = time.time()
+        data = pa.Table.from_pydict({
+            "run_id": [run_id] * len(members),
+            "position": list(range(len(members))),
+            "team_id": [t.team_id for t, _ in members],
+            "student_id": [m.student_id for _, m in members],
+            "name": [m.name for _, m in members],
+            "major": [m.major for _, m in members],
+            "role_pref": [m.role_pref for _, m in members],
+            "availability": [m.availability for _, m in members],
+            "O": [m.O for _, m in members],
+            "C": [m.C for _, m in members],
+            "E": [m.E for _, m in members],
+            "A": [m.A for _, m in members],
+            "N": [m.N for _, m in members],
+            "performance_score": [t.performance_score for t, _ in members],
+            "success_rate": [t.success_rate for t, _ in members],
+            "source": [source] * len(members),
+            "created_at": [now] * len(members),
+        }, schema=MEMBER_SCHEMA)
+        with self._lock:
+            self._write("members", data, cohort, term)
+        return run_id
+
+    def append_labels(self, run_id: str, labels: Dict[str, Tuple[float, float]],
+                      cohort: str = DEFAULT_COHORT, term: str = DEFAULT_TERM) -> int:
+        """팀별 (performance_score, success_rate) 레이블 추가 (팀 ID → 레이블)"""
+        if not labels:
+            return 0
+        now = time.time()
+        data = pa.Table.from_pydict({
+            "run_id": [run_id] * len(labels),
+            "team_id": list(labels),
+            "performance_score": [float(p) for p, _ in labels.values()],
+            "success_rate": [float(r) for _, r in labels.values()],
+            "recorded_at": [now] * len(labels),
+        }, schema=LABEL_SCHEMA)
+        with self._lock:
+            self._write("labels", data, cohort, term)
+        return len(labels)
+
+    def _dataset(self, table: str, schema: pa.Schema) -> Optional[ds.Dataset]:
+        path = os.path.join(self.root, table)
+        if not os.path.isdir(path):
+            return None
+        # "."으로 시작하는 쓰기 중인 임시 파일은 기본적으로 제외된다
+        return ds.dataset(path, format="parquet", partitioning=PARTITIONING,
+                          schema=schema.append(pa.field("cohort", pa.string())).append(pa.field("term", pa.string())))
+
+    @staticmethod
+    def _filter(cohort: Optional[str], term: Optional[str]):
+        expr = None
+        for field, value in (("cohort", cohort), ("term", term)):
+            if value is None:
+                continue
+            values = [value] if isinstance(value, str) else list(value)
+            cond = ds.field(field).isin(values)
+            expr = cond if expr is None else expr & cond
+        return expr
+
+    def load_table(self, cohort=None, term=None, columns: Optional[List[str]] = None) -> pa.Table:
+        """멤버 행을 Arrow 테이블로 읽기 (cohort/term은 문자열 또는 목록, 조건에 맞는 파티션만 읽음)
+
+        labels에 기록된 최신 성과 레이블이 있으면 performance_score/success_rate를 그것으로 바꾼다.
+        """
+        dataset = self._dataset("members", MEMBER_SCHEMA)
+        if dataset is None:
+            return MEMBER_SCHEMA.empty_table()
+        flt = self._filter(cohort, term)
+        if columns is not None:
+            columns = list(dict.fromkeys(columns + ["run_id", "position", "team_id", "created_at"]))
+        table = dataset.to_table(columns=columns, filter=flt)
+        return self._apply_labels(table, flt)
+
+    def _apply_labels(self, table: pa.Table, flt) -> pa.Table:
+        if "performance_score" not in table.column_names and "success_rate" not in table.column_names:
+            return table
+        dataset = self._dataset("labels", LABEL_SCHEMA)
+        if dataset is None or table.num_rows == 0:
+            return table
+        labels = dataset.to_table(filter=flt).sort_by("recorded_at")
+        if labels.num_rows == 0:
+            return table
+        # 같은 (run_id, team_id)는 나중 기록이 앞 기록을 덮어쓴다
+        latest: Dict[Tuple[str, str], Tuple[float, float]] = {}
+        for r, t, p, s in zip(labels["run_id"].to_pylist(), labels["team_id"].to_pylist(),
+                              labels["performance_score"].to_pylist(), labels["success_rate"].to_pylist()):
+            latest[(r, t)] = (p, s)
+        keys = list(zip(table["run_id"].to_pylist(), table["team_id"].to_pylist()))
+        hit = np.array([k in latest for k in keys], dtype=bool)
+        if not hit.any():
+            return table
+        for col, pos in (("performance_score", 0), ("success_rate", 1)):
+            if col in table.column_names:
+                values = table[col].to_numpy(zero_copy_only=False).astype(np.float64)
+                values[hit] = [latest[k][pos] for k, h in zip(keys, hit) if h]
+                table = table.set_column(table.column_names.index(col), col, pa.array(values))
+        return table
+
+    def load_arrays(self, cohort=None, term=None, columns: Optional[List[str]] = None) -> Dict[str, np.ndarray]:
+        """멤버 행을 열별 NumPy 배열로 읽기 (기록 순서대로, 같은 팀 멤버는 연속)"""
+        table = self.load_table(cohort, term, columns)
+        if table.num_rows:
+            order = pc.sort_indices(table, sort_keys=[("created_at", "ascending"), ("run_id", "ascending"),
+                                                      ("position", "ascending")])
+            table = table.take(order)
+        return {name: table[name].to_numpy(zero_copy_only=False) for name in table.column_names}
+
+    def load_team_data(self, cohort=None, term=None) -> List[TeamData]:
+        """TeamData 목록으로 읽기 (팀 단위로 묶을 때만 Python 객체를 만든다)"""
+        cols = self.load_arrays(cohort, term)
+        starts, _ = _team_bounds(cols)
+        ends = list(starts[1:]) + [len(cols["run_id"])]
+        teams = []
+        student_fields = ("student_id", "name", "major", "role_pref", "availability", "O", "C", "E", "A", "N")
+        rows = {f: cols[f].tolist() for f in student_fields}
+        for a, b in zip(starts, ends):
+            members = [Student(**{f: rows[f][i] for f in student_fields if rows[f][i] is not None})
+                       for i in range(a, b)]
+            teams.append(TeamData(team_id=str(cols["team_id"][a]), members=members,
+                                  performance_score=float(cols["performance_score"][a]),
+                                  success_rate=float(cols["success_rate"][a])))
+        return teams
+
+    def pair_table(self, cohort=None, term=None,
+                   labeled_only: bool = True) -> Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+        """학습용 (멤버 특성 행렬, 쌍 left/right 인덱스, 쌍 레이블)을 Student 객체 없이 바로 생성
+
+        data_processor.team_pair_table과 같은 형식이라 FeatureStore.write_pairs에 그대로 넘길 수 있다.
+        labeled_only면 성과 레이블이 없는(NaN) 팀은 제외한다.
+        """
+        cols = self.load_arrays(cohort, term, columns=["role_pref", "availability", "O", "C", "E", "A", "N",
+                                                       "performance_score"])
+        if labeled_only:
+            keep = ~np.isnan(cols["performance_score"].astype(np.float64))
+            cols = {k: v[keep] for k, v in cols.items()}
+        ocean = np.stack([cols[k].astype(np.float64) for k in ("O", "C", "E", "A", "N")], axis=1)
+        features = encode_columns(ocean, cols["role_pref"].tolist(), cols["availability"].tolist(), dtype=np.float64)
+        starts, sizes = _team_bounds(cols)
+        left, right, team = team_pair_indices(sizes)
+        labels = cols["performance_score"][starts].astype(np.float32)
+        return features, left, right, labels[team]
+
+    def partitions(self) -> List[Dict[str, object]]:
+        """(cohort, term)별 멤버 행/팀/실행 수"""
+        table = self.load_table(columns=["cohort", "term"])
+        if table.num_rows == 0:
+            return []
+        grouped = table.group_by(["cohort", "term"]).aggregate([
+            ([], "count_all"), ("run_id", "count_distinct")])
+        return [{"cohort": c, "term": t, "rows": n, "runs": r} for c, t, n, r in zip(
+            grouped["cohort"].to_pylist(), grouped["term"].to_pylist(),
+            grouped["count_all"].to_pylist(), grouped["run_id_count_distinct"].to_pylist())]
+
+
+def _team_bounds(cols: Dict[str, np.ndarray]) -> Tuple[np.ndarray, np.ndarray]:
+    """기록 순서로 정렬된 열에서 팀별 시작 위치와 크기"""
+    n = len(cols["run_id"])
+    if n == 0:
+        return np.zeros(0, dtype=np.intp), np.zeros(0, dtype=np.intp)
+    run, team = cols["run_id"], cols["team_id"]
+    change = np.ones(n, dtype=bool)
+    change[1:] = (run[1:] != run[:-1]) | (team[1:] != team[:-1])
+    starts = np.flatnonzero(change)
+    sizes = np.diff(np.append(starts, n))
+    return starts, sizes
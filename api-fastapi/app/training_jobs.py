@@ -0,0 +1,228 @@
+import os
+import time
+import uuid
+import queue
+import threading
+import multiprocessing
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Tuple
+import numpy as np
+from app.model_registry import ModelRegistry
+from app.feature_store import FeatureStore
+
+# 작업 상태: queued → running → succeeded | failed | cancelled
+FINISHED_STATES = ("succeeded", "failed", "cancelled")
+
+
+class TrainingJob:
+    """학습 작업 하나의 상태 (진행 중 epoch 지표 포함)"""
+
+    def __init__(self, epochs: int, info: Dict[str, Any]):
+        self.job_id = uuid.uuid4().hex[:12]
+        self.feature_path: Optional[str] = None
+        self.epochs = epochs
+        self.info = info
+        self.status = "queued"
+        self.epoch = 0
+        self.history: List[Dict[str, float]] = []
+        self.version: Optional[str] = None
+        self.error: Optional[str] = None
+        self.created_at = time.time()
+        self.started_at: Optional[float] = None
+        self.finished_at: Optional[float] = None
+        self.cancel_event = None
+        self.process = None
+
+    def to_dict(self) -> Dict[str, Any]:
+        metrics = dict(self.history[-1]) if self.history else {}
+        metrics.update(self.info)
+        return {
+            "job_id": self.job_id,
+            "status": self.status,
+            "epoch": self.epoch,
+            "epochs": self.epochs,
+            "metrics": metrics,
+            "history": self.history,
+            "version": self.version,
+            "error": self.error,
+            "created_at": self.created_at,
+            "started_at": self.started_at,
+            "finished_at": self.finished_at,
+        }
+
+
+def _train_process(feature_path: str, epochs: int, base_path: Optional[str], save_path: str,
+                   progress, cancel_event):
+    """학습 워커 프로세스 (spawn으로 실행되므로 TensorFlow는 여기서 따로 임포트된다)
+
+    학습 데이터는 특성 저장소에서 memmap으로 열어 tf.data로 배치 단위로 읽는다.
+    epoch마다 지표를 progress 큐로 보내고, cancel_event가 설정되면 다음 배치에서 학습을 멈춘다.
+    """
+    try:
+        # 서빙 프로세스보다 CPU 우선순위를 낮춘다
+        os.nice(10)
+    except (AttributeError, OSError):
+        pass
+    try:
+        import tensorflow as tf
+        from app import deep_matching as deep
+        from app.data_processor import PAIR_FEATURE_DIM
+        from app.feature_store import open_features
+
+        class ProgressCallback(tf.keras.callbacks.Callback):
+            def on_train_batch_end(self, batch, logs=None):
+                if cancel_event.is_set():
+                    self.model.stop_training = True
+
+            def on_epoch_end(self, epoch, logs=None):
+                progress.put(("epoch", epoch + 1, {k: float(v) for k, v in (logs or {}).items()}))
+
+        # 서빙 중인 모델이 있으면 이어서 학습, 없으면 새 모델
+        model = deep.load_model(base_path) if base_path else None
+        if model is None:
+            model = deep.create_model(PAIR_FEATURE_DIM)
+        X, y, _ = open_features(feature_path)
+        deep.train_model(model, X, y, epochs=epochs, callbacks=[ProgressCallback()], save_path=None)
+        if cancel_event.is_set():
+            progress.put(("cancelled",))
+            return
+        model.save(save_path)
+        # TensorFlow 없이 서빙할 수 있도록 NumPy 가중치도 함께 저장 (Keras 예측과 비교 후)
+        deep.export_lite_model(model, save_path)
+        progress.put(("done",))
+    except Exception as e:
+        progress.put(("error", f"{type(e).__name__}: {e}"))
+
+
+class TrainingJobManager:
+    """학습 작업 대기열
+
+    작업은 한 번에 하나씩 별도 프로세스에서 실행되므로 학습이 서빙 프로세스의 스레드/GIL을 점유하지 않는다.
+    학습 데이터는 제출 시 특성 저장소에 써 두고 워커는 경로만 받는다.
+    학습이 끝난 모델은 새 버전 디렉토리에 저장한 뒤, 이 프로세스에서 로드/워밍업을 마치고 ModelRegistry.swap으로 교체한다.
+    """
+
+    def __init__(self, registry: ModelRegistry, feature_store: FeatureStore, max_jobs: int = 50,
+                 keep_datasets: int = 3):
+        self.registry = registry
+        self.feature_store = feature_store
+        self.keep_datasets = keep_datasets
+        self.max_jobs = max_jobs
+        self._jobs: "OrderedDict[str, TrainingJob]" = OrderedDict()
+        self._queue: "queue.Queue[TrainingJob]" = queue.Queue()
+        self._lock = threading.Lock()
+        self._ctx = multiprocessing.get_context("spawn")
+        self._thread: Optional[threading.Thread] = None
+
+    def submit(self, pairs: Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray], epochs: int,
+               info: Optional[Dict[str, Any]] = None) -> TrainingJob:
+        """학습 작업 등록
+
+        Args:
+            pairs: (멤버 특성 행렬, 쌍 left/right 인덱스, 쌍 레이블) - team_pair_table 또는 TeamHistoryStore.pair_table
+        """
+        job = TrainingJob(epochs, dict(info or {}))
+        job.feature_path = self.feature_store.write_pairs(job.job_id, *pairs, meta={"job_id": job.job_id})
+        job.info["pairs_count"] = len(pairs[1])
+        with self._lock:
+            self._jobs[job.job_id] = job
+            # 끝난 작업 기록은 최근 max_jobs개만 유지
+            finished = [k for k, j in self._jobs.items() if j.status in FINISHED_STATES]
+            for k in finished[:max(0, len(self._jobs) - self.max_jobs)]:
+                del self._jobs[k]
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="training-jobs", daemon=True)
+                self._thread.start()
+        self._queue.put(job)
+        return job
+
+    def get(self, job_id: str) -> Optional[TrainingJob]:
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def list(self) -> List[TrainingJob]:
+        with self._lock:
+            return list(self._jobs.values())
+
+    def cancel(self, job_id: str) -> Optional[TrainingJob]:
+        """대기 중이면 바로 취소, 실행 중이면 워커에 중단 신호"""
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is None or job.status in FINISHED_STATES:
+                return job
+            if job.status == "queued":
+                job.status = "cancelled"
+                job.finished_at = time.time()
+            elif job.cancel_event is not None:
+                job.cancel_event.set()
+            return job
+
+    def shutdown(self):
+        """서버 종료 시 실행 중인 학습 프로세스 정리"""
+        for job in self.list():
+            if job.process is not None and job.process.is_alive():
+                job.process.terminate()
+
+    def _run(self):
+        while True:
+            job = self._queue.get()
+            with self._lock:
+                if job.status != "queued":
+                    continue
+                job.status = "running"
+                job.started_at = time.time()
+                job.cancel_event = self._ctx.Event()
+            try:
+                self._execute(job)
+            except Exception as e:
+                job.status, job.error = "failed", str(e)
+            job.finished_at = time.time()
+            # 최근 데이터셋 몇 개만 남겨 재학습/평가에 쓴다 (대기 중인 작업의 데이터셋은 유지)
+            self.feature_store.prune(self.keep_datasets, protect=[
+                j.job_id for j in self.list() if j.status not in FINISHED_STATES])
+            print(f"학습 작업 {job.job_id}: {job.status}")
+
+    def _execute(self, job: TrainingJob):
+        version = time.strftime("%Y%m%d-%H%M%S") + "-" + job.job_id
+        save_path = self.registry.version_path(version)
+        # 서빙 중인(또는 재시작 시 로드될) 버전에서 이어서 학습
+        current = self.registry.current_version()
+        base_path = self.registry.version_path(current) if current else self.registry.legacy_path
+        if not os.path.exists(base_path):
+            base_path = None
+        progress = self._ctx.Queue()
+        job.process = self._ctx.Process(
+            target=_train_process, name=f"train-{job.job_id}",
+            args=(job.feature_path, job.epochs, base_path, save_path, progress, job.cancel_event))
+        job.process.start()
+
+        result = None
+        while result is None:
+            try:
+                msg = progress.get(timeout=0.5)
+            except queue.Empty:
+                if job.process.is_alive():
+                    continue
+                # 타임아웃 직후 결과를 보내고 종료했을 수 있으므로 실패로 보기 전에 큐를 한 번 더 비운다
+                try:
+                    msg = progress.get(timeout=0.5)
+                except queue.Empty:
+                    result = ("error", f"학습 프로세스 비정상 종료 (exit code {job.process.exitcode})")
+                    continue
+            if msg[0] == "epoch":
+                job.epoch = msg[1]
+                job.history.append(msg[2])
+            else:
+                result = msg
+        job.process.join()
+
+        if result[0] == "cancelled":
+            job.status = "cancelled"
+        elif result[0] == "error":
+            job.status, job.error = "failed", result[1]
+        else:
+            # 새 버전을 완전히 로드/워밍업한 뒤에만 교체 (진행 중인 추론은 이전 모델을 계속 사용)
+            model = self.registry.load_version(save_path)
+            self.registry.swap(model, version)
+            job.version = version
+            job.status = "succeeded"
@@ -0,0 +1,4 @@
+"""매칭 서비스 성능 벤치마크
+
+    python -m benchmarks --sizes 10,100,1000 --out benchmarks/results.json
+"""
@@ -0,0 +1,73 @@
+import numpy as np
+from typing import Dict, List, Optional, Sequence
+from app.models import Student, TeamData
+from app.data_processor import TIME_SLOT_INDEX
+
+# 기본 역할 분포 (role_pref 값 → 비율)
+DEFAULT_ROLE_MIX = {"PM": 0.15, "FE": 0.25, "BE": 0.25, "Design": 0.15, "Any": 0.20}
+# 가용시간 슬롯 ("MonMorn" ... "SunEve")
+SLOTS = tuple(TIME_SLOT_INDEX)
+
+
+def synthetic_cohort(n: int, seed: int = 0, role_mix: Optional[Dict[str, float]] = None,
+                     slots_per_student: Sequence[int] = (1, 4), slot_weights: Optional[Sequence[float]] = None,
+                     ocean: str = "normal", ocean_mean: float = 0.5, ocean_std: float = 0.15) -> List[Student]:
+    """합성 코호트 생성
+
+    Args:
+        role_mix: 역할 → 비율 (합이 1이 아니어도 정규화)
+        slots_per_student: 학생당 가용 슬롯 수 범위 (최소, 최대)
+        slot_weights: 슬롯별 선택 가중치 (없으면 평일 저녁에 몰리는 분포)
+        ocean: "normal" (평균/표준편차, 0~1로 자름) 또는 "uniform"
+    """
+    rng = np.random.default_rng(seed)
+    role_mix = role_mix or DEFAULT_ROLE_MIX
+    roles = list(role_mix)
+    p = np.array([role_mix[r] for r in roles], dtype=np.float64)
+    role_pref = rng.choice(len(roles), size=n, p=p / p.sum())
+
+    if slot_weights is None:
+        slot_weights = [3.0 if s.endswith("Eve") and not s.startswith(("Sat", "Sun")) else 1.0 for s in SLOTS]
+    w = np.asarray(slot_weights, dtype=np.float64)
+    w = w / w.sum()
+    lo, hi = slots_per_student
+    counts = rng.integers(lo, hi + 1, size=n)
+
+    if ocean == "uniform":
+        traits = rng.random((n, 5))
+    else:
+        traits = np.clip(rng.normal(ocean_mean, ocean_std, size=(n, 5)), 0.0, 1.0)
+    traits = np.round(traits, 3)
+
+    students = []
+    for i in range(n):
+        slots = rng.choice(len(SLOTS), size=min(int(counts[i]), len(SLOTS)), replace=False, p=w)
+        students.append(Student(
+            student_id=f"S{i:06d}",
+            name=f"student{i}",
+            role_pref=roles[role_pref[i]],
+            availability=";".join(SLOTS[k] for k in sorted(slots)),
+            O=traits[i, 0], C=traits[i, 1], E=traits[i, 2], A=traits[i, 3], N=traits[i, 4],
+        ))
+    return students
+
+
+def synthetic_answers(n: int, seed: int = 0, scale: int = 5) -> List[Dict[str, int]]:
+    """Big Five 설문 응답 (Q1..Q30 → 1..scale) n건"""
+    rng = np.random.default_rng(seed)
+    answers = rng.integers(1, scale + 1, size=(n, 30))
+    return [{f"Q{k + 1}": int(a) for k, a in enumerate(row)} for row in answers]
+
+
+def synthetic_teams(n_students: int, team_size: int = 4, seed: int = 0, **cohort_args) -> List[TeamData]:
+    """학습 데이터용 과거 팀 (성과 점수는 멤버 성실성/친화성 평균 + 잡음)"""
+    students = synthetic_cohort(n_students, seed, **cohort_args)
+    rng = np.random.default_rng(seed + 1)
+    teams = []
+    for t, start in enumerate(range(0, len(students) - team_size + 1, team_size)):
+        members = students[start:start + team_size]
+        base = float(np.mean([(m.C + m.A) / 2 for m in members]))
+        perf = float(np.clip(base + rng.normal(0, 0.1), 0.0, 1.0))
+        teams.append(TeamData(team_id=f"team_{t}", members=members, performance_score=perf,
+                              success_rate=float(np.clip(perf + rng.normal(0, 0.05), 0.0, 1.0))))
+    return teams
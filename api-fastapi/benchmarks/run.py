@@ -0,0 +1,356 @@
+import os
+import sys
+import json
+import time
+import queue
+import argparse
+import platform
+import subprocess
+import multiprocessing
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+try:
+    import resource
+except ImportError:  # Windows: peak RSS 측정 생략
+    resource = None
+
+DEFAULT_SIZES = (10, 100, 1000, 10000)
+DEFAULT_TARGETS = ("score_bigfive", "greedy_match", "balance_team_scores", "predict_compatibility",
+                   "greedy_match_with_model", "prepare_training_data")
+# 딥러닝 대상은 N² 쌍을 추론하므로 기본적으로 이 크기까지만 실행
+DEEP_TARGETS = ("predict_compatibility", "greedy_match_with_model", "predict_pairs_keras", "predict_pairs_numpy",
+                "predict_pairs_float16", "predict_pairs_int8")
+REQUIRED_ROLES = {"PM": 1, "FE": 1, "BE": 1, "Design": 1}
+
+
+def _peak_rss_mb() -> Optional[float]:
+    if resource is None:
+        return None
+    # Linux는 KB, macOS는 바이트 단위
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return round(peak / (1024 * 1024 if sys.platform == "darwin" else 1024), 1)
+
+
+def _team_quality(teams, matrix) -> Dict[str, Any]:
+    """팀 목록의 team_score 평균/최솟값 (기존 점수식)"""
+    from app.main import team_score
+    scores = [team_score(t, REQUIRED_ROLES, matrix) for t in teams]
+    return {
+        "teams": len(teams),
+        "mean_team_score": round(sum(scores) / len(scores), 4) if scores else None,
+        "min_team_score": min(scores) if scores else None,
+        "min_team_size": min(len(t) for t in teams) if teams else None,
+    }
+
+
+def _deep_model(seed: int):
+    import numpy as np
+    import tensorflow as tf
+    from app.model_registry import deep_module
+    from app.data_processor import PAIR_FEATURE_DIM
+    deep = deep_module()
+    tf.random.set_seed(seed)
+    model = deep.create_model(PAIR_FEATURE_DIM)
+    model(np.zeros((1, PAIR_FEATURE_DIM), dtype=np.float32))
+    return deep, model
+
+
+# 대상별 준비 함수: (크기, 옵션) → (측정할 함수, 결과 → 품질 지표 함수 또는 None)
+# 준비(데이터 생성, 모델 생성) 시간은 측정에서 제외한다
+
+def setup_score_bigfive(size: int, opts: Dict[str, Any]):
+    from app.main import ScoreRequest, score_bigfive
+    from benchmarks.cohort import synthetic_answers
+    reqs = [ScoreRequest(answers=a) for a in synthetic_answers(size, opts["seed"])]
+    return (lambda: [score_bigfive(r) for r in reqs]), None
+
+
+def setup_greedy_match(size: int, opts: Dict[str, Any]):
+    from app.main import W, greedy_match
+    from app.compatibility import CompatibilityMatrix
+    from benchmarks.cohort import synthetic_cohort
+    students = synthetic_cohort(size, opts["seed"])
+    # 행렬 계산까지 포함해 측정 (캐시 없음)
+    run = lambda: greedy_match(students, opts["team_size"], REQUIRED_ROLES)
+    return run, lambda teams: _team_quality(teams, CompatibilityMatrix(students, W))
+
+
+def setup_balance_team_scores(size: int, opts: Dict[str, Any]):
+    from app.main import W, greedy_match, balance_team_scores
+    from app.compatibility import CompatibilityMatrix
+    from benchmarks.cohort import synthetic_cohort
+    students = synthetic_cohort(size, opts["seed"])
+    matrix = CompatibilityMatrix(students, W)
+    teams = greedy_match(students, opts["team_size"], REQUIRED_ROLES, matrix)
+    # balance_team_scores는 팀 리스트를 제자리에서 바꾸므로 매번 복사본으로 시작
+    run = lambda: balance_team_scores([list(t) for t in teams], REQUIRED_ROLES, matrix)
+    return run, lambda result: _team_quality(result, matrix)
+
+
+def setup_predict_compatibility(size: int, opts: Dict[str, Any]):
+    from benchmarks.cohort import synthetic_cohort
+    deep, model = _deep_model(opts["seed"])
+    students = synthetic_cohort(size, opts["seed"])
+    return (lambda: deep.predict_compatibility(model, students)), None
+
+
+def setup_greedy_match_with_model(size: int, opts: Dict[str, Any]):
+    from app.main import W
+    from app.compatibility import CompatibilityMatrix
+    from benchmarks.cohort import synthetic_cohort
+    deep, model = _deep_model(opts["seed"])
+    students = synthetic_cohort(size, opts["seed"])
+    # 호환성 예측까지 포함해 측정
+    run = lambda: deep.greedy_match_with_model(model, students, opts["team_size"], REQUIRED_ROLES)
+    return run, lambda teams: _team_quality(teams, CompatibilityMatrix(students, W))
+
+
+def _setup_predict_pairs(backend: str, quantize: str = "none"):
+    """코호트 모든 쌍의 추론 처리량 (pairs_per_sec)과 Keras 예측 대비 최대 차이 (쌍 특성 생성은 준비 단계)"""
+    def setup(size: int, opts: Dict[str, Any]):
+        import numpy as np
+        from app.deep_inference import LiteMatchingModel, _tile_pairs
+        from app.data_processor import create_pair_features_batch
+        from app.student_table import StudentTable
+        from benchmarks.cohort import synthetic_cohort
+        deep, keras_model = _deep_model(opts["seed"])
+        features = StudentTable(synthetic_cohort(size, opts["seed"])).features()
+        pair_features = create_pair_features_batch(features, *_tile_pairs(size, 0, size))
+        reference = keras_model.predict_pairs(pair_features)
+        model = keras_model if backend == "keras" else LiteMatchingModel(keras_model.get_weights(), quantize)
+
+        def quality(scores) -> Dict[str, Any]:
+            return {"pairs": len(pair_features), "max_abs_diff": float(np.max(np.abs(scores - reference)))}
+        return (lambda: model.predict_pairs(pair_features)), quality
+    return setup
+
+
+def setup_prepare_training_data(size: int, opts: Dict[str, Any]):
+    from app.data_processor import prepare_training_data
+    from benchmarks.cohort import synthetic_teams
+    teams = synthetic_teams(size, opts["team_size"], opts["seed"])
+    return (lambda: prepare_training_data(teams)), None
+
+
+def _setup_strategy(strategy: str):
+    def setup(size: int, opts: Dict[str, Any]):
+        from app.main import W, MatchRequest, assign_teams
+        from app.compatibility import CompatibilityMatrix
+        from app.student_table import StudentTable
+        from benchmarks.cohort import synthetic_cohort
+        students = synthetic_cohort(size, opts["seed"])
+        req = MatchRequest(students=students, team_size=opts["team_size"], required_roles=REQUIRED_ROLES,
+                           strategy=strategy, time_budget_ms=opts["time_budget_ms"])
+        table = StudentTable(students)
+        matrix = CompatibilityMatrix(table, W)
+        run = lambda: assign_teams(req, table, matrix)[0]
+        return run, lambda teams: _team_quality([table.take(t) for t in teams], matrix)
+    return setup
+
+
+def _parse_timing(header: str) -> Dict[str, float]:
+    return {k: float(v) for k, v in (part.split("=") for part in header.split(", "))}
+
+
+def _setup_api(path: str):
+    """엔드포인트 전체(본문 검증 → 매칭 → 응답 직렬화)를 TestClient로 측정 (X-Timing으로 단계별 비중 기록)"""
+    def setup(size: int, opts: Dict[str, Any]):
+        from fastapi.testclient import TestClient
+        from app.main import app, API_KEY
+        from benchmarks.cohort import synthetic_cohort
+        students = [s.model_dump() for s in synthetic_cohort(size, opts["seed"])]
+        body: Dict[str, Any] = {"team_size": opts["team_size"], "required_roles": REQUIRED_ROLES}
+        if path.endswith("/columnar"):
+            keys = ("student_id", "O", "C", "E", "A", "N", "role_pref", "availability")
+            body["columns"] = {k: [s[k] for s in students] for k in keys}
+        else:
+            body["students"] = students
+        content = json.dumps(body).encode()
+        headers = {"X-API-Key": API_KEY, "X-Timing": "1", "Content-Type": "application/json"}
+        client = TestClient(app)
+
+        def run():
+            response = client.post(path, content=content, headers=headers)
+            response.raise_for_status()
+            return response
+
+        def quality(response) -> Dict[str, Any]:
+            timing = _parse_timing(response.headers["x-timing"])
+            total = timing.pop("total")
+            out = {"request_bytes": len(content), "response_bytes": len(response.content), "total_ms": total}
+            out.update({f"{k}_ms": v for k, v in timing.items()})
+            # /match/run/columnar는 본문 파싱/검증을 핸들러 안(parse 단계)에서 한다
+            out["validate_share"] = round((timing.get("validate", 0.0) + timing.get("parse", 0.0)) / total, 3)
+            out["serialization_share"] = round(timing.get("serialization", 0.0) / total, 3)
+            return out
+        return run, quality
+    return setup
+
+
+TARGETS: Dict[str, Callable[[int, Dict[str, Any]], Tuple[Callable[[], Any], Optional[Callable[[Any], Dict]]]]] = {
+    "score_bigfive": setup_score_bigfive,
+    "greedy_match": setup_greedy_match,
+    "balance_team_scores": setup_balance_team_scores,
+    "predict_compatibility": setup_predict_compatibility,
+    "greedy_match_with_model": setup_greedy_match_with_model,
+    "prepare_training_data": setup_prepare_training_data,
+    # 쌍 추론 백엔드 비교 (Keras infer 그래프 vs NumPy 순전파, 가중치 양자화)
+    "predict_pairs_keras": _setup_predict_pairs("keras"),
+    "predict_pairs_numpy": _setup_predict_pairs("numpy"),
+    "predict_pairs_float16": _setup_predict_pairs("numpy", "float16"),
+    "predict_pairs_int8": _setup_predict_pairs("numpy", "int8"),
+    # /match/run strategy 비교용 (행렬은 준비 단계에서 계산)
+    "strategy_greedy": _setup_strategy("greedy"),
+    "strategy_multistart": _setup_strategy("multistart"),
+    "strategy_optimal": _setup_strategy("optimal"),
+    # HTTP 경로 비교 (객체 목록 + pydantic 응답 vs 열 단위 요청 + orjson 응답)
+    "api_match_run": _setup_api("/match/run"),
+    "api_match_run_columnar": _setup_api("/match/run/columnar"),
+}
+
+
+def run_case(target: str, size: int, opts: Dict[str, Any]) -> Dict[str, Any]:
+    """대상 하나를 한 크기로 repeats번 실행 (가장 빠른 시간과 중앙값 기록)"""
+    os.environ.setdefault("TF_CPP_MIN_LOG_LEVEL", "3")
+    os.environ.setdefault("DEEP_MODEL_WARMUP", "0")
+    os.environ.setdefault("RECORD_MATCH_HISTORY", "0")
+    fn, quality = TARGETS[target](size, opts)
+    setup_rss = _peak_rss_mb()
+    times, result = [], None
+    for _ in range(max(1, opts["repeats"])):
+        started = time.perf_counter()
+        result = fn()
+        times.append((time.perf_counter() - started) * 1000)
+    times.sort()
+    q = quality(result) if quality else None
+    if q and "pairs" in q:
+        q["pairs_per_sec"] = round(q["pairs"] / max(times[0] / 1000, 1e-9))
+    return {
+        "target": target,
+        "size": size,
+        "repeats": len(times),
+        "wall_ms": round(times[0], 2),
+        "median_ms": round(times[len(times) // 2], 2),
+        "setup_peak_rss_mb": setup_rss,
+        "peak_rss_mb": _peak_rss_mb(),
+        "quality": q,
+    }
+
+
+def _case_process(target: str, size: int, opts: Dict[str, Any], out):
+    try:
+        out.put(run_case(target, size, opts))
+    except Exception as e:
+        out.put({"target": target, "size": size, "error": f"{type(e).__name__}: {e}"})
+
+
+def run_isolated(target: str, size: int, opts: Dict[str, Any], timeout_s: float) -> Dict[str, Any]:
+    """케이스마다 새 프로세스에서 실행 (peak RSS가 다른 케이스와 섞이지 않도록)"""
+    ctx = multiprocessing.get_context("spawn")
+    out = ctx.Queue()
+    proc = ctx.Process(target=_case_process, args=(target, size, opts, out))
+    proc.start()
+    deadline = time.time() + timeout_s
+    result = None
+    while result is None:
+        try:
+            result = out.get(timeout=1.0)
+        except queue.Empty:
+            # 메모리 부족 등으로 프로세스가 죽으면 결과 없이 끝난다
+            if not proc.is_alive():
+                result = {"target": target, "size": size, "error": f"process exited with code {proc.exitcode}"}
+            elif time.time() >= deadline:
+                proc.terminate()
+                result = {"target": target, "size": size, "error": f"timeout after {timeout_s}s"}
+    proc.join(5)
+    if proc.is_alive():
+        proc.kill()
+    return result
+
+
+def environment() -> Dict[str, Any]:
+    import numpy as np
+    try:
+        commit = subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                                cwd=os.path.dirname(os.path.abspath(__file__)), timeout=5).stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        commit = None
+    return {
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "git_commit": commit,
+        "python": platform.python_version(),
+        "numpy": np.__version__,
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+    }
+
+
+def compare(results: List[Dict[str, Any]], baseline_path: str, max_ratio: Optional[float]) -> bool:
+    """이전 결과 파일과 wall_ms 비교 (max_ratio를 넘는 케이스가 있으면 False)"""
+    with open(baseline_path, encoding="utf-8") as f:
+        baseline = {(r["target"], r["size"]): r for r in json.load(f)["results"] if "wall_ms" in r}
+    ok = True
+    for r in results:
+        base = baseline.get((r["target"], r["size"]))
+        if base is None or "wall_ms" not in r:
+            continue
+        ratio = r["wall_ms"] / max(base["wall_ms"], 1e-6)
+        r["baseline_ms"] = base["wall_ms"]
+        r["ratio"] = round(ratio, 3)
+        flag = ""
+        if max_ratio is not None and ratio > max_ratio:
+            ok, flag = False, "  <-- regression"
+        print(f"{r['target']:>26} {r['size']:>6}: {base['wall_ms']:>10.2f} ms -> {r['wall_ms']:>10.2f} ms (x{ratio:.2f}){flag}")
+    return ok
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(prog="python -m benchmarks", description="매칭 서비스 성능 벤치마크")
+    parser.add_argument("--sizes", default=",".join(map(str, DEFAULT_SIZES)), help="코호트 크기 목록 (쉼표 구분)")
+    parser.add_argument("--targets", default=",".join(DEFAULT_TARGETS),
+                        help=f"측정 대상 (쉼표 구분): {', '.join(TARGETS)}")
+    parser.add_argument("--repeats", type=int, default=3)
+    parser.add_argument("--team-size", type=int, default=4)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--time-budget-ms", type=int, default=2000, help="strategy_multistart/optimal 시간 예산")
+    parser.add_argument("--deep-max-size", type=int, default=2000, help="딥러닝 대상의 최대 코호트 크기")
+    parser.add_argument("--timeout", type=float, default=1800, help="케이스당 제한 시간 (초)")
+    parser.add_argument("--out", default=os.path.join("benchmarks", "results.json"))
+    parser.add_argument("--baseline", help="비교할 이전 결과 JSON")
+    parser.add_argument("--max-ratio", type=float, help="baseline 대비 이 배율보다 느리면 종료 코드 1")
+    args = parser.parse_args(argv)
+
+    sizes = [int(s) for s in args.sizes.split(",") if s.strip()]
+    targets = [t.strip() for t in args.targets.split(",") if t.strip()]
+    unknown = [t for t in targets if t not in TARGETS]
+    if unknown:
+        parser.error(f"unknown targets: {', '.join(unknown)}")
+    opts = {"repeats": args.repeats, "team_size": args.team_size, "seed": args.seed,
+            "time_budget_ms": args.time_budget_ms}
+
+    results = []
+    for target in targets:
+        for size in sizes:
+            if target in DEEP_TARGETS and size > args.deep_max_size:
+                results.append({"target": target, "size": size, "skipped": "size > --deep-max-size"})
+                continue
+            r = run_isolated(target, size, opts, args.timeout)
+            results.append(r)
+            if "error" in r:
+                print(f"{target:>26} {size:>6}: ERROR {r['error']}")
+            else:
+                q = r["quality"] or {}
+                print(f"{target:>26} {size:>6}: {r['wall_ms']:>10.2f} ms  peak {r['peak_rss_mb']} MB"
+                      + (f"  mean {q['mean_team_score']} min {q['min_team_score']}" if "mean_team_score" in q else "")
+                      + (f"  serialization {q['serialization_share']:.0%}" if "serialization_share" in q else "")
+                      + (f"  {q['pairs_per_sec']:,} pairs/s max diff {q['max_abs_diff']:.1e}" if "pairs_per_sec" in q else ""))
+
+    ok = True
+    if args.baseline:
+        ok = compare(results, args.baseline, args.max_ratio)
+    os.makedirs(os.path.dirname(os.path.abspath(args.out)), exist_ok=True)
+    with open(args.out, "w", encoding="utf-8") as f:
+        json.dump({"environment": environment(), "options": dict(opts, sizes=sizes, targets=targets),
+                   "results": results}, f, ensure_ascii=False, indent=2)
+    print(f"결과 저장: {args.out}")
+    return 0 if ok else 1
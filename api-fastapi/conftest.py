@@ -0,0 +1,29 @@
+import os
+import tempfile
+import pytest
+
+# 실행 중인 서버와 Postgres가 필요한 수동 점검 스크립트는 수집하지 않는다
+collect_ignore = ["test_team_score.py"]
+
+# app.main 임포트 전에 테스트 설정: 이력/프로파일은 임시 디렉토리, 매칭 레인은 스레드, 모델 미리 로드 안 함
+_TMP = tempfile.mkdtemp(prefix="nexeed-test-")
+os.environ.setdefault("TEAM_HISTORY_DIR", os.path.join(_TMP, "history"))
+os.environ.setdefault("PROFILE_DIR", os.path.join(_TMP, "profiles"))
+os.environ.setdefault("MATCH_WORKERS", "0")
+os.environ.setdefault("DEEP_MODEL_WARMUP", "0")
+os.environ.setdefault("TF_CPP_MIN_LOG_LEVEL", "3")
+
+
+@pytest.fixture(scope="session")
+def client():
+    from fastapi.testclient import TestClient
+    from app.main import API_KEY, app
+    with TestClient(app, headers={"X-API-Key": API_KEY}) as c:
+        yield c
+
+
+@pytest.fixture
+def cohort():
+    """합성 코호트 (Student 목록) 생성 함수"""
+    from benchmarks.cohort import synthetic_cohort
+    return synthetic_cohort
@@ -0,0 +1,46 @@
+import numpy as np
+import pytest
+
+from app.availability import AvailabilityIndex, availability_overlap, parse_availability
+
+SAMPLES = ["MonEve;WedEve", "MonEve", "", "weekdays 9-18", "Mon 9-12;Lab", "TueMorn;Lab", "SunEve", "Mon9-12"]
+
+
+def test_overlap_basics():
+    assert availability_overlap("MonEve", "MonEve") == 1.0
+    assert availability_overlap("MonEve", "TueEve") == 0.0
+    assert availability_overlap("", "") == 0.0
+    assert availability_overlap("MonEve;WedEve", "MonEve") == 0.5
+
+
+def test_formats_share_hours():
+    # "Mon 9-12"와 "Mon9-12"는 같은 시간, 월요일 오전 슬롯(9-13시)에 속한다
+    assert parse_availability("Mon 9-12") == parse_availability("Mon9-12")
+    assert availability_overlap("Mon 9-12", "MonMorn", "slot") == 1.0
+    assert 0 < availability_overlap("Mon 9-12", "MonMorn", "hour") < 1
+    # 해석하지 못한 토큰은 같은 토큰끼리 겹침으로 센다
+    assert parse_availability("Lab")[1] == frozenset({"Lab"})
+    assert availability_overlap("Lab", "Lab") == 1.0
+
+
+@pytest.mark.parametrize("granularity", ["slot", "hour"])
+def test_index_jaccard_matches_pairwise_overlap(granularity):
+    index = AvailabilityIndex(SAMPLES, granularity)
+    expected = np.array([[availability_overlap(a, b, granularity) for b in SAMPLES] for a in SAMPLES])
+    np.testing.assert_array_equal(index.jaccard(), expected)
+    rows = np.array([4, 0])
+    np.testing.assert_array_equal(index.jaccard(rows), expected[rows])
+
+
+def test_common_slots_and_hours():
+    index = AvailabilityIndex(["MonEve;WedEve", "MonEve", "weekdays 13-15"])
+    assert index.common_slots([0, 1]) == 1
+    assert index.common_slots([0, 1, 2]) == 1
+    assert index.common_hours([0, 1]) == 8
+    assert index.common_hours([1, 2]) == 2
+    assert index.common_hours([]) == 0
+
+
+def test_invalid_granularity():
+    with pytest.raises(ValueError):
+        AvailabilityIndex(SAMPLES, "minute")
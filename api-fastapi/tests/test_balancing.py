@@ -0,0 +1,100 @@
+import numpy as np
+import pytest
+from app.balancing import TeamState, balance_teams
+from app.compatibility import CompatibilityMatrix
+from app.main import W, greedy_match_idx, team_score_idx
+
+REQ = {"PM": 1, "FE": 1, "BE": 1, "Design": 1}
+
+
+def baseline_balance(matrix, teams, req):
+    """변경 전 balance_team_scores: 최고/최저 팀 사이에서 두 팀 점수 차이를 0.01보다 크게 줄이는 교환"""
+    keys = matrix.table.role_pref
+    for _ in range(50):
+        scores = [team_score_idx(matrix, t, req) for t in teams]
+        if max(scores) - min(scores) < 0.05:
+            break
+        hi, lo = scores.index(max(scores)), scores.index(min(scores))
+        best, best_improvement = None, 0
+        for i, a in enumerate(teams[hi]):
+            for j, b in enumerate(teams[lo]):
+                if keys[a] != keys[b]:
+                    continue
+                th, tl = teams[hi][:], teams[lo][:]
+                th[i], tl[j] = b, a
+                improvement = abs(scores[hi] - scores[lo]) - abs(team_score_idx(matrix, th, req)
+                                                                 - team_score_idx(matrix, tl, req))
+                if improvement > best_improvement:
+                    best_improvement, best = improvement, (i, j)
+        if best is None or best_improvement <= 0.01:
+            break
+        i, j = best
+        teams[hi][i], teams[lo][j] = teams[lo][j], teams[hi][i]
+    return teams
+
+
+def spread_total(matrix, teams):
+    scores = [team_score_idx(matrix, t, REQ) for t in teams]
+    return max(scores) - min(scores), sum(scores)
+
+
+def greedy_teams(cohort, n, team_size, seed):
+    matrix = CompatibilityMatrix(cohort(n, seed=seed), W)
+    return matrix, greedy_match_idx(matrix, team_size, REQ)
+
+
+def balance(matrix, teams, **kwargs):
+    return balance_teams(matrix, [list(t) for t in teams], REQ, swap_keys=matrix.table.role_pref,
+                         roles=matrix.table.roles, **kwargs)
+
+
+@pytest.mark.parametrize("n, team_size", [(15, 4), (43, 2), (30, 3), (60, 4)])
+def test_spread_not_worse_than_baseline(cohort, n, team_size):
+    for seed in range(20):
+        matrix, teams = greedy_teams(cohort, n, team_size, seed)
+        base_spread, _ = spread_total(matrix, baseline_balance(matrix, [list(t) for t in teams], REQ))
+        new_spread, _ = spread_total(matrix, balance(matrix, teams))
+        # 둘 다 spread_tol(0.05) 아래면 같은 결과로 본다
+        assert new_spread <= max(base_spread, 0.05) + 1e-9, (seed, new_spread, base_spread)
+
+
+@pytest.mark.parametrize("n, team_size", [(15, 4), (43, 2), (101, 5)])
+def test_every_swap_improves_objective(cohort, n, team_size):
+    for seed in range(5):
+        matrix, teams = greedy_teams(cohort, n, team_size, seed)
+        prev = spread_total(matrix, teams)
+        for iterations in range(1, 15):
+            curr = spread_total(matrix, balance(matrix, teams, max_iterations=iterations))
+            # 편차가 줄거나, 같으면 점수 합이 늘어야 한다 (교환이 없으면 그대로)
+            assert curr[0] < prev[0] - 1e-9 or (abs(curr[0] - prev[0]) <= 1e-9 and curr[1] >= prev[1] - 1e-9)
+            prev = curr
+
+
+def test_swaps_keep_keys_and_members(cohort):
+    matrix, teams = greedy_teams(cohort, 60, 4, 1)
+    balanced = balance(matrix, teams)
+    keys = matrix.table.role_pref
+    assert sorted(i for t in balanced for i in t) == list(range(60))
+    for before, after in zip(teams, balanced):
+        assert sorted(keys[i] for i in before) == sorted(keys[i] for i in after)
+
+
+@pytest.mark.parametrize("max_moves", [0, 1, 2, 5])
+def test_max_moves(cohort, max_moves):
+    matrix, teams = greedy_teams(cohort, 40, 4, 2)
+    home = np.empty(40, dtype=int)
+    for t, members in enumerate(teams):
+        home[members] = t
+    home[teams[0][0]] = -1  # 새 학생은 세지 않는다
+    balanced = balance(matrix, teams, home=home.tolist(), max_moves=max_moves)
+    moved = sum(1 for t, members in enumerate(balanced) for i in members if home[i] >= 0 and home[i] != t)
+    assert moved <= max_moves
+    if max_moves == 0:
+        assert all(home[i] in (-1, t) for t, members in enumerate(balanced) for i in members)
+
+
+def test_team_state_matches_team_score(cohort):
+    matrix, teams = greedy_teams(cohort, 30, 4, 0)
+    for t in teams:
+        state = TeamState(t, matrix.scores, matrix.table.roles, REQ)
+        assert state.score == team_score_idx(matrix, t, REQ)
@@ -0,0 +1,31 @@
+import pytest
+
+from app import main
+
+
+def to_columns(students):
+    cols = {k: [] for k in ("student_id", "O", "C", "E", "A", "N", "role_pref", "availability")}
+    for s in students:
+        for k in cols:
+            cols[k].append(getattr(s, k))
+    return cols
+
+
+def test_orjson_fast_path_available():
+    assert main.orjson is not None
+
+
+@pytest.mark.parametrize("team_size, required_roles", [(4, None), (5, {"PM": 1, "BE": 2})])
+def test_columnar_matches_match_run(client, cohort, team_size, required_roles):
+    students = cohort(53, seed=team_size * 7)
+    options = {"team_size": team_size}
+    if required_roles:
+        options["required_roles"] = required_roles
+    expected = client.post("/match/run", json=dict(options, students=[s.model_dump() for s in students]))
+    got = client.post("/match/run/columnar", json=dict(options, columns=to_columns(students)))
+    assert expected.status_code == got.status_code == 200, got.text
+    assert got.headers["content-type"] == "application/json"
+    expected, got = expected.json(), got.json()
+    # run_id는 요청마다 다르므로 팀(순서, 멤버, 역할, 점수, reasons)만 비교
+    assert got["teams"] == expected["teams"]
+    assert got["workers"] == expected["workers"] and got["solver"] == expected["solver"]
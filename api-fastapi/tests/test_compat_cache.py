@@ -0,0 +1,49 @@
+import numpy as np
+
+from app.compat_cache import CompatCache
+
+
+def full_fn(n, value=1.0):
+    return lambda: {"scores": np.full((n, n), value, dtype=np.float32)}
+
+
+def rows_fn(n):
+    return lambda rows: {"scores": np.zeros((len(rows), n), dtype=np.float32)}
+
+
+def test_spilled_entry_reloads_read_only(tmp_path):
+    n = 16
+    # 한 항목(16*16*4 바이트)만 들어가는 한도: 두 번째 코호트가 들어오면 첫 번째는 디스크로
+    cache = CompatCache(max_bytes=n * n * 4, spill_dir=str(tmp_path))
+    first = [f"a{i}" for i in range(n)]
+    second = [f"b{i}" for i in range(n)]
+    cache.get_or_compute("ns", first, full_fn(n, 1.0), rows_fn(n))
+    cache.get_or_compute("ns", second, full_fn(n, 2.0), rows_fn(n))
+    assert cache.stats()["spills"] == 1
+
+    arrays = cache.get_or_compute("ns", first, full_fn(n, 3.0), rows_fn(n))
+    assert cache.stats()["spill_hits"] == 1
+    assert float(arrays["scores"][0, 0]) == 1.0
+    assert not arrays["scores"].flags.writeable
+
+
+def test_exact_hit_and_partial_reuse_match_full_matrix(cohort):
+    from app import main
+    from app.compatibility import CompatibilityMatrix
+
+    students = cohort(40, seed=6)
+    cache = CompatCache(max_bytes=64 * 1024 * 1024)
+    first = CompatibilityMatrix(students, main.W, cache)
+    again = CompatibilityMatrix(students, main.W, cache)
+    assert again.scores is first.scores
+    assert cache.stats()["hits"] == 1
+
+    # 다섯 명이 빠지고 두 명이 새로 들어온 코호트: 새 학생의 행/열만 다시 계산
+    changed = students[5:] + cohort(2, seed=99)
+    patched = CompatibilityMatrix(changed, main.W, cache)
+    stats = cache.stats()
+    assert stats["partial_hits"] == 1
+    assert stats["rows_recomputed"] == 40 + 2
+    np.testing.assert_array_equal(patched.scores, CompatibilityMatrix(changed, main.W).scores)
+    np.testing.assert_array_equal(patched.avail, CompatibilityMatrix(changed, main.W).avail)
+    assert not patched.scores.flags.writeable
@@ -0,0 +1,32 @@
+import numpy as np
+import pytest
+
+pytest.importorskip("tensorflow")
+
+from app.data_processor import PAIR_FEATURE_DIM
+from app.deep_inference import LiteMatchingModel
+from app.model_registry import deep_module
+
+# TensorFlow 모델 대비 최대 절대 오차 허용치 (fp32는 계산 순서 차이만, fp16/int8은 가중치 양자화 오차 포함)
+TOLERANCE = {"none": 1e-5, "float16": 2e-3, "int8": 3e-2}
+
+
+@pytest.fixture(scope="module")
+def deep_model():
+    import tensorflow as tf
+    tf.random.set_seed(0)
+    model = deep_module().create_model(PAIR_FEATURE_DIM)
+    model(np.zeros((1, PAIR_FEATURE_DIM), dtype=np.float32))
+    return model
+
+
+@pytest.mark.parametrize("quantize", ["none", "float16", "int8"])
+def test_lite_model_matches_tensorflow(deep_model, quantize):
+    features = np.random.default_rng(1).random((3000, PAIR_FEATURE_DIM), dtype=np.float32)
+    expected = deep_model.predict_pairs(features)
+    lite = LiteMatchingModel(deep_model.get_weights(), quantize)
+    # 청크 경계가 결과에 영향을 주지 않는지도 함께 확인
+    got = lite.predict_pairs(features, chunk_size=1000)
+    assert got.shape == expected.shape
+    assert got.dtype == np.float32
+    assert np.max(np.abs(got - expected)) <= TOLERANCE[quantize]
@@ -0,0 +1,88 @@
+import os
+
+import numpy as np
+
+from app.data_processor import (PAIR_FEATURE_DIM, convert_availability_format, prepare_training_data,
+                                team_pair_table)
+from app.feature_store import FeatureStore
+from app.models import Student, TeamData
+
+ROLES = {"PM": 0, "FE": 1, "BE": 2, "Design": 3, "Any": 4}
+SLOTS = ["MonMorn", "MonEve", "TueMorn", "TueEve", "WedMorn", "WedEve", "ThuMorn", "ThuEve",
+         "FriMorn", "FriEve", "SatMorn", "SatEve", "SunMorn", "SunEve"]
+
+
+def per_row_training_data(teams):
+    """벡터화 이전의 학생/쌍 단위 루프 (기준값)"""
+    def encode(s):
+        role = np.zeros(5)
+        role[ROLES.get(s.role_pref, 4)] = 1
+        converted = convert_availability_format(s.availability)
+        slots = np.zeros(14)
+        for slot in converted.split(";") if converted else []:
+            if slot in SLOTS:
+                slots[SLOTS.index(slot)] = 1
+        return np.concatenate([[s.O, s.C, s.E, s.A, s.N], role, slots])
+
+    X, y = [], []
+    for team in teams:
+        f = [encode(s) for s in team.members]
+        for i in range(len(f)):
+            for j in range(i + 1, len(f)):
+                X.append(np.concatenate([f[i], f[j], np.abs(f[i] - f[j]), f[i] + f[j]]))
+                y.append(team.performance_score)
+    return np.array(X), np.array(y)
+
+
+def sample_teams(cohort):
+    students = cohort(17, seed=12)
+    # 역할/가용시간 형식의 경계 사례
+    students[0] = students[0].model_copy(update={"role_pref": "Unknown", "availability": "weekdays 9-18"})
+    students[1] = students[1].model_copy(update={"availability": ""})
+    students[2] = students[2].model_copy(update={"availability": "MonEve;Holiday;SunMorn"})
+    sizes = [4, 3, 5, 1, 4]
+    teams, start = [], 0
+    for k, size in enumerate(sizes):
+        teams.append(TeamData(team_id=f"t{k}", members=students[start:start + size], performance_score=0.1 * k + 0.05))
+        start += size
+    return teams
+
+
+def test_prepare_training_data_matches_per_row(cohort):
+    teams = sample_teams(cohort)
+    X, y = prepare_training_data(teams)
+    X_ref, y_ref = per_row_training_data(teams)
+    assert X.shape == X_ref.shape == (6 + 3 + 10 + 0 + 6, PAIR_FEATURE_DIM)
+    assert X.dtype == y.dtype == np.float32
+    np.testing.assert_array_equal(X, X_ref.astype(np.float32))
+    np.testing.assert_array_equal(y, y_ref.astype(np.float32))
+    assert prepare_training_data([])[0].shape[0] == 0
+
+
+def test_feature_store_npy_round_trip(tmp_path, cohort, monkeypatch):
+    from app import feature_store
+    store = FeatureStore(str(tmp_path))
+    teams = sample_teams(cohort)
+    X_ref, y_ref = prepare_training_data(teams)
+    # 청크 경계를 여러 번 지나도록 작은 청크로 쓴다
+    monkeypatch.setattr(feature_store, "WRITE_CHUNK_PAIRS", 4)
+    path = store.write_pairs("a", *team_pair_table(teams), meta={"job_id": "a"})
+    store.write("b", X_ref[:5], y_ref[:5])
+    store.write_pairs("empty", *team_pair_table([]))
+
+    X, y, meta = store.open("a")
+    assert isinstance(X, np.memmap) and X.dtype == np.float32
+    np.testing.assert_array_equal(X, X_ref)
+    np.testing.assert_array_equal(y, y_ref)
+    assert meta["job_id"] == "a" and meta["pairs"] == len(y_ref)
+    assert path == store.path("a") and sorted(os.listdir(path)) == ["features.npy", "labels.npy", "meta.json"]
+    np.testing.assert_array_equal(store.open("b")[0], X_ref[:5])
+    assert store.open("empty")[0].shape == (0, PAIR_FEATURE_DIM)
+    # 쓰다 만 임시 디렉토리는 남지 않는다
+    assert sorted(os.listdir(tmp_path)) == ["a", "b", "empty"]
+
+    for name in ("a", "b", "empty"):
+        os.utime(os.path.join(store.path(name), "meta.json"), (0, {"a": 1, "b": 2, "empty": 3}[name]))
+    assert store.names() == ["a", "b", "empty"]
+    store.prune(1, protect=["a"])
+    assert store.names() == ["a", "empty"]
@@ -0,0 +1,76 @@
+import numpy as np
+import pytest
+
+from app import main
+from app.compatibility import CompatibilityMatrix, team_sizes
+from app.incremental import LocalScores, moved_students, place_students, repair_teams
+from app.student_table import StudentTable
+
+REQ = {"PM": 1, "FE": 1, "BE": 1, "Design": 1}
+
+
+def test_local_scores_match_full_matrix(cohort):
+    table = StudentTable(cohort(30, seed=2))
+    matrix = CompatibilityMatrix(table, main.W)
+    local = LocalScores(table, main.W)
+    np.testing.assert_array_equal(local.rows([3, 7]), matrix.scores[[3, 7]])
+    for team in ([0, 1, 2, 3], [5, 9, 11], [4]):
+        assert local.team_internal_score(team) == matrix.team_internal_score(team)
+        assert local.mean_availability(team) == matrix.mean_availability(team)
+
+
+def split(n, team_size):
+    teams, start = [], 0
+    for size in team_sizes(n, team_size):
+        teams.append(list(range(start, start + size)))
+        start += size
+    return teams
+
+
+@pytest.mark.parametrize("added", [1, 3, 6])
+def test_place_students_fills_within_size_bounds(cohort, added):
+    n_old = 20
+    table = StudentTable(cohort(n_old + added, seed=added))
+    teams = split(n_old, 4)
+    home = [t for t, members in enumerate(teams) for _ in members] + [-1] * added
+    new_teams, origin, touched = place_students(LocalScores(table, main.W), teams, home,
+                                                list(range(n_old, n_old + added)), 4, REQ, max_moved=0)
+    assert sorted(i for t in new_teams for i in t) == list(range(n_old + added))
+    sizes = [len(t) for t in new_teams]
+    assert max(sizes) - min(sizes) <= 1
+    assert len(new_teams) == max(len(teams), len(team_sizes(n_old + added, 4)))
+    assert origin[:len(teams)] == list(range(len(teams)))
+    assert moved_students(new_teams, home) == []
+    # 바뀌지 않은 팀은 그대로
+    for t in range(len(teams)):
+        if t not in touched:
+            assert new_teams[t] == teams[t]
+
+
+@pytest.mark.parametrize("max_moved", [0, 1, 3])
+def test_removals_respect_max_moved(cohort, max_moved):
+    table = StudentTable(cohort(22, seed=4))
+    # 24명 중 마지막 팀에서 두 명이 빠진 상태
+    teams = [[i for i in t if i < 22] for t in split(24, 4)]
+    home = [t for t, members in enumerate(teams) for _ in members]
+    scores = LocalScores(table, main.W)
+    new_teams, _, touched = place_students(scores, teams, home, [], 4, REQ, max_moved=max_moved)
+    repair_teams(scores, new_teams, touched, home, REQ, max_moved=max_moved)
+    assert sorted(i for t in new_teams for i in t) == list(range(22))
+    assert len(moved_students(new_teams, home)) <= max_moved
+
+
+def test_match_update_endpoint(client, cohort):
+    students = [s.model_dump() for s in cohort(26, seed=9)]
+    base = client.post("/match/run", json={"students": students[:24], "team_size": 4}).json()
+    teams = [[m["student_id"] for m in t["members"]] for t in base["teams"]]
+    r = client.post("/match/update", json={"students": students[:24], "teams": teams, "add": students[24:],
+                                           "remove": [teams[0][0]], "team_size": 4, "max_moved": 1})
+    assert r.status_code == 200, r.text
+    body = r.json()
+    ids = sorted(m["student_id"] for t in body["teams"] for m in t["members"])
+    assert ids == sorted(s["student_id"] for s in students[:24] + students[24:] if s["student_id"] != teams[0][0])
+    assert len(body["moved"]) <= 1
+    # 잘못된 요청은 400
+    r = client.post("/match/update", json={"students": students[:24], "teams": teams, "remove": ["nope"]})
+    assert r.status_code == 400
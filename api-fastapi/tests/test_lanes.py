@@ -0,0 +1,90 @@
+import asyncio
+import threading
+
+import pytest
+
+from app.lanes import Lane, LaneFull
+
+
+def run(coro):
+    return asyncio.run(coro)
+
+
+def test_completed_counts_only_work_that_ran():
+    lane = Lane("test-run", 1, 1)
+    gate = threading.Event()
+
+    async def scenario():
+        first = asyncio.ensure_future(lane.run(gate.wait))
+        await asyncio.sleep(0.01)
+        waiting = asyncio.ensure_future(lane.run(lambda: "queued"))
+        await asyncio.sleep(0.01)
+        # 대기열(1)이 가득 차면 바로 거절
+        with pytest.raises(LaneFull):
+            await lane.run(lambda: "rejected")
+        # 기다리던 요청은 실행 전에 취소
+        waiting.cancel()
+        await asyncio.sleep(0.01)
+        gate.set()
+        await first
+        assert await lane.run(lambda: "ok") == "ok"
+
+    try:
+        run(scenario())
+    finally:
+        gate.set()
+        lane.shutdown()
+    assert lane.rejected == 1
+    assert lane.completed == 2
+    assert lane.active == 0
+    assert lane.stats()["queued"] == 0
+
+
+def test_cancelled_request_keeps_slot_until_work_finishes():
+    lane = Lane("test-cancel", 1, 4)
+    gate = threading.Event()
+    done = []
+
+    def work():
+        gate.wait()
+        done.append(1)
+
+    async def scenario():
+        task = asyncio.ensure_future(lane.run(work))
+        await asyncio.sleep(0.01)
+        task.cancel()
+        await asyncio.sleep(0.01)
+        # 요청은 끊겼어도 작업이 실행 중이므로 자리를 반납하지 않는다
+        assert lane.active == 1
+        assert lane.completed == 0
+        gate.set()
+        for _ in range(500):
+            if not lane.active:
+                break
+            await asyncio.sleep(0.01)
+
+    try:
+        run(scenario())
+    finally:
+        gate.set()
+        lane.shutdown()
+    assert done == [1]
+    assert lane.completed == 1
+
+
+def test_released_slot_is_handed_to_waiter():
+    lane = Lane("test-handoff", 1, 2)
+
+    async def scenario():
+        await lane.acquire()
+        waiter = asyncio.ensure_future(lane.acquire())
+        await asyncio.sleep(0)
+        assert lane.stats()["queued"] == 1
+        lane.release()
+        await waiter
+        assert lane.active == 1
+        lane.release()
+
+    run(scenario())
+    assert lane.active == 0
+    assert lane.completed == 2
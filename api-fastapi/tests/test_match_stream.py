@@ -0,0 +1,72 @@
+import asyncio
+import json
+
+from app import main
+
+
+def team_set(teams):
+    return {frozenset(m["student_id"] for m in t["members"]) for t in teams}
+
+
+def read_stream(client, body):
+    r = client.post("/match/run/stream", json=body)
+    assert r.status_code == 200, r.text
+    return [json.loads(line) for line in r.text.splitlines()]
+
+
+def test_stream_matches_match_run(client, cohort):
+    students = [s.model_dump() for s in cohort(60, seed=8)]
+    body = {"students": students, "team_size": 4, "balance": True, "progress_ms": 0}
+    events = read_stream(client, body)
+    kinds = [e["type"] for e in events]
+    assert kinds[0] == "progress" and kinds[-1] == "done"
+    assert "error" not in kinds
+    teams = [e for e in events if e["type"] == "team"]
+    assert [t["index"] for t in teams] == list(range(len(teams)))
+    assert events[-1]["teams"] == len(teams)
+
+    expected = client.post("/match/run", json={"students": students, "team_size": 4}).json()["teams"]
+    assert team_set(teams) == team_set(expected)
+    assert sorted(t["score"] for t in teams) == sorted(t["score"] for t in expected)
+    assert main.MATCH_LANE.active == 0
+
+
+async def stream_asgi(body: bytes, disconnect_after: int):
+    """ASGI 앱을 직접 호출해 body 청크를 disconnect_after개 받은 뒤 연결을 끊는다 → (받은 청크, 전송 중 레인 active)"""
+    chunks, active = [], []
+    requested = False
+    disconnected = asyncio.Event()
+
+    async def receive():
+        nonlocal requested
+        if not requested:
+            requested = True
+            return {"type": "http.request", "body": body, "more_body": False}
+        await disconnected.wait()
+        return {"type": "http.disconnect"}
+
+    async def send(message):
+        if message["type"] == "http.response.body" and message.get("body"):
+            chunks.append(message["body"])
+            active.append(main.MATCH_LANE.active)
+            if len(chunks) >= disconnect_after:
+                disconnected.set()
+
+    scope = {"type": "http", "asgi": {"version": "3.0"}, "http_version": "1.1", "method": "POST",
+             "scheme": "http", "path": "/match/run/stream", "raw_path": b"/match/run/stream", "query_string": b"",
+             "root_path": "", "client": ("test", 1), "server": ("test", 80),
+             "headers": [(b"content-type", b"application/json"), (b"x-api-key", main.API_KEY.encode())]}
+    await main.app(scope, receive, send)
+    return chunks, active
+
+
+def test_stream_releases_lane_on_disconnect(client, cohort):
+    students = [s.model_dump() for s in cohort(200, seed=9)]
+    body = json.dumps({"students": students, "team_size": 4, "progress_ms": 0}).encode()
+    completed = main.MATCH_LANE.completed
+    chunks, active = asyncio.run(stream_asgi(body, disconnect_after=3))
+    # 전송 중에는 자리를 잡고 있다가, 끊긴 뒤에는 반납한다
+    assert active[0] == 1
+    assert not any(b'"type": "done"' in c for c in chunks)
+    assert main.MATCH_LANE.active == 0
+    assert main.MATCH_LANE.completed == completed + 1
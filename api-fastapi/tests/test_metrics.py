@@ -0,0 +1,45 @@
+import re
+
+
+def metric_value(text, name, **labels):
+    """/metrics 본문에서 name{labels...} 한 줄의 값 (라벨은 이름순, 없으면 0)"""
+    label_str = ",".join(f'{k}="{v}"' for k, v in sorted(labels.items()))
+    m = re.search(rf"^{re.escape(name)}\{{{re.escape(label_str)}\}} (\S+)$", text, re.M)
+    return float(m.group(1)) if m else 0.0
+
+
+def test_timing_header_and_metrics(client, cohort):
+    students = [s.model_dump() for s in cohort(24, seed=31)]
+    before = client.get("/metrics").text
+    r = client.post("/match/run", json={"students": students, "team_size": 4}, headers={"X-Timing": "1"})
+    assert r.status_code == 200
+
+    stages = dict(part.split("=") for part in r.headers["X-Timing"].split(", "))
+    for name in ("validate", "feature_build", "queue", "assignment", "total"):
+        assert name in stages
+    assert all(float(v) >= 0 for v in stages.values())
+    # X-Timing을 요청하지 않으면 헤더 없음 (TIMING_HEADER=0)
+    assert "X-Timing" not in client.get("/ready").headers
+
+    text = client.get("/metrics").text
+    assert "# TYPE matching_requests_total counter" in text
+    assert "# TYPE matching_stage_seconds histogram" in text
+    requests = dict(endpoint="/match/run", status="200", strategy="greedy")
+    assert metric_value(text, "matching_requests_total", **requests) == \
+        metric_value(before, "matching_requests_total", **requests) + 1
+    count = metric_value(text, "matching_request_seconds_count", endpoint="/match/run")
+    assert count == metric_value(before, "matching_request_seconds_count", endpoint="/match/run") + 1
+    assert metric_value(text, "matching_request_seconds_bucket", endpoint="/match/run", le="+Inf") == count
+    assert metric_value(text, "matching_stage_seconds_count", endpoint="/match/run", stage="assignment") >= 1
+    assert metric_value(text, "matching_cohort_size_count", endpoint="/match/run") >= 1
+
+
+def test_endpoint_label_is_route_template(client):
+    assert client.get("/match/train/abc123").status_code == 404
+    assert client.get("/no/such/path").status_code == 404
+    text = client.get("/metrics").text
+    assert metric_value(text, "matching_requests_total", endpoint="/match/train/{job_id}", status="404",
+                        strategy="") >= 1
+    assert metric_value(text, "matching_requests_total", endpoint="other", status="404", strategy="") >= 1
+    assert "abc123" not in text
+    assert "/no/such/path" not in text
@@ -0,0 +1,13 @@
+from app import multistart
+
+
+def test_shutdown_pool_releases_and_recreates_pool():
+    multistart.shutdown_pool()
+    pool = multistart.get_pool()
+    assert multistart.get_pool() is pool
+    multistart.shutdown_pool()
+    assert multistart._POOL is None
+    # 종료 후 다시 부르면 새 풀을 띄운다
+    assert multistart.get_pool() is not pool
+    multistart.shutdown_pool()
+    multistart.shutdown_pool()
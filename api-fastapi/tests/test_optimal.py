@@ -0,0 +1,97 @@
+import time
+
+import numpy as np
+import pytest
+
+from app.compatibility import team_sizes
+from app.optimal import branch_and_bound, objective, optimal_match, solve_cpsat
+from app.student_table import StudentTable
+
+REQ = {"PM": 1, "FE": 1, "BE": 1}
+
+
+def test_optimal_match_empty_roster():
+    teams, info = optimal_match(np.zeros((0, 0)), [], [], [], 4, REQ)
+    assert teams == []
+    assert info["method"] == "trivial"
+    assert info["objective"] == 0.0
+
+
+def test_optimal_match_single_team():
+    scores = np.full((3, 3), 0.5)
+    teams, info = optimal_match(scores, ["PM", "FE", "BE"], [0.5] * 3, [True, False, False], 4, REQ)
+    assert teams == [[0, 1, 2]]
+    assert info["status"] == "optimal"
+
+
+def test_optimal_match_small_cohort_is_proven(cohort):
+    table = StudentTable(cohort(8, seed=3))
+    scores = np.random.default_rng(3).random((8, 8))
+    scores = (scores + scores.T) / 2
+    teams, info = optimal_match(scores, table.roles, list(table.C), list(table.is_pm), 4, REQ, time_budget_ms=5000)
+    assert sorted(i for t in teams for i in t) == list(range(8))
+    assert info["status"] == "optimal"
+    assert info["objective"] == round(objective(scores, teams, table.roles, REQ), 4)
+
+
+def test_mean_c_empty():
+    assert StudentTable([]).mean_c([]) == 0.0
+
+
+def test_match_run_empty_roster(client):
+    for strategy in ("greedy", "multistart", "optimal"):
+        r = client.post("/match/run", json={"students": [], "team_size": 4, "strategy": strategy})
+        assert r.status_code == 200, (strategy, r.text)
+        assert r.json()["teams"] == []
+    r = client.post("/match/run/columnar", json={"columns": {"student_id": [], "O": [], "C": [], "E": [], "A": [], "N": []},
+                                                 "team_size": 4, "strategy": "optimal"})
+    assert r.status_code == 200, r.text
+    assert r.json()["teams"] == []
+
+
+@pytest.mark.parametrize("seed", range(6))
+def test_cpsat_unequal_sizes_matches_exact_search(seed):
+    pytest.importorskip("ortools")
+    # 7명, team_size=2 → [3, 2, 2]: 0번 학생이 작은 팀에 가는 편이 나은 경우도 최적으로 찾아야 한다
+    rng = np.random.default_rng(seed)
+    scores = rng.random((7, 7))
+    scores = (scores + scores.T) / 2
+    roles = ["PM", "FE", "BE", "FE", "BE", "Design", "FE"]
+    sizes = team_sizes(7, 2)
+    assert sizes == [3, 2, 2]
+    hint = [[0, 1, 2], [3, 4], [5, 6]]
+    result = solve_cpsat(scores, sizes, roles, REQ, hint, 10)
+    exact, done = branch_and_bound(scores, sizes, roles, REQ, hint, time.time() + 30)
+    assert done and result["optimal"]
+    assert sorted(len(t) for t in result["teams"]) == [2, 2, 3]
+    assert objective(scores, result["teams"], roles, REQ) == pytest.approx(objective(scores, exact, roles, REQ), abs=1e-3)
+
+
+def random_scores(n, seed):
+    scores = np.random.default_rng(seed).random((n, n))
+    return (scores + scores.T) / 2
+
+
+def test_optimal_match_cpsat_reports_certified_gap(cohort):
+    pytest.importorskip("ortools")
+    table = StudentTable(cohort(24, seed=5))
+    scores = random_scores(24, 5)
+    teams, info = optimal_match(scores, table.roles, list(table.C), list(table.is_pm), 4, REQ, time_budget_ms=1500)
+    assert info["method"] == "cp_sat"
+    assert sorted(len(t) for t in teams) == [4] * 6
+    assert info["objective"] == round(objective(scores, teams, table.roles, REQ), 4)
+    assert info["bound"] >= info["objective"]
+    assert info["gap"] == round((info["bound"] - info["objective"]) / info["objective"], 4)
+
+
+@pytest.mark.parametrize("n, method", [(10, "branch_and_bound"), (20, "local_search")])
+def test_optimal_match_without_ortools(monkeypatch, cohort, n, method):
+    import app.optimal
+    monkeypatch.setattr(app.optimal, "cp_model", None)
+    table = StudentTable(cohort(n, seed=n))
+    scores = random_scores(n, n)
+    teams, info = optimal_match(scores, table.roles, list(table.C), list(table.is_pm), 4, REQ, time_budget_ms=1000)
+    assert info["method"] == method
+    assert sorted(i for t in teams for i in t) == list(range(n))
+    assert info["bound"] >= info["objective"]
+    assert (info["status"] == "optimal") == (method == "branch_and_bound")
@@ -0,0 +1,120 @@
+import os
+
+import numpy as np
+import pytest
+
+from app import deep_inference, main
+from app.compat_cache import CompatCache
+from app.data_processor import PAIR_FEATURE_DIM, create_pair_features, extract_student_features
+from app.deep_inference import LiteMatchingModel
+from app.pair_store import PairScoreStore
+from app.student_table import StudentTable
+
+# 쌍 특성을 float64로 만든 기준값과 float32 배치 경로의 허용 오차
+ATOL = 1e-5
+
+
+@pytest.fixture(scope="module")
+def lite_model():
+    """DeepMatchingModel과 같은 구조의 고정 난수 가중치 NumPy 모델 (TensorFlow 불필요)"""
+    rng = np.random.default_rng(0)
+    dims = [PAIR_FEATURE_DIM, 64, 32, 1]
+    weights = []
+    for d_in, d_out in zip(dims, dims[1:]):
+        weights += [rng.normal(0, 0.3, (d_in, d_out)), rng.normal(0, 0.1, d_out)]
+    return LiteMatchingModel(weights)
+
+
+def per_pair_scores(model, students):
+    """쌍마다 특성을 만들어 한 쌍씩 예측한 기준 호환성 행렬"""
+    features = np.stack([extract_student_features(s) for s in students])
+    n = len(students)
+    expected = np.ones((n, n))
+    for i in range(n):
+        for j in range(i + 1, n):
+            score = model.predict_pairs(create_pair_features(features, (i, j))[None, :])[0]
+            expected[i, j] = expected[j, i] = score
+    return expected
+
+
+def test_batched_inference_matches_per_pair(lite_model, cohort):
+    students = cohort(25, seed=41)
+    expected = per_pair_scores(lite_model, students)
+    compat = deep_inference.predict_compatibility(lite_model, students)
+    assert compat.shape == (25, 25)
+    np.testing.assert_allclose(compat, expected, atol=ATOL)
+    team = [0, 4, 9, 17]
+    pairs = [expected[i, j] for i in team for j in team if i < j]
+    assert deep_inference.team_compatibility(compat, team) == pytest.approx(np.mean(pairs), abs=ATOL)
+
+
+def test_streaming_tiles_match_per_pair(lite_model, cohort, tmp_path):
+    students = cohort(40, seed=42)
+    expected = per_pair_scores(lite_model, students)
+    # 한도 0: memmap 저장소에 타일마다 한 행씩 기록
+    store = deep_inference.predict_compatibility_streaming(lite_model, students, memory_limit_mb=0,
+                                                           store_dir=str(tmp_path))
+    assert isinstance(store, PairScoreStore) and store.path
+    try:
+        np.testing.assert_allclose(store.to_dense(), expected, atol=ATOL)
+        np.testing.assert_allclose(store.row(7), expected[7], atol=ATOL)
+    finally:
+        store.close()
+    assert os.listdir(tmp_path) == []
+    in_memory = deep_inference.predict_compatibility_streaming(lite_model, students)
+    assert in_memory.path is None
+    np.testing.assert_allclose(in_memory.to_dense(), expected, atol=ATOL)
+
+
+def test_pair_rows_and_cache_match_per_pair(lite_model, cohort):
+    students = cohort(30, seed=43)
+    table = StudentTable(students)
+    rows = np.array([0, 12, 29])
+    expected = per_pair_scores(lite_model, students)
+    np.testing.assert_allclose(deep_inference.predict_pair_rows(lite_model, table.features(), rows, memory_limit_mb=0),
+                               expected[rows], atol=ATOL)
+
+    cache = CompatCache(max_bytes=16 * 1024 * 1024)
+    deep_inference.predict_compatibility_cached(lite_model, students, cache, "v1")
+    # 세 명이 새로 들어온 코호트는 새 행/열만 다시 예측해도 전체 예측과 같다
+    changed = students[3:] + cohort(3, seed=99)
+    compat = deep_inference.predict_compatibility_cached(lite_model, changed, cache, "v1")
+    assert cache.stats()["partial_hits"] == 1
+    np.testing.assert_allclose(compat, per_pair_scores(lite_model, changed), atol=ATOL)
+
+
+def test_greedy_teams_same_for_dense_and_store(lite_model, cohort):
+    table = StudentTable(cohort(50, seed=44))
+    store = deep_inference.predict_compatibility_streaming(lite_model, table)
+    req_roles = {"PM": 1, "FE": 1, "BE": 1}
+    teams = deep_inference.greedy_team_indices(table, 4, req_roles, store)
+    assert teams == deep_inference.greedy_team_indices(table, 4, req_roles, store.to_dense())
+    assert sorted(i for t in teams for i in t) == list(range(len(table)))
+
+
+def test_match_run_deep_streams_above_cache_budget(client, cohort, lite_model, monkeypatch):
+    n = 30
+    students = [s.model_dump() for s in cohort(n, seed=45)]
+    monkeypatch.setattr(main.MODEL_REGISTRY, "model", lite_model)
+    calls = []
+    streaming = deep_inference.predict_compatibility_streaming
+    monkeypatch.setattr(deep_inference, "predict_compatibility_streaming",
+                        lambda *args, **kwargs: calls.append(1) or streaming(*args, **kwargs))
+
+    def run(max_bytes):
+        monkeypatch.setattr(main.COMPAT_CACHE, "max_bytes", max_bytes)
+        calls.clear()
+        r = client.post("/match/run_deep", json={"students": students, "team_size": 4})
+        assert r.status_code == 200, r.text
+        return r.json()["teams"], len(calls)
+
+    # 행렬(n*n*4 바이트)이 캐시 한도의 절반 이하면 코호트 캐시 경로 (캐시 미스라 전체 예측 한 번)
+    cached, cached_calls = run(n * n * 4 * 2)
+    # 절반을 넘으면 캐시를 거치지 않고 스트리밍 저장소를 바로 쓴다
+    monkeypatch.setattr(deep_inference, "predict_compatibility_cached",
+                        lambda *args, **kwargs: pytest.fail("cache path used above the budget"))
+    streamed, streamed_calls = run(n * n * 4 * 2 - 1)
+    assert cached_calls == streamed_calls == 1
+    assert [[m["student_id"] for m in t["members"]] for t in streamed] == \
+        [[m["student_id"] for m in t["members"]] for t in cached]
+    assert [t["score"] for t in streamed] == [t["score"] for t in cached]
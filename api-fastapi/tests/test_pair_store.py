@@ -0,0 +1,67 @@
+import os
+
+import numpy as np
+
+from app.pair_store import PairScoreStore, create_store, row_tiles
+
+
+def filled_store(n, path=None):
+    """상삼각 값이 무작위인 저장소와 같은 값의 대칭 밀집 행렬"""
+    store = PairScoreStore(n, path)
+    dense = np.ones((n, n), dtype=np.float32)
+    left, right = np.triu_indices(n, k=1)
+    values = np.random.default_rng(n).random(len(left), dtype=np.float32)
+    dense[left, right] = dense[right, left] = values
+    store.values[:store.size] = values
+    return store, dense
+
+
+def test_upper_triangular_indexing():
+    n = 9
+    store, dense = filled_store(n)
+    assert store.shape == (n, n) and store.size == n * (n - 1) // 2
+    for i in range(n):
+        assert store.offset(i) == sum(n - k - 1 for k in range(i))
+        for j in range(n):
+            assert store[i, j] == dense[i, j]
+        np.testing.assert_array_equal(store.row(i), dense[i])
+    # 배열 인덱스 (대각선 포함, 브로드캐스트)
+    i = np.array([0, 3, 8, 5, 2])
+    j = np.array([8, 3, 0, 1, 7])
+    np.testing.assert_array_equal(store[i, j], dense[i, j])
+    np.testing.assert_array_equal(store[i[:, None], j[None, :]], dense[i[:, None], j[None, :]])
+    np.testing.assert_array_equal(store.to_dense(), dense)
+    lo, hi = store.row_span(2, 5)
+    assert (lo, hi) == (store.offset(2), store.offset(5))
+    assert store.row_span(4, n) == (store.offset(4), store.size)
+
+
+def test_memmap_round_trip(tmp_path):
+    n = 40
+    store = create_store(n, memory_limit_bytes=1024, store_dir=str(tmp_path))
+    assert store.path and os.path.dirname(store.path) == str(tmp_path)
+    expected, dense = filled_store(n)
+    store.values[:] = expected.values
+    store.values.flush()
+    # 파일에 쓴 값을 다시 읽으면 같은 행렬
+    reread = np.memmap(store.path, dtype=np.float32, mode="r", shape=(store.size,))
+    np.testing.assert_array_equal(reread, expected.values)
+    del reread
+    np.testing.assert_array_equal(store.to_dense(), dense)
+    path = store.path
+    store.close()
+    assert store.path is None and not os.path.exists(path)
+    # 한도 안이면 메모리 배열
+    assert create_store(n, memory_limit_bytes=1 << 20).path is None
+
+
+def test_row_tiles_cover_all_pairs():
+    store = PairScoreStore(30)
+    for max_pairs in (1, 29, 50, 200, 10 ** 6):
+        tiles = list(row_tiles(store, max_pairs))
+        assert tiles[0][0] == 0 and tiles[-1][1] == store.n - 1
+        assert all(a[1] == b[0] for a, b in zip(tiles, tiles[1:]))
+        spans = [store.row_span(start, stop) for start, stop in tiles]
+        assert sum(hi - lo for lo, hi in spans) == store.size
+        # 한 행이 한도를 넘는 경우만 예외
+        assert all(hi - lo <= max_pairs or stop - start == 1 for (lo, hi), (start, stop) in zip(spans, tiles))
@@ -0,0 +1,13 @@
+from fastapi import Response
+
+from app import main
+
+
+def test_run_profiled_records_request_strategy(cohort):
+    req = main.MatchRequest(students=cohort(4, seed=1), strategy="multistart")
+    response = Response()
+    assert main.run_profiled("cprofile", response, "/match/run_deep", req, sum, [1, 2]) == 3
+    meta = main.PROFILES.meta(response.headers["X-Profile-Id"])
+    assert meta["endpoint"] == "/match/run_deep"
+    assert meta["strategy"] == "multistart"
+    assert meta["students"] == 4
@@ -0,0 +1,130 @@
+import asyncio
+import time
+import uuid
+
+import numpy as np
+import pytest
+
+from app import main
+from app.result_cache import IdempotencyConflict, ResultCache, request_key
+
+
+def flush_history():
+    """이력 쓰기 스레드에 쌓인 작업이 끝날 때까지 기다린다"""
+    main.HISTORY_WRITER.submit(lambda: None).result()
+
+
+def history_runs(cohort, term):
+    return set(main.TEAM_HISTORY.load_table(cohort=cohort, term=term, columns=["run_id"])["run_id"].to_pylist())
+
+
+def match_body(students, **extra):
+    return dict({"students": [s.model_dump() for s in students], "team_size": 4}, **extra)
+
+
+def test_cache_key_includes_cohort_and_term(client, cohort):
+    students = cohort(12, seed=21)
+    tag = uuid.uuid4().hex[:8]
+    runs = {}
+    for c, t in ((f"A-{tag}", "2025-1"), (f"B-{tag}", "2025-1"), (f"A-{tag}", "2025-2")):
+        r = client.post("/match/run", json=match_body(students, cohort=c, term=t))
+        assert r.status_code == 200, r.text
+        assert r.headers["X-Cache"] == "miss"
+        runs[c, t] = r.json()["run_id"]
+    assert len(set(runs.values())) == 3
+
+    # 같은 코호트/학기로 다시 오면 캐시된 응답 (이력은 한 번만)
+    r = client.post("/match/run", json=match_body(students, cohort=f"A-{tag}", term="2025-1"))
+    assert r.headers["X-Cache"] == "hit"
+    assert r.json()["run_id"] == runs[f"A-{tag}", "2025-1"]
+    flush_history()
+    for (c, t), run_id in runs.items():
+        assert history_runs(c, t) == {run_id}
+
+
+def test_coalesced_requests_record_history_once(cohort):
+    tag = uuid.uuid4().hex[:8]
+    req = main.MatchRequest(students=cohort(8, seed=5), team_size=4, cohort=f"C-{tag}")
+    columns = main.student_columns(req.students)
+    calls = []
+
+    async def compute():
+        calls.append(1)
+        await asyncio.sleep(0.05)
+        return main.record_match(req, None, [[0, 1, 2, 3], [4, 5, 6, 7]], "test")
+
+    async def run():
+        namespace = main.match_namespace(req)
+        return await asyncio.gather(*(main.cached_match("/test/coalesce", namespace, columns, compute, None, None)
+                                      for _ in range(3)))
+
+    results = asyncio.run(run())
+    assert len(calls) == 1
+    assert sorted(outcome for _, outcome in results) == ["coalesced", "coalesced", "miss"]
+    run_id = results[0][0]
+    assert all(r == run_id for r, _ in results)
+    flush_history()
+    assert history_runs(f"C-{tag}", main.DEFAULT_TERM) == {run_id}
+
+
+def columns(ids, roles=None, avail=None):
+    n = len(ids)
+    ocean = np.arange(n * 5, dtype=np.float64).reshape(n, 5) / (n * 5)
+    return list(ids), ocean, roles or ["FE"] * n, avail or ["MonEve"] * n
+
+
+def test_request_key_fields():
+    ns = {"endpoint": "/match/run", "team_size": 4}
+    base = request_key(ns, *columns(["a", "b", "c"]))
+    assert request_key(dict(ns), *columns(["a", "b", "c"])) == base
+    # 학생 순서, 역할, 가용시간, 옵션이 바뀌면 다른 키
+    assert request_key(ns, *columns(["b", "a", "c"])) != base
+    assert request_key(ns, *columns(["a", "b", "c"], roles=["PM", "FE", "FE"])) != base
+    assert request_key(ns, *columns(["a", "b", "c"], avail=["", "MonEve", "MonEve"])) != base
+    assert request_key(dict(ns, team_size=5), *columns(["a", "b", "c"])) != base
+
+
+def test_result_cache_lru_ttl_and_idempotency():
+    cache = ResultCache(max_entries=2, ttl_s=60)
+    calls = []
+
+    def compute(value):
+        async def run():
+            calls.append(value)
+            return value
+        return run
+
+    async def scenario():
+        assert await cache.get_or_compute("a", compute(1)) == (1, "miss")
+        assert await cache.get_or_compute("a", compute(2)) == (1, "hit")
+        assert await cache.get_or_compute("a", compute(3), refresh=True) == (3, "miss")
+        await cache.get_or_compute("b", compute(4))
+        await cache.get_or_compute("c", compute(5))
+        # 가장 오래 쓰지 않은 a가 밀려난다
+        assert await cache.get_or_compute("a", compute(6)) == (6, "miss")
+        await cache.get_or_compute("b", compute(7), idempotency_key="k")
+        with pytest.raises(IdempotencyConflict):
+            await cache.get_or_compute("c", compute(8), idempotency_key="k")
+
+    asyncio.run(scenario())
+    assert calls == [1, 3, 4, 5, 6, 7]
+    assert cache.stats()["evictions"] >= 1
+
+    cache = ResultCache(max_entries=2, ttl_s=0.01)
+    asyncio.run(cache.get_or_compute("a", compute(1)))
+    time.sleep(0.02)
+    assert asyncio.run(cache.get_or_compute("a", compute(2))) == (2, "miss")
+
+
+def test_failed_compute_is_not_cached():
+    cache = ResultCache()
+
+    async def fail():
+        raise RuntimeError("boom")
+
+    async def ok():
+        return "ok"
+
+    with pytest.raises(RuntimeError):
+        asyncio.run(cache.get_or_compute("a", fail))
+    assert asyncio.run(cache.get_or_compute("a", ok)) == ("ok", "miss")
@@ -0,0 +1,70 @@
+import json
+
+import pytest
+
+from benchmarks.cohort import synthetic_answers
+
+
+def sample_rows():
+    rows = [{"answers": a, "scale": 5} for a in synthetic_answers(4, seed=3)]
+    rows += [{"answers": a, "scale": 7} for a in synthetic_answers(2, seed=4, scale=7)]
+    missing = dict(rows[0]["answers"])
+    del missing["Q7"]
+    rows += [
+        {"answers": missing},                                   # 문항 누락
+        {"answers": dict(rows[1]["answers"], Q3=9)},            # 범위 밖
+        {"answers": rows[2]["answers"], "scale": 6},            # 잘못된 척도
+        {"answers": "not a dict"},                              # 검증 오류
+    ]
+    return rows
+
+
+def single_results(client, rows):
+    """/score/bigfive 단건 호출을 반복한 결과 (점수 dict 또는 None)"""
+    out = []
+    for row in rows:
+        r = client.post("/score/bigfive", json=row)
+        out.append(r.json() if r.status_code == 200 else None)
+    return out
+
+
+def check_batch(body, expected):
+    assert body["ok"] == sum(e is not None for e in expected)
+    assert body["failed"] == sum(e is None for e in expected)
+    assert [item["index"] for item in body["results"]] == list(range(len(expected)))
+    for item, e in zip(body["results"], expected):
+        if e is None:
+            assert item["scores"] is None and item["error"]
+        else:
+            assert item["scores"] == e and item["error"] is None
+
+
+@pytest.mark.parametrize("wrap", [False, True])
+def test_batch_json_matches_single_calls(client, wrap):
+    rows = sample_rows()
+    r = client.post("/score/bigfive/batch", json={"items": rows} if wrap else rows)
+    assert r.status_code == 200, r.text
+    check_batch(r.json(), single_results(client, rows))
+
+
+def test_batch_ndjson_chunks_and_bad_line(client):
+    rows = sample_rows()
+    lines = [json.dumps(row).encode() for row in rows]
+    lines.insert(3, b"{broken json")
+    payload = b"\n".join(lines) + b"\n\n"
+    # 줄 중간에서 잘린 청크로 보낸다
+    chunks = [payload[i:i + 37] for i in range(0, len(payload), 37)]
+    r = client.post("/score/bigfive/batch", content=iter(chunks),
+                    headers={"Content-Type": "application/x-ndjson"})
+    assert r.status_code == 200, r.text
+    body = r.json()
+    expected = single_results(client, rows)
+    expected.insert(3, None)
+    check_batch(body, expected)
+    assert body["results"][3]["error"]
+
+
+@pytest.mark.parametrize("body", [b'{"items": 3}', b'"text"', b"{oops"])
+def test_batch_rejects_non_list_body(client, body):
+    r = client.post("/score/bigfive/batch", content=body, headers={"Content-Type": "application/json"})
+    assert r.status_code == 400
@@ -0,0 +1,56 @@
+import itertools
+
+import numpy as np
+
+from app.compat_cache import student_row_key
+from app.data_processor import extract_feature_matrix
+from app.main import role_coverage_bonus, student_columns
+from app.student_table import StudentTable
+
+
+def sample_students(cohort):
+    students = cohort(12, seed=13)
+    # 공백/빈 역할, 중복 ID, 빈 가용시간
+    students[1] = students[1].model_copy(update={"role_pref": " FE "})
+    students[2] = students[2].model_copy(update={"role_pref": ""})
+    students[3] = students[3].model_copy(update={"student_id": students[0].student_id, "availability": ""})
+    return students
+
+
+def test_from_columns_matches_students(cohort):
+    students = sample_students(cohort)
+    table = StudentTable(students)
+    columnar = StudentTable.from_columns(*student_columns(students))
+    assert len(columnar) == len(table) == 12
+    assert columnar.ids == table.ids
+    np.testing.assert_array_equal(columnar.ocean, table.ocean)
+    assert columnar.C == table.C
+    assert columnar.roles == table.roles and columnar.roles[1:3] == ["FE", "Any"]
+    np.testing.assert_array_equal(columnar.role_code, table.role_code)
+    assert columnar.id_index[students[0].student_id] == 0
+    assert columnar.row_keys() == table.row_keys() == [student_row_key(s) for s in students]
+    np.testing.assert_array_equal(columnar.features(), extract_feature_matrix(students).astype(np.float32))
+    assert columnar.greedy_order() == table.greedy_order()
+    # Student 객체는 처음 접근할 때 열에서 만든다
+    assert columnar._students is None
+    fields = {"student_id", "role_pref", "availability", "O", "C", "E", "A", "N"}
+    assert [s.model_dump(include=fields) for s in columnar.take([0, 5, 11])] == \
+        [students[i].model_dump(include=fields) for i in (0, 5, 11)]
+
+
+def test_greedy_order_matches_sorted(cohort):
+    students = sample_students(cohort)
+    students[4] = students[4].model_copy(update={"role_pref": "PM", "C": students[6].C})
+    students[6] = students[6].model_copy(update={"role_pref": "PM"})
+    expected = sorted(range(len(students)), key=lambda i: (students[i].role_pref == "PM", students[i].C), reverse=True)
+    assert StudentTable(students).greedy_order() == expected
+
+
+def test_role_bonus_matches_student_list(cohort):
+    students = sample_students(cohort)
+    table = StudentTable(students)
+    reqs = [{}, {"PM": 1}, {"PM": 1, "FE": 2, "BE": 1}, {"Any": 1, "Design": 1}, {"FE": 1, "Nobody": 3}]
+    for req in reqs:
+        for idx in itertools.combinations(range(8), 3):
+            assert table.role_bonus(idx, req) == role_coverage_bonus([students[i] for i in idx], req)
+    assert table.role_bonus([], {"PM": 1}) == 0.0
@@ -0,0 +1,48 @@
+import math
+
+import numpy as np
+
+from app.models import TeamData
+from app.team_history import TeamHistoryStore
+
+
+def make_teams(students, size, score=float("nan")):
+    return [TeamData(team_id=f"team_{k}", members=students[i:i + size], performance_score=score, success_rate=score)
+            for k, i in enumerate(range(0, len(students), size))]
+
+
+def test_append_and_load_by_partition(tmp_path, cohort):
+    store = TeamHistoryStore(str(tmp_path))
+    students = cohort(12, seed=1)
+    run_a = store.append_teams(make_teams(students[:8], 4), "CS101", "2025-1", source="match")
+    run_b = store.append_teams(make_teams(students[8:], 4), "CS101", "2025-2")
+    store.append_teams(make_teams(students, 6), "CS102", "2025-1")
+
+    table = store.load_table(cohort="CS101", term="2025-1")
+    assert set(table["run_id"].to_pylist()) == {run_a}
+    assert table["student_id"].to_pylist() == [s.student_id for s in students[:8]]
+    assert set(store.load_table(cohort="CS101")["run_id"].to_pylist()) == {run_a, run_b}
+    assert store.load_table(cohort="nope").num_rows == 0
+    parts = {(p["cohort"], p["term"]): (p["rows"], p["runs"]) for p in store.partitions()}
+    assert parts == {("CS101", "2025-1"): (8, 1), ("CS101", "2025-2"): (4, 1), ("CS102", "2025-1"): (12, 1)}
+
+
+def test_labels_override_and_pair_table(tmp_path, cohort):
+    store = TeamHistoryStore(str(tmp_path))
+    students = cohort(8, seed=2)
+    run_id = store.append_teams(make_teams(students, 4), "CS101", "2025-1")
+    assert store.pair_table("CS101", "2025-1")[3].size == 0
+
+    store.append_labels(run_id, {"team_0": (0.9, 1.0)}, "CS101", "2025-1")
+    store.append_labels(run_id, {"team_0": (0.7, 0.5)}, "CS101", "2025-1")
+    teams = store.load_team_data("CS101", "2025-1")
+    assert [t.team_id for t in teams] == ["team_0", "team_1"]
+    assert [len(t.members) for t in teams] == [4, 4]
+    # 같은 팀은 가장 최근 레이블
+    assert teams[0].performance_score == 0.7
+    assert math.isnan(teams[1].performance_score)
+
+    features, left, right, labels = store.pair_table("CS101", "2025-1")
+    assert len(features) == 4
+    assert len(left) == len(right) == len(labels) == 6
+    np.testing.assert_allclose(labels, 0.7)
@@ -0,0 +1,56 @@
+import numpy as np
+import pytest
+from app.compatibility import bucketed_assign, greedy_assign, team_sizes
+from app.multistart import multistart_match
+from app.optimal import optimal_match
+from app.student_table import StudentTable
+
+REQ = {"PM": 1, "FE": 1, "BE": 1}
+
+
+@pytest.mark.parametrize("n, expected", [
+    (0, []), (1, [1]), (3, [3]), (4, [4]), (5, [5]), (6, [3, 3]), (7, [4, 3]),
+    (10, [5, 5]), (13, [5, 4, 4]), (15, [4, 4, 4, 3]), (16, [4, 4, 4, 4]),
+])
+def test_team_sizes(n, expected):
+    assert team_sizes(n, 4) == expected
+
+
+def _deviation(sizes, team_size):
+    return max(abs(s - team_size) for s in sizes)
+
+
+@pytest.mark.parametrize("team_size", [2, 3, 4, 5, 6])
+def test_team_sizes_closest_to_team_size(team_size):
+    for n in range(1, 200):
+        sizes = team_sizes(n, team_size)
+        assert sum(sizes) == n
+        assert max(sizes) - min(sizes) <= 1
+        # 어떤 팀 수로 나눠도 team_size에서 이보다 덜 벗어날 수 없다
+        best = min(_deviation([n // k + 1] * (n % k) + [n // k] * (k - n % k), team_size) for k in range(1, n + 1))
+        assert _deviation(sizes, team_size) == best, (n, sizes)
+        if team_size <= 4 and n >= team_size - 1:
+            assert _deviation(sizes, team_size) <= 1, (n, sizes)
+
+
+def _cohort(cohort, n):
+    table = StudentTable(cohort(n, seed=n))
+    scores = np.random.default_rng(n).random((n, n))
+    return table, (scores + scores.T) / 2
+
+
+@pytest.mark.parametrize("n", [7, 10, 13])
+def test_strategies_share_size_plan(cohort, n):
+    table, scores = _cohort(cohort, n)
+    order = table.greedy_order()
+    expected = sorted(team_sizes(n, 4))
+    args = (scores, table.roles, list(table.C), list(table.is_pm), 4, REQ)
+    plans = {
+        "bucketed": bucketed_assign(scores, order, table.roles, 4, REQ),
+        "greedy": greedy_assign(scores, order, table.roles, 4, REQ),
+        "multistart": multistart_match(*args, n_seeds=2, time_budget_ms=200)[0],
+        "optimal": optimal_match(*args, n_seeds=2, time_budget_ms=200)[0],
+    }
+    for name, teams in plans.items():
+        assert sorted(len(t) for t in teams) == expected, name
+        assert sorted(i for t in teams for i in t) == list(range(n)), name
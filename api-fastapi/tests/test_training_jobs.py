@@ -0,0 +1,146 @@
+import os
+import queue
+import time
+
+import numpy as np
+import pytest
+
+from app import training_jobs
+from app.data_processor import PAIR_FEATURE_DIM
+from app.deep_inference import export_lite
+from app.feature_store import FeatureStore
+from app.model_registry import ModelRegistry
+from app.training_jobs import FINISHED_STATES, TrainingJobManager
+
+# 워커 프로세스는 spawn으로 실행되므로 대상 함수는 이 모듈의 최상위 함수여야 한다 (TensorFlow 없이 학습 흉내)
+
+
+def fake_train(feature_path, epochs, base_path, save_path, progress, cancel_event):
+    for epoch in range(epochs):
+        progress.put(("epoch", epoch + 1, {"loss": 1.0 / (epoch + 1)}))
+    rng = np.random.default_rng(0)
+    dims = [PAIR_FEATURE_DIM, 4, 1]
+    weights = []
+    for d_in, d_out in zip(dims, dims[1:]):
+        weights += [rng.normal(size=(d_in, d_out)), np.zeros(d_out)]
+    os.makedirs(save_path)
+    export_lite(weights, save_path)
+    progress.put(("done",))
+
+
+def fake_train_error(feature_path, epochs, base_path, save_path, progress, cancel_event):
+    progress.put(("error", "ValueError: boom"))
+
+
+def fake_train_crash(feature_path, epochs, base_path, save_path, progress, cancel_event):
+    os._exit(3)
+
+
+def fake_train_until_cancel(feature_path, epochs, base_path, save_path, progress, cancel_event):
+    progress.put(("epoch", 1, {"loss": 1.0}))
+    cancel_event.wait(60)
+    progress.put(("cancelled",))
+
+
+def pairs(n=6):
+    features = np.random.default_rng(n).random((n, 24))
+    left, right = np.triu_indices(n, k=1)
+    return features, left, right, np.full(len(left), 0.5, dtype=np.float32)
+
+
+@pytest.fixture
+def manager(tmp_path):
+    registry = ModelRegistry(str(tmp_path / "models"), backend="numpy")
+    manager = TrainingJobManager(registry, FeatureStore(str(tmp_path / "features")))
+    yield manager
+    manager.shutdown()
+
+
+def wait_for(job, states=FINISHED_STATES, timeout=60):
+    deadline = time.time() + timeout
+    while job.status not in states:
+        assert time.time() < deadline, f"job stuck in {job.status}"
+        time.sleep(0.05)
+    return job
+
+
+def test_job_succeeds_and_swaps_model(manager, monkeypatch):
+    monkeypatch.setattr(training_jobs, "_train_process", fake_train)
+    job = manager.submit(pairs(), epochs=3, info={"students_count": 6})
+    assert job.status in ("queued", "running")
+    wait_for(job)
+    assert job.status == "succeeded", job.error
+    assert job.started_at and job.finished_at >= job.started_at
+    assert job.epoch == 3 and [h["loss"] for h in job.history] == [1.0, 0.5, 1.0 / 3]
+    assert manager.registry.version == job.version and manager.registry.current_version() == job.version
+    assert manager.registry.model is not None
+    d = job.to_dict()
+    assert d["metrics"]["pairs_count"] == 15 and d["metrics"]["students_count"] == 6
+    assert manager.get(job.job_id) is job and manager.list() == [job]
+
+
+@pytest.mark.parametrize("target, error", [(fake_train_error, "ValueError: boom"), (fake_train_crash, "exit code 3")])
+def test_job_failures(manager, monkeypatch, target, error):
+    monkeypatch.setattr(training_jobs, "_train_process", target)
+    job = wait_for(manager.submit(pairs(), epochs=1))
+    assert job.status == "failed"
+    assert error in job.error
+    assert manager.registry.version is None
+
+
+def test_cancel_queued_and_running(manager, monkeypatch):
+    monkeypatch.setattr(training_jobs, "_train_process", fake_train_until_cancel)
+    running = manager.submit(pairs(), epochs=1)
+    queued = manager.submit(pairs(), epochs=1)
+    wait_for(running, states=("running",))
+    # 실행 중인 작업이 있는 동안 대기 중인 작업은 바로 취소된다
+    assert manager.cancel(queued.job_id).status == "cancelled"
+    manager.cancel(running.job_id)
+    assert wait_for(running).status == "cancelled"
+    assert queued.started_at is None
+    assert manager.cancel("missing") is None
+
+
+class RacyContext:
+    """첫 progress.get이 워커가 끝날 때까지 기다렸다가 Empty를 내는 컨텍스트
+
+    타임아웃 직후 워커가 "done"을 보내고 종료해 is_alive()가 False인 경쟁 상황을 그대로 재현한다.
+    """
+
+    def __init__(self, ctx):
+        self.ctx = ctx
+        self.process = None
+        self.timeouts = 0
+
+    def Event(self):
+        return self.ctx.Event()
+
+    def Queue(self):
+        context = self
+        inner = self.ctx.Queue()
+
+        class Racy:
+            def get(self, timeout=None):
+                if context.timeouts == 0:
+                    context.timeouts += 1
+                    context.process.join()
+                    raise queue.Empty
+                return inner.get(timeout=timeout)
+
+        racy = Racy()
+        racy.inner = inner
+        return racy
+
+    def Process(self, target, name, args):
+        args = tuple(getattr(a, "inner", a) for a in args)
+        self.process = self.ctx.Process(target=target, name=name, args=args)
+        return self.process
+
+
+def test_result_sent_right_before_exit_is_not_a_failure(manager, monkeypatch):
+    monkeypatch.setattr(training_jobs, "_train_process", fake_train)
+    manager._ctx = RacyContext(manager._ctx)
+    job = wait_for(manager.submit(pairs(), epochs=2))
+    assert manager._ctx.timeouts == 1
+    assert job.status == "succeeded", job.error
+    assert job.epoch == 2